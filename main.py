@@ -1,9 +1,8 @@
 import pandas as pd
-import numpy as np
 import os
 
 from scripts.data_loader import duplicate_fits, load_gti_file, load_event_file, empty_df
-from scripts.barycenter_corr import barycorr
+from scripts.barycenter_corr import barycorr, get_barycorr_offset
 from scripts.event_filter import filter_events_by_energy
 from scripts.clean_gti import clean_gti
 from scripts.merge_gtis import merge_gtis
@@ -11,19 +10,28 @@ from scripts.event_common_gti import filter_events_with_common_gti
 from scripts.get_event_corr_factor import get_event_corr_factor
 from scripts.merge_events import merge_events
 from scripts.calculate_average_rate import calculate_average_rate
-from scripts.suppress_gti_gaps import suppress_gti_gaps
+from scripts.stream_events import stream_clean_gti, stream_events
 from scripts.find_blocks import find_blocks, format_bayesian_block_output
-from scripts.find_blocks_astropy import bba_astropy
+from scripts.expo_events import FitProgress
+from scripts.find_blocks_astropy import bba_astropy, fp_rate_to_ncp_prior
+from scripts.coarse_to_fine import coarse_to_fine_blocks
+from scripts.prior_sweep import sweep_ncp_prior
+from scripts.calibrate_prior import calibrate_ncp_prior, combine_exposure_profiles
+from scripts.bootstrap_blocks import bootstrap_change_points
+from scripts.multi_band import multi_band_blocks, hardness_ratio
+from scripts.get_event_corr_factor import load_corr_table
 from scripts.detailed_flare_analysis import detailed_flare_analysis
 from scripts.insert_gaps import insert_gti_gaps
+from scripts.time_axis import TimeAxis
 from scripts.save_bba_results import (
-    convert_nustar_to_utc,
     save_bba_results_txt,
     save_flare_results_txt,
     calculate_event_counts_and_rates,
     calculate_confidence_limits,
 )
 from scripts.create_lightcurve import generate_lightcurve, plot_prep
+from scripts.lightcurve_cube import LightCurveCube
+from scripts.lightcurve_pyramid import build_lightcurve_pyramid, save_lightcurve_pyramid
 from scripts.plot_lc import plot_lightcurve
 from scripts.make_readme import write_readme
 
@@ -120,6 +128,30 @@ def main():
     energy_max = 30.0
 
     # --- For Step 3 / GTI Cleaning ---
+    gti_threshold = 30  # Minimum duration (seconds)
+    gti_starttrim = 15  # Trim seconds from start
+    gti_stoptrim = 15  # Trim seconds from stop
+    gti_min_rate = None  # Minimum event rate in a GTI (counts/s)
+    gti_max_gap = None  # Maximum time without events inside a GTI (seconds)
+    gti_min_fraction = None  # Minimum mean lccorr FRACTION (dead time) of a GTI
+
+    # --- Streaming mode (event lists that do not fit in memory) ---
+    stream_mode = False  # Stream FITS rows through steps 2-9 in chunks
+    chunk_size = 1000000  # Event rows read per chunk
+
+    # --- Multi-band mode (steps 1-9 once, step 10 fanned out per band) ---
+    energy_bands = None  # e.g. [(3.0, 30.0), (3.0, 10.0), (10.0, 79.0)]
+    hardness_bands = None  # (soft, hard), e.g. ((3.0, 10.0), (10.0, 79.0))
+
+    # Steps 2-9 keep the events of the BBA energy range and of every extra band
+    load_energy_min, load_energy_max = energy_min, energy_max
+    if energy_bands is not None:
+        if stream_mode:
+            raise ValueError(
+                "Multi-band mode needs event energies; set stream_mode = False."
+            )
+        load_energy_min = min([energy_min] + [band[0] for band in energy_bands])
+        load_energy_max = max([energy_max] + [band[1] for band in energy_bands])
 
     print("\n------ Start Data Processing Pipeline ------\n")
 
@@ -146,153 +178,266 @@ def main():
         event_file_b = output_dir + "event_file_C"
         lccorrfileB = output_dir + "lccorrfile_C"
 
-    print("Step 1: Loading GTI and event data...")
-    gtiA = load_gti_file(event_file_a)
-    gtiB = load_gti_file(event_file_b)
-    eventsA = load_event_file(event_file_a)
-    eventsB = load_event_file(event_file_b)
-    print(f"    Module A: {len(gtiA)} GTI intervals, {len(eventsA)} events.")
-    print(f"    Module B: {len(gtiB)} GTI intervals, {len(eventsB)} events.")
+    if stream_mode:
+        # Stream only the modules with data; the one-module placeholder has no rows
+        stream_modules = {
+            "A": (event_file_a, lccorrfileA),
+            "B": (event_file_b, lccorrfileB),
+        }
+        if one_mod is True:
+            stream_modules = {present_mod: stream_modules[present_mod]}
+        stream_event_files = [files[0] for files in stream_modules.values()]
+        stream_lccorr_files = [files[1] for files in stream_modules.values()]
+
+        print("Step 1: Loading GTI data and barycenter correction...")
+        time_offset = get_barycorr_offset(barycorr_event, stream_event_files[0])
+        stream_gtis = {}
+        for module, (event_file, _) in stream_modules.items():
+            stream_gtis[module] = load_gti_file(event_file) + time_offset
+            print(f"    Module {module}: {len(stream_gtis[module])} GTI intervals.")
+        print(
+            f"Step 1 Complete: Loaded GTI data for module(s) {', '.join(stream_modules)}.\n"
+        )
 
-    print("Step 1.5: apply barycenter correction....")
-    barycorr(barycorr_event, event_file_a, eventsA, eventsB, gtiA, gtiB)
-    print("Step 1 Complete: Loaded GTI and event data for modules A and B.\n")
+        print("\nStep 3: Cleaning GTIs (streamed)...")
+        cleaned_gtis = []
+        for module, (event_file, _) in stream_modules.items():
+            print(f"    Module {module}: ")
+            gti_cleaned = stream_clean_gti(
+                stream_gtis[module],
+                event_file,
+                energy_min,
+                energy_max,
+                threshold=gti_threshold,
+                starttrim=gti_starttrim,
+                stoptrim=gti_stoptrim,
+                time_offset=time_offset,
+                chunk_size=chunk_size,
+            )
+            gti_cleaned.to_csv(output_dir + f"3_gti{module}_cleaned.csv", index=False)
+            cleaned_gtis.append(gti_cleaned)
+        print("Step 3 Complete: Cleaned GTIs saved.\n")
 
-    # Debugging: Print energy ranges
-    # print(f"Energy range in Module A: min={eventsA['Energy'].min()}, max={eventsA['Energy'].max()}")
-    # print(f"Energy range in Module B: min={eventsB['Energy'].min()}, max={eventsB['Energy'].max()}")
+        print("\nStep 4: Merging GTIs...")
+        if len(cleaned_gtis) == 2:
+            merged_gti = merge_gtis(*cleaned_gtis)
+        else:
+            print(
+                f"    Only module {present_mod}: its cleaned GTIs are used as they are."
+            )
+            merged_gti = cleaned_gtis[0]
+        merged_gti.to_csv(output_dir + "4_merged_gti.csv", index=False)
+
+        # Mission / barycentric / gap-suppressed / UTC time mapping
+        time_axis = TimeAxis.from_gti(merged_gti, time_offset=time_offset)
+        time_axis.save(output_dir + "4_time_axis.json")
+        print("Step 4 Complete: Merged GTIs saved to 'merged_gti.csv'.\n")
+
+        print("\nSteps 2, 5-7, 9: Streaming events (energy, GTI, correction, gaps)...")
+        events_no_gaps, _ = stream_events(
+            stream_event_files,
+            stream_lccorr_files,
+            merged_gti,
+            energy_min,
+            energy_max,
+            time_offset=time_offset,
+            chunk_size=chunk_size,
+            time_axis=time_axis,
+        )
 
-    # print("\nInspecting the first 10 rows of Module A event data:")
-    # print(eventsA.head(10))
-    # print("\nInspecting the first 10 rows of Module B event data:")
-    # print(eventsB.head(10))
+        # Observation-time view of the streamed events for steps 8 and 11-14
+        events_merged = pd.DataFrame(
+            {
+                "TIME": time_axis.restore(events_no_gaps["TIME"].values),
+                "Exposure": events_no_gaps["Exposure"].values,
+                "CORRECTION_FACTOR": events_no_gaps["Exposure"].values,
+            }
+        )
+        print("Streamed steps Complete.\n")
 
-    ################## Step 2: Filter Events by Energy ##################
-    print("\nStep 2: Filtering events by energy...")
-    filtered_eventsA = filter_events_by_energy(eventsA, energy_min, energy_max)
-    filtered_eventsB = filter_events_by_energy(eventsB, energy_min, energy_max)
+    else:
+        print("Step 1: Loading GTI and event data...")
+        gtiA = load_gti_file(event_file_a)
+        gtiB = load_gti_file(event_file_b)
+        eventsA = load_event_file(event_file_a)
+        eventsB = load_event_file(event_file_b)
+        print(f"    Module A: {len(gtiA)} GTI intervals, {len(eventsA)} events.")
+        print(f"    Module B: {len(gtiB)} GTI intervals, {len(eventsB)} events.")
+
+        print("Step 1.5: apply barycenter correction....")
+        time_offset = get_barycorr_offset(barycorr_event, event_file_a)
+        barycorr(barycorr_event, event_file_a, eventsA, eventsB, gtiA, gtiB)
+        print("Step 1 Complete: Loaded GTI and event data for modules A and B.\n")
+
+        # Debugging: Print energy ranges
+        # print(f"Energy range in Module A: min={eventsA['Energy'].min()}, max={eventsA['Energy'].max()}")
+        # print(f"Energy range in Module B: min={eventsB['Energy'].min()}, max={eventsB['Energy'].max()}")
+
+        # print("\nInspecting the first 10 rows of Module A event data:")
+        # print(eventsA.head(10))
+        # print("\nInspecting the first 10 rows of Module B event data:")
+        # print(eventsB.head(10))
+
+        ################## Step 2: Filter Events by Energy ##################
+        print("\nStep 2: Filtering events by energy...")
+        filtered_eventsA = filter_events_by_energy(
+            eventsA, load_energy_min, load_energy_max
+        )
+        filtered_eventsB = filter_events_by_energy(
+            eventsB, load_energy_min, load_energy_max
+        )
 
-    print(f"    Module A: {len(filtered_eventsA)} events remaining.")
-    print(f"    Module B: {len(filtered_eventsB)} events remaining.")
-    print(f"    Filtered events for energy range [{energy_min}, {energy_max}] keV.")
+        print(f"    Module A: {len(filtered_eventsA)} events remaining.")
+        print(f"    Module B: {len(filtered_eventsB)} events remaining.")
+        print(
+            f"    Filtered events for energy range [{load_energy_min}, {load_energy_max}] keV."
+        )
 
-    # Save or pass the filtered data for the next steps
-    filtered_eventsA.to_csv(output_dir + "2_filtered_events_moduleA.csv", index=False)
-    filtered_eventsB.to_csv(output_dir + "2_filtered_events_moduleB.csv", index=False)
+        # Save or pass the filtered data for the next steps (with energy_bands set,
+        # these hold the union of the BBA range and every extra band)
+        filtered_eventsA.to_csv(
+            output_dir + "2_filtered_events_moduleA.csv", index=False
+        )
+        filtered_eventsB.to_csv(
+            output_dir + "2_filtered_events_moduleB.csv", index=False
+        )
 
-    print("Step 2 Complete: Filtered event data saved for both modules.\n")
+        print("Step 2 Complete: Filtered event data saved for both modules.\n")
 
-    ######################## Step 3: Clean GTIs ########################
-    # Parameters for GTI cleaning
-    gti_threshold = 30  # Minimum duration (seconds)
-    gti_starttrim = 15  # Trim seconds from start
-    gti_stoptrim = 15  # Trim seconds from stop
+        ######################## Step 3: Clean GTIs ########################
+        print("\nStep 3: Cleaning GTIs...")
+        # Clean on the BBA energy range, so extra bands do not change the GTIs
+        gti_eventsA, gti_eventsB = filtered_eventsA, filtered_eventsB
+        if energy_bands is not None:
+            gti_eventsA = filter_events_by_energy(
+                filtered_eventsA, energy_min, energy_max
+            )
+            gti_eventsB = filter_events_by_energy(
+                filtered_eventsB, energy_min, energy_max
+            )
+        print("    Module A: ")
+        gtiA_cleaned = clean_gti(
+            gtiA,
+            gti_eventsA,
+            threshold=gti_threshold,
+            starttrim=gti_starttrim,
+            stoptrim=gti_stoptrim,
+            min_rate=gti_min_rate,
+            max_gap=gti_max_gap,
+            corr_table=lccorrfileA,
+            min_fraction=gti_min_fraction,
+        )
+        print("    Module B: ")
+        gtiB_cleaned = clean_gti(
+            gtiB,
+            gti_eventsB,
+            threshold=gti_threshold,
+            starttrim=gti_starttrim,
+            stoptrim=gti_stoptrim,
+            min_rate=gti_min_rate,
+            max_gap=gti_max_gap,
+            corr_table=lccorrfileB,
+            min_fraction=gti_min_fraction,
+        )
 
-    print("\nStep 3: Cleaning GTIs...")
-    print("    Module A: ")
-    gtiA_cleaned = clean_gti(
-        gtiA,
-        filtered_eventsA,
-        threshold=gti_threshold,
-        starttrim=gti_starttrim,
-        stoptrim=gti_stoptrim,
-    )
-    print("    Module B: ")
-    gtiB_cleaned = clean_gti(
-        gtiB,
-        filtered_eventsB,
-        threshold=gti_threshold,
-        starttrim=gti_starttrim,
-        stoptrim=gti_stoptrim,
-    )
+        # Save cleaned GTIs for debugging or further steps
+        gtiA_cleaned.to_csv(output_dir + "3_gtiA_cleaned.csv", index=False)
+        gtiB_cleaned.to_csv(output_dir + "3_gtiB_cleaned.csv", index=False)
 
-    # Save cleaned GTIs for debugging or further steps
-    gtiA_cleaned.to_csv(output_dir + "3_gtiA_cleaned.csv", index=False)
-    gtiB_cleaned.to_csv(output_dir + "3_gtiB_cleaned.csv", index=False)
+        print("Step 3 Complete: Cleaned GTIs saved.\n")
 
-    print("Step 3 Complete: Cleaned GTIs saved.\n")
+        ######################## Step 4: Merge GTIs ########################
+        print("\nStep 4: Merging GTIs...")
+        merged_gti = merge_gtis(gtiA_cleaned, gtiB_cleaned)
 
-    ######################## Step 4: Merge GTIs ########################
-    print("\nStep 4: Merging GTIs...")
-    merged_gti = merge_gtis(gtiA_cleaned, gtiB_cleaned)
+        # Save merged GTIs for debugging or further steps
+        merged_gti.to_csv(output_dir + "4_merged_gti.csv", index=False)
 
-    # Save merged GTIs for debugging or further steps
-    merged_gti.to_csv(output_dir + "4_merged_gti.csv", index=False)
+        # Mission / barycentric / gap-suppressed / UTC time mapping
+        time_axis = TimeAxis.from_gti(merged_gti, time_offset=time_offset)
+        time_axis.save(output_dir + "4_time_axis.json")
 
-    print("Step 4 Complete: Merged GTIs saved to 'merged_gti.csv'.\n")
+        print("Step 4 Complete: Merged GTIs saved to 'merged_gti.csv'.\n")
 
-    ########### Step 5: Filtering Events Using Common GTIs #############
-    print("\nStep 5: Filtering events using common GTIs...")
-    print("    Module A: ")
-    filtered_eventsA_with_gti = filter_events_with_common_gti(
-        filtered_eventsA, merged_gti
-    )
-    print("    Module B: ")
-    filtered_eventsB_with_gti = filter_events_with_common_gti(
-        filtered_eventsB, merged_gti
-    )
+        ########### Step 5: Filtering Events Using Common GTIs #############
+        print("\nStep 5: Filtering events using common GTIs...")
+        print("    Module A: ")
+        filtered_eventsA_with_gti = filter_events_with_common_gti(
+            filtered_eventsA, merged_gti
+        )
+        print("    Module B: ")
+        filtered_eventsB_with_gti = filter_events_with_common_gti(
+            filtered_eventsB, merged_gti
+        )
 
-    # Save the filtered events for debugging or further analysis
-    filtered_eventsA_with_gti.to_csv(
-        output_dir + "5_filtered_eventsA_with_gti.csv", index=False
-    )
-    filtered_eventsB_with_gti.to_csv(
-        output_dir + "5_filtered_eventsB_with_gti.csv", index=False
-    )
+        # Save the filtered events for debugging or further analysis
+        filtered_eventsA_with_gti.to_csv(
+            output_dir + "5_filtered_eventsA_with_gti.csv", index=False
+        )
+        filtered_eventsB_with_gti.to_csv(
+            output_dir + "5_filtered_eventsB_with_gti.csv", index=False
+        )
 
-    print("Step 5 Complete: Filtered events saved.\n")
+        print("Step 5 Complete: Filtered events saved.\n")
 
-    ########### Step 6: Get Correction Factors for Rvents #############
-    print("\nStep 6: Getting correction factors for photon events...")
+        ########### Step 6: Get Correction Factors for Rvents #############
+        print("\nStep 6: Getting correction factors for photon events...")
 
-    # Apply the correction factor module for Module A
-    print("    Module A: ")
-    filtered_eventsA_with_gti["CORRECTION_FACTOR"] = get_event_corr_factor(
-        lccorrfileA, filtered_eventsA_with_gti["TIME"]
-    )
+        # Apply the correction factor module for Module A
+        print("    Module A: ")
+        filtered_eventsA_with_gti["CORRECTION_FACTOR"] = get_event_corr_factor(
+            lccorrfileA, filtered_eventsA_with_gti["TIME"]
+        )
 
-    # Apply the correction factor module for Module B
-    print("    Module B: ")
-    filtered_eventsB_with_gti["CORRECTION_FACTOR"] = get_event_corr_factor(
-        lccorrfileB, filtered_eventsB_with_gti["TIME"]
-    )
+        # Apply the correction factor module for Module B
+        print("    Module B: ")
+        filtered_eventsB_with_gti["CORRECTION_FACTOR"] = get_event_corr_factor(
+            lccorrfileB, filtered_eventsB_with_gti["TIME"]
+        )
 
-    # Save the updated DataFrames
-    filtered_eventsA_with_gti.to_csv(
-        output_dir + "6_filtered_eventsA_with_corr.csv", index=False
-    )
-    filtered_eventsB_with_gti.to_csv(
-        output_dir + "6_filtered_eventsB_with_corr.csv", index=False
-    )
+        # Save the updated DataFrames
+        filtered_eventsA_with_gti.to_csv(
+            output_dir + "6_filtered_eventsA_with_corr.csv", index=False
+        )
+        filtered_eventsB_with_gti.to_csv(
+            output_dir + "6_filtered_eventsB_with_corr.csv", index=False
+        )
 
-    print("Step 6 Complete: Correction factors saved.\n")
+        print("Step 6 Complete: Correction factors saved.\n")
 
-    #################### Step 7: Merge Events ######################
-    print("\nStep 7: Merging photon events...")
+        #################### Step 7: Merge Events ######################
+        print("\nStep 7: Merging photon events...")
 
-    if one_mod is True:
-        print("making the missing module dataframe empty...")
-        if present_mod == "A":
-            filtered_eventsB_with_gti = empty_df(filtered_eventsB_with_gti)
-        elif present_mod == "B":
-            filtered_eventsA_with_gti = empty_df(filtered_eventsA_with_gti)
+        if one_mod is True:
+            print("making the missing module dataframe empty...")
+            if present_mod == "A":
+                filtered_eventsB_with_gti = empty_df(filtered_eventsB_with_gti)
+            elif present_mod == "B":
+                filtered_eventsA_with_gti = empty_df(filtered_eventsA_with_gti)
 
-    # Merge photon events with exposure factors and module labels
-    events_merged = merge_events(
-        filtered_eventsA_with_gti,
-        filtered_eventsB_with_gti,
-        filtered_eventsA_with_gti["CORRECTION_FACTOR"].values,
-        filtered_eventsB_with_gti["CORRECTION_FACTOR"].values,
-    )
+        # Merge photon events with exposure factors and module labels
+        events_merged = merge_events(
+            filtered_eventsA_with_gti,
+            filtered_eventsB_with_gti,
+            filtered_eventsA_with_gti["CORRECTION_FACTOR"].values,
+            filtered_eventsB_with_gti["CORRECTION_FACTOR"].values,
+        )
+
+        # delete NANs if present
+        if one_mod is True:
+            events_merged = events_merged.dropna()
 
-    # delete NANs if present
-    if one_mod is True:
-        events_merged = events_merged.dropna()
+        # Save the merged DataFrame
+        events_merged.to_csv(f"{output_dir}7_events_merged.csv", index=False)
 
-    # Save the merged DataFrame
-    events_merged.to_csv(f"{output_dir}7_events_merged.csv", index=False)
+        print("Step 7 Complete: Merged events saved.\n")
 
-    print("Step 7 Complete: Merged events saved.\n")
+        if energy_bands is not None:
+            # Step 10 fits every band; the other steps use the BBA energy range
+            all_band_events = events_merged
+            events_merged = filter_events_by_energy(
+                all_band_events, energy_min, energy_max
+            )
 
     ################# Step 8: Calculate Average Count Rate ###################
 
@@ -301,6 +446,7 @@ def main():
 
     # Optional flare GTI DataFrame (None if not provided)
     flare_gti = None  # Replace with the flare GTI DataFrame if available
+    rate_intervals = None  # Any interval table with START/STOP (overrides the GTIs)
 
     print("\nStep 8: Calculating the average count rate during GTIs...")
 
@@ -310,6 +456,7 @@ def main():
         gti=merged_gti,
         flare_gti=flare_gti,
         calculate_average_count_rate=calculate_average_count_rate,
+        intervals=rate_intervals,
     )
 
     if average_rates is not None:
@@ -319,25 +466,39 @@ def main():
 
     ################# Step 9: Remove Gaps between GTIs ###################
 
-    print("\nStep 9: Removing gaps between GTIs...")
-
-    # Original observation end time
-    original_tt_stop = merged_gti["STOP"].max()
-    print("    Original observation stop time:", original_tt_stop)
-
-    # Suppress gaps in event times
-    events_no_gaps, updated_tt_stop, cumulative_gaps = suppress_gti_gaps(
-        event_df=events_merged, gti_df=merged_gti, original_tt_stop=original_tt_stop
-    )
+    cumulative_gaps = time_axis.cumulative_gaps
+    if stream_mode:
+        print("\nStep 9: Gaps between GTIs already removed while streaming.")
+        cumulative_gaps_df = pd.DataFrame({"Cumulative Gap Time": cumulative_gaps})
+        cumulative_gaps_df.to_csv(f"{output_dir}9_cumulative_gaps.csv", index=False)
+    else:
+        print("\nStep 9: Removing gaps between GTIs...")
+
+        # Original observation end time
+        original_tt_stop = merged_gti["STOP"].max()
+        print("    Original observation stop time:", original_tt_stop)
+
+        # Suppress gaps in event times
+        events_no_gaps = (
+            events_merged if energy_bands is None else all_band_events
+        ).copy()
+        events_no_gaps["TIME"] = time_axis.suppress(events_no_gaps["TIME"].values)
+        print(f"    Total gap time removed: {time_axis.total_gap}")
+        print(f"    New observation stop time: {events_no_gaps['TIME'].iloc[-1]}")
+        if energy_bands is not None:
+            all_band_events_no_gaps = events_no_gaps
+            events_no_gaps = filter_events_by_energy(
+                all_band_events_no_gaps, energy_min, energy_max
+            )
 
-    # Save the updated event DataFrame
-    events_no_gaps.to_csv(f"{output_dir}9_events_no_gaps.csv", index=False)
+        # Save the updated event DataFrame
+        events_no_gaps.to_csv(f"{output_dir}9_events_no_gaps.csv", index=False)
 
-    # Optionally save cumulative gaps for debugging
-    cumulative_gaps_df = pd.DataFrame({"Cumulative Gap Time": cumulative_gaps})
-    cumulative_gaps_df.to_csv(f"{output_dir}9_cumulative_gaps.csv", index=False)
+        # Optionally save cumulative gaps for debugging
+        cumulative_gaps_df = pd.DataFrame({"Cumulative Gap Time": cumulative_gaps})
+        cumulative_gaps_df.to_csv(f"{output_dir}9_cumulative_gaps.csv", index=False)
 
-    print("Step 9 Complete: Events with suppressed gaps saved.\n")
+        print("Step 9 Complete: Events with suppressed gaps saved.\n")
 
     ################# Step 10: Bayesian Block Analysis ###################
 
@@ -346,10 +507,35 @@ def main():
     plan_b = True  # Plan B (Custom Astropy)
     fp_rate = 0.01  # False positive rate
     # ncp_prior = None  # Prior number of change points
-    ncp_prior = 4 - np.log10(
-        fp_rate / (0.0136 * (len(events_no_gaps) ** 0.478))
-    )  # As Shuo did
+    ncp_prior = fp_rate_to_ncp_prior(fp_rate, len(events_no_gaps))  # As Shuo did
+    calibrate_prior = False  # Calibrate ncp_prior with simulated signal-free trials
+    n_calibration_sims = 1000  # Number of simulated null light curves
+    if calibrate_prior:
+        print("    Calibrating ncp_prior on simulated null light curves...")
+        ncp_prior, calibration_trials = calibrate_ncp_prior(
+            len(events_no_gaps),
+            merged_gti,
+            fp_rate=fp_rate,
+            exposure_profile=combine_exposure_profiles(
+                load_corr_table(lccorrfileA), load_corr_table(lccorrfileB)
+            ),
+            n_sims=n_calibration_sims,
+            cache_dir=output_dir + "ncp_prior_cache/",
+        )
+        calibration_trials.to_csv(output_dir + "10_ncp_prior_trials.csv", index=False)
+    fp_rate_sweep = None  # e.g. [0.1, 0.05, 0.01, 0.005] to check flare robustness
+    bootstrap_method = None  # "bootstrap" or "jackknife" for block edge/rate errors
+    n_bootstrap = 200  # Number of bootstrap resamples
     do_iter = False  # Iterative refinement flag
+    bba_cell_size = None  # Pre-bin photons into cells (seconds or "auto")
+    bba_refine = True  # Refine pre-binned edges back to photon resolution
+    # Threads for the inner maximization of the fit. Leave None (serial) unless
+    # scripts/benchmark_threads.py shows a speedup on this machine
+    bba_n_threads = None
+    bba_checkpoint = None  # e.g. output_dir + "10_checkpoint/" to resume a long fit
+    fit_progress = FitProgress()  # Progress reports of the fit, added to the README
+    coarse_to_fine = False  # Exact fit only in windows around coarse change points
+    window_cells = 3  # Half width of the coarse-to-fine windows (cells)
     x_list = events_no_gaps["Exposure"].values
     # x_list=np.random.uniform(low=0.4, high=0.68, size=len(events_no_gaps['TIME'].values)) #for testing purposes
     print("\nStep 10: Bayesian Block Analysis...")
@@ -369,10 +555,44 @@ def main():
         # Save results
         bayesian_blocks_df.to_csv(output_dir + "10_bayesian_blocks.csv", index=False)
 
+    elif coarse_to_fine:
+        print("    Using Coarse-to-Fine Bayesian Block Implementation...")
+        bayesian_blocks_df, refine_report = coarse_to_fine_blocks(
+            events_no_gaps["TIME"].values,
+            x_list,
+            ncp_prior,
+            fp_rate,
+            cell_size="auto" if bba_cell_size is None else bba_cell_size,
+            window_cells=window_cells,
+        )
+        print(
+            f"    Objective: {refine_report['objective']:.3f} "
+            f"(coarse {refine_report['coarse_objective']:.3f}), "
+            f"edges on window boundaries: {refine_report['boundary_edges']}, "
+            f"coarse edges kept: {refine_report['coarse_edges_kept']}"
+        )
+        print("    No bound on the difference from the exact fit is computed.")
+
+        # Save results
+        bayesian_blocks_df.to_csv(
+            output_dir + "10_bayesian_blocks_astropy.csv", index=False
+        )
+        pd.DataFrame([refine_report]).to_csv(
+            output_dir + "10_coarse_to_fine_report.csv", index=False
+        )
+
     else:
         print("    Using Astropy Bayesian Block Implementation...")
         bayesian_blocks_df = bba_astropy(
-            events_no_gaps["TIME"].values, ncp_prior, fp_rate, x_list=x_list
+            events_no_gaps["TIME"].values,
+            ncp_prior,
+            fp_rate,
+            x_list=x_list,
+            cell_size=bba_cell_size,
+            refine=bba_refine,
+            n_threads=bba_n_threads,
+            checkpoint=bba_checkpoint,
+            progress=fit_progress,
         )
 
         # Save results
@@ -380,6 +600,40 @@ def main():
             output_dir + "10_bayesian_blocks_astropy.csv", index=False
         )
 
+    if fp_rate_sweep is not None:
+        print("    Sweeping false positive rates...")
+        sweep_change_points, sweep_summary = sweep_ncp_prior(
+            events_no_gaps["TIME"].values, x_list, fp_rates=fp_rate_sweep
+        )
+        sweep_summary.to_csv(output_dir + "10_prior_sweep.csv", index=False)
+
+    if bootstrap_method is not None:
+        print("    Estimating change point uncertainties...")
+        edge_errors, rate_errors = bootstrap_change_points(
+            events_no_gaps["TIME"].values,
+            x_list,
+            ncp_prior,
+            n_resamples=n_bootstrap,
+            method=bootstrap_method,
+        )
+        edge_errors.to_csv(output_dir + "10_edge_uncertainty.csv", index=False)
+        rate_errors.to_csv(output_dir + "10_rate_uncertainty.csv", index=False)
+
+    if energy_bands is not None:
+        print("    Fitting energy bands in parallel...")
+        band_blocks = multi_band_blocks(
+            all_band_events_no_gaps, energy_bands, fp_rate=fp_rate
+        )
+        for label, band_df in band_blocks.items():
+            band_df.to_csv(
+                output_dir + f"10_bayesian_blocks_{label}keV.csv", index=False
+            )
+        if hardness_bands is not None:
+            hardness_df = hardness_ratio(
+                all_band_events_no_gaps, band_blocks, *hardness_bands
+            )
+            hardness_df.to_csv(output_dir + "10_hardness_ratio.csv", index=False)
+
     print("Step 10 Complete: Bayesian Block Analysis results saved.\n")
 
     ############ Step 10.1: Detailed Analysis of the Flaring Activity Block ############
@@ -437,6 +691,7 @@ def main():
         corrected_bba_blocks, gti_gaps_df = insert_gti_gaps(
             bba_df=bayesian_blocks_df,
             gti_df=merged_gti,
+            time_axis=time_axis,
         )
 
         # Save the output files
@@ -528,6 +783,8 @@ def main():
     # try:
     binsize = 100  # Example bin size in seconds
     energy_range = (3.0, 79.0)  # Example energy range in keV
+    if stream_mode:
+        energy_range = None  # streamed events are already limited to the BBA band
 
     # Generate the light curve
     lightcurve_df = generate_lightcurve(
@@ -542,6 +799,25 @@ def main():
     lightcurve_output_path = output_dir + f"13_LC_{binsize}.csv"
     lightcurve_df.to_csv(lightcurve_output_path, index=False)
 
+    # Light curves at several bin sizes for zoomable plots
+    pyramid_binsizes = (10, 100, 1000, 10000)  # Each a multiple of the previous one
+    lightcurve_pyramid = build_lightcurve_pyramid(
+        events_merged, merged_gti, binsizes=pyramid_binsizes, energy_range=energy_range
+    )
+    save_lightcurve_pyramid(lightcurve_pyramid, output_dir + "13_LC_pyramid.fits")
+
+    # Cumulative (time, PI) count cube for later band light curves and spectra
+    # Dense n_bins x 1875 channels over the whole span: ~2e8 cells (GBs) for 100 ks at 1 s
+    build_cube = False  # Opt in; use a coarse resolution for long observations
+    cube_resolution = 10.0  # Finest time bin of the cube (seconds)
+    if build_cube and not stream_mode:
+        cube = LightCurveCube.from_events(
+            events_merged if energy_bands is None else all_band_events,
+            merged_gti,
+            time_resolution=cube_resolution,
+        )
+        cube.save(output_dir + "13_lightcurve_cube.npz")
+
     print("Step 13 Complete: Light curve saved.\n")
 
     # except Exception as e:
@@ -551,6 +827,10 @@ def main():
 
     print("\nStep 14: Plot Light Curve with Bayesian Blocks...")
 
+    plot_window = None  # (start, stop) mission times to zoom on, picks a pyramid level
+    fast_render = False  # Headless min/max-per-pixel rendering for huge light curves
+    save_svg = False  # Also save the plot as SVG
+
     # Define file paths
     lc_plot_path = output_dir + "14_lightcurve_plot.png"
     lc_csv_path = output_dir + "14_lightcurve.csv"
@@ -570,8 +850,12 @@ def main():
         output_path=lc_plot_path,
         lc_csv_path=lc_csv_path,
         bb_csv_path=bb_csv_path,
-        convert_nustar_to_utc=convert_nustar_to_utc,
+        time_axis=time_axis,
         plot_lines=True,
+        pyramid=lightcurve_pyramid if plot_window is not None else None,
+        time_window=plot_window,
+        fast_render=fast_render,
+        svg_path=output_dir + "14_lightcurve_plot.svg" if save_svg else None,
     )
 
     print("Step 14 Complete: Light Curve and Bayesian Blocks saved.\n")
@@ -588,10 +872,16 @@ def main():
         "input lccorr file A": lccorrfileA,
         "input lccorr file B": lccorrfileB,
     }
+    if fit_progress.last is not None:
+        flags_dict["BBA cells fit"] = fit_progress.last["N"]
+        flags_dict["BBA blocks"] = fit_progress.last["n_blocks"]
+        flags_dict["BBA fit time (s)"] = round(fit_progress.last["elapsed"], 1)
+        flags_dict["BBA candidate starts evaluated"] = fit_progress.last["candidates"]
 
     write_readme(output_dir, flags_dict)
 
     print("\n------ End of Data Processing Pipeline ------\n")
 
 
-main()
+if __name__ == "__main__":
+    main()
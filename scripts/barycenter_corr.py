@@ -26,18 +26,8 @@ def barycorr(
 
     """
 
-    # Read TSTART from barycenter corrected event
-    with fits.open(corr_file) as hdul:
-        header = hdul[0].header
-        tstartBC = header.get("TSTART")
-
-    # Read TSTART from events file
-    with fits.open(event_file_a) as hdul:
-        header = hdul[0].header
-        tstart = header.get("TSTART")
-
     # get delta t
-    deltaT = tstartBC - tstart
+    deltaT = get_barycorr_offset(corr_file, event_file_a)
 
     # add correction to events
     eventsA["TIME"] += deltaT
@@ -48,3 +38,27 @@ def barycorr(
     gtiB += deltaT
 
     return eventsA, eventsB, gtiA, gtiB
+
+
+def get_barycorr_offset(corr_file: str, event_file: str):
+    """
+    Get the barycenter time correction from the TSTART keywords of the corrected and xselected event files.
+
+    Args:
+        corr_file (str): Path to the corrected event FITS file
+        event_file (str): path to event FITS file
+
+    Returns:
+        (float): Time offset (seconds) to add to event and GTI times.
+    """
+    # Read TSTART from barycenter corrected event
+    with fits.open(corr_file) as hdul:
+        header = hdul[0].header
+        tstartBC = header.get("TSTART")
+
+    # Read TSTART from events file
+    with fits.open(event_file) as hdul:
+        header = hdul[0].header
+        tstart = header.get("TSTART")
+
+    return tstartBC - tstart
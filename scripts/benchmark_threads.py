@@ -0,0 +1,66 @@
+import argparse
+import os
+import time
+import numpy as np
+
+from scripts.expo_events import Events
+
+
+def benchmark_threads(n_events=100000, thread_counts=(1, 4, 8, 16, 32), seed=0):
+    """
+    Time the Bayesian Blocks recursion serially and with several thread counts.
+
+    The events are a constant-rate list with one flare, fit with the Events fitness and a
+    fixed prior. Every threaded run is checked against the serial result.
+
+    Parameters:
+        n_events (int): Number of photon events.
+        thread_counts (tuple): Values of `n_threads` to time (1 is the serial fit).
+        seed (int): Seed for the simulated events.
+
+    Returns:
+        (list): (n_threads, seconds, speedup over the serial fit) of each run.
+    """
+    rng = np.random.default_rng(seed)
+    n_flare = n_events // 10
+    times = np.sort(
+        np.concatenate(
+            [
+                rng.uniform(0, 1e5, n_events - n_flare),
+                rng.uniform(4e4, 4.1e4, n_flare),
+            ]
+        )
+    )
+    exposure = rng.uniform(0.5, 1.0, n_events)
+    _, prefix = Events().prepare(times, None, None, exposure)
+
+    results = []
+    serial_last = None
+    serial_time = None
+    for n_threads in thread_counts:
+        fitfunc = Events(ncp_prior=6.0, n_threads=n_threads)
+        start = time.perf_counter()
+        _, last = fitfunc.solve(prefix, 6.0)
+        elapsed = time.perf_counter() - start
+
+        if serial_last is None:
+            serial_last, serial_time = last, elapsed
+        elif not np.array_equal(last, serial_last):
+            raise RuntimeError(f"Threaded fit with {n_threads} threads differs.")
+        results.append((n_threads, elapsed, serial_time / elapsed))
+        print(
+            f"    {n_threads:3d} threads: {elapsed:8.2f} s "
+            f"(x{serial_time / elapsed:.2f})"
+        )
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=benchmark_threads.__doc__)
+    parser.add_argument("--n-events", type=int, default=100000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    print(f"Bayesian Blocks DP, N = {args.n_events}, {os.cpu_count()} cores")
+    benchmark_threads(args.n_events, tuple(args.threads))
@@ -0,0 +1,216 @@
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+
+from scripts.expo_events import bayesian_blocks
+
+# Sorted photon arrays shared by the worker processes (set once per worker)
+_shared = {}
+
+
+def _init_worker(time, cell, exposure, ncp_prior, groups):
+    """
+    Store the sorted photon arrays in a worker process.
+
+    Parameters:
+        time (np.ndarray): Sorted unique photon arrival times.
+        cell (np.ndarray): Index into `time` of each photon.
+        exposure (np.ndarray): Exposure correction factor at each unique time.
+        ncp_prior (float): Number of change point prior.
+        groups (np.ndarray): Jackknife group of each photon (or None).
+    """
+    _shared["time"] = time
+    _shared["cell"] = cell
+    _shared["exposure"] = exposure
+    _shared["ncp_prior"] = ncp_prior
+    _shared["groups"] = groups
+
+
+def _fit_resample(task):
+    """
+    Refit the Bayesian Blocks on one resample of the shared photon list.
+
+    A resample is described by the number of copies of each photon, so the sorted
+    arrays are reused and no resample needs to be sorted again.
+
+    Parameters:
+        task (tuple): ("bootstrap", seed sequence), ("jackknife", left out group), or ("full", None).
+
+    Returns:
+        (BlockFitResult): Edges, counts, and exposure-weighted durations of the resample blocks.
+    """
+    kind, arg = task
+    time, cell = _shared["time"], _shared["cell"]
+    if kind == "bootstrap":
+        rng = np.random.default_rng(arg)
+        photons = cell[rng.integers(0, len(cell), len(cell))]
+    elif kind == "jackknife":
+        photons = cell[_shared["groups"] != arg]
+    else:
+        photons = cell
+    weights = np.bincount(photons, minlength=len(time))
+
+    keep = weights > 0
+    return bayesian_blocks(
+        time[keep],
+        x=weights[keep],
+        ex=_shared["exposure"][keep],
+        fitness="events",
+        ncp_prior=_shared["ncp_prior"],
+        return_stats=True,
+    )
+
+
+def _block_rates(fit_result, where):
+    """
+    Exposure-corrected rate of the block containing each time in `where`.
+
+    Parameters:
+        fit_result (BlockFitResult): Fit of the full photon list or of a resample.
+        where (np.ndarray): Times at which to evaluate the rate.
+
+    Returns:
+        (np.ndarray): Counts / exposure-weighted duration of the block holding each time,
+            the rate the Events fitness uses.
+    """
+    block = np.clip(
+        np.searchsorted(fit_result.edges, where, side="right") - 1,
+        0,
+        fit_result.n_blocks - 1,
+    )
+    return fit_result.counts[block] / fit_result.exposure[block]
+
+
+def bootstrap_change_points(
+    time,
+    exposure,
+    ncp_prior,
+    n_resamples=200,
+    method="bootstrap",
+    n_groups=20,
+    confidence=0.6827,
+    n_workers=None,
+    seed=0,
+):
+    """
+    Estimate the uncertainty of Bayesian Block edges and rates by resampling the photons.
+
+    The photon list is sorted once and shared with the worker processes. Each bootstrap
+    resample draws photons with replacement; each jackknife resample leaves out one of
+    `n_groups` random groups of photons. Every resample is refit with the same
+    ncp_prior, with its own seed spawned from `seed` so results do not depend on the
+    number of workers. Each edge of the original fit is matched to the nearest interior
+    edge of every resample; resamples without an interior edge are left out of the edge
+    errors and counted in 'n_resamples'. Each block rate is matched to the rate of the
+    resample block at the block center. Rates are counts over the exposure-weighted block
+    duration, as in the Events fitness.
+
+    Parameters:
+        time (np.ndarray): Photon arrival times (gap suppressed).
+        exposure (np.ndarray): Exposure correction factor of each photon.
+        ncp_prior (float): Number of change point prior.
+        n_resamples (int): Number of bootstrap resamples (ignored for the jackknife).
+        method (str): "bootstrap" (percentile intervals) or "jackknife" (normal intervals from the jackknife variance).
+        n_groups (int): Number of jackknife groups.
+        confidence (float): Confidence level of the intervals (default 1 sigma).
+        n_workers (int): Number of worker processes. None uses all cores, 1 runs in this process.
+        seed (int): Seed for the resampling.
+
+    Returns:
+        (pd.DataFrame): Interior edges with 'edge', 'lower', 'upper', 'std', and 'n_resamples'
+            (resamples with an interior edge) columns.
+        (pd.DataFrame): Blocks with 'start', 'stop', 'rate', 'rate_lower', 'rate_upper', and 'rate_std' columns.
+    """
+    if method not in ("bootstrap", "jackknife"):
+        raise ValueError("method must be 'bootstrap' or 'jackknife'.")
+
+    # Sort once and merge identical times; every resample reuses these arrays
+    time, cell = np.unique(np.asarray(time, dtype=float), return_inverse=True)
+    exposure = np.bincount(cell, weights=exposure) / np.bincount(cell)
+    n_events = len(cell)
+
+    rng = np.random.default_rng(seed)
+    groups = rng.integers(0, n_groups, n_events) if method == "jackknife" else None
+    if method == "bootstrap":
+        tasks = [
+            ("bootstrap", s) for s in np.random.SeedSequence(seed).spawn(n_resamples)
+        ]
+    else:
+        tasks = [("jackknife", g) for g in range(n_groups)]
+
+    _init_worker(time, cell, exposure, ncp_prior, groups)
+    full_fit = _fit_resample(("full", None))
+    edges = full_fit.edges
+    centers = 0.5 * (edges[:-1] + edges[1:])
+    interior = edges[1:-1]
+
+    if n_workers == 1:
+        results = [_fit_resample(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            initializer=_init_worker,
+            initargs=(time, cell, exposure, ncp_prior, groups),
+        ) as pool:
+            results = list(pool.map(_fit_resample, tasks))
+
+    matched_edges = []
+    rates = np.empty((len(results), len(centers)))
+    for i, fit_result in enumerate(results):
+        candidates = fit_result.edges[1:-1]
+        if len(candidates) > 0:
+            nearest = np.abs(interior[:, None] - candidates[None, :]).argmin(axis=1)
+            matched_edges.append(candidates[nearest])
+        rates[i] = _block_rates(fit_result, centers)
+    if not matched_edges:
+        matched_edges = np.empty((0, len(interior)))
+    matched_edges = np.array(matched_edges)
+    n_matched = len(matched_edges)
+    if n_matched < len(results):
+        print(
+            f"    {len(results) - n_matched} resamples without change points skipped."
+        )
+
+    rate = _block_rates(full_fit, centers)
+
+    if method == "bootstrap":
+        tail = 50 * (1 - confidence)
+        edge_lo, edge_hi = np.percentile(matched_edges, [tail, 100 - tail], axis=0)
+        rate_lo, rate_hi = np.percentile(rates, [tail, 100 - tail], axis=0)
+        edge_std = matched_edges.std(axis=0, ddof=1)
+        rate_std = rates.std(axis=0, ddof=1)
+    else:
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            edge_scale = np.sqrt((n_matched - 1) / n_matched)
+        edge_std = edge_scale * np.sqrt(
+            ((matched_edges - matched_edges.mean(axis=0)) ** 2).sum(axis=0)
+        )
+        scale = np.sqrt((n_groups - 1) / n_groups)
+        rate_std = scale * np.sqrt(((rates - rates.mean(axis=0)) ** 2).sum(axis=0))
+        edge_lo, edge_hi = interior - z * edge_std, interior + z * edge_std
+        rate_lo, rate_hi = rate - z * rate_std, rate + z * rate_std
+
+    edges_df = pd.DataFrame(
+        {
+            "edge": interior,
+            "lower": edge_lo,
+            "upper": edge_hi,
+            "std": edge_std,
+            "n_resamples": n_matched,
+        }
+    )
+    blocks_df = pd.DataFrame(
+        {
+            "start": edges[:-1],
+            "stop": edges[1:],
+            "rate": rate,
+            "rate_lower": rate_lo,
+            "rate_upper": rate_hi,
+            "rate_std": rate_std,
+        }
+    )
+
+    print(f"    Refit {len(results)} {method} resamples of {n_events} events.")
+    return edges_df, blocks_df
@@ -1,68 +1,108 @@
 import pandas as pd
 import numpy as np
 
+from scripts.interval_set import IntervalSet
+
 
 def calculate_average_rate(
     events: pd.DataFrame,
     gti: pd.DataFrame,
     flare_gti=None,
     calculate_average_count_rate=False,
+    intervals=None,
 ):
     """
     Calculate the average count rate during GTI intervals, optionally filtered by flare GTI.
 
+    Each event is assigned the index of the interval holding it (START <= TIME < STOP) with
+    searchsorted, and the per-interval sums are taken with np.bincount in one pass. If the
+    intervals overlap, each one instead sums the events between its searchsorted bounds.
+
     Parameters:
         events (pd.DataFrame): Unified photon event DataFrame with 'TIME' and 'Exposure' columns.
         gti (pd.DataFrame): Common GTI DataFrame with 'START' and 'STOP' columns.
         flare_gti (pd.DataFrame, optional): Flare GTI DataFrame with 'START' and 'STOP' columns.
         calculate_average_count_rate (bool): Whether to calculate average count rates.
+        intervals (pd.DataFrame, optional): Any interval table (intervals may overlap) with 'START' and 'STOP' columns (used instead of gti and flare_gti).
 
     Returns:
-        (pd.DataFrame): Summary DataFrame with 'START', 'STOP', and 'Count Rate'.
+        (pd.DataFrame): Summary DataFrame with 'START', 'STOP', 'Count Rate' (exposure corrected),
+            'Count Rate Error', 'Counts', and 'Mean Exposure', in the order of the intervals.
     """
     if not calculate_average_count_rate:
         print("Skipping average count rate calculation as per configuration.")
         return None
 
     try:
+        # Use user intervals or flare GTI if provided, else default to common GTI
+        if intervals is None:
+            intervals = flare_gti if flare_gti is not None else gti
+
         # Validate inputs
-        if events.empty or gti.empty:
+        if events.empty or intervals.empty:
             raise ValueError("Input events or GTI DataFrame is empty.")
         if not all(col in events.columns for col in ["TIME", "Exposure"]):
             raise ValueError(
                 "Events DataFrame must contain 'TIME' and 'Exposure' columns."
             )
-        if not all(col in gti.columns for col in ["START", "STOP"]):
+        if not all(col in intervals.columns for col in ["START", "STOP"]):
             raise ValueError("GTI DataFrame must contain 'START' and 'STOP' columns.")
 
-        # Use flare GTI if provided, else default to common GTI
-        intervals = flare_gti if flare_gti is not None else gti
-
-        # Results list to collect average count rates for each interval
-        results = []
-
-        for _, interval in intervals.iterrows():
-            start, stop = interval["START"], interval["STOP"]
-            # Filter events within the interval
-            events_in_interval = events[
-                (events["TIME"] >= start) & (events["TIME"] < stop)
-            ]
-
-            if not events_in_interval.empty:
-                # Total corrected exposure is the sum of 1 / Exposure
-                total_corrected_exposure = (1.0 / events_in_interval["Exposure"]).sum()
-                # Calculate interval duration
-                interval_duration = stop - start
-                # Calculate average count rate
-                count_rate = total_corrected_exposure / interval_duration
-            else:
-                count_rate = np.nan  # No events in this interval
-
-            # Append the result
-            results.append({"START": start, "STOP": stop, "Count Rate": count_rate})
-
-        # Convert results to a DataFrame
-        results_df = pd.DataFrame(results)
+        interval_set = IntervalSet.from_df(intervals)
+        starts, stops = interval_set.starts, interval_set.stops
+        times = events["TIME"].to_numpy(dtype=float)
+        exposure = events["Exposure"].to_numpy(dtype=float)
+
+        if interval_set.is_disjoint():
+            # Index of the interval holding each event (-1 if none)
+            idx = interval_set.index(times, closed="left")
+            inside = idx >= 0
+            idx, exposure = idx[inside], exposure[inside]
+
+            # Per-interval sums in one pass
+            n = len(intervals)
+            counts = np.bincount(idx, minlength=n)
+            corrected = np.bincount(idx, weights=1.0 / exposure, minlength=n)
+            corrected_sq = np.bincount(idx, weights=1.0 / exposure**2, minlength=n)
+            exposure_sum = np.bincount(idx, weights=exposure, minlength=n)
+        else:
+            # Overlapping intervals share events: differences of prefix sums over the
+            # time-sorted events at the searchsorted bounds of each interval
+            order = np.argsort(times, kind="stable")
+            times, exposure = times[order], exposure[order]
+            lo = np.searchsorted(times, starts, side="left")
+            hi = np.searchsorted(times, stops, side="left")
+
+            def interval_sums(weights):
+                cumulative = np.concatenate([[0.0], np.cumsum(weights)])
+                return cumulative[hi] - cumulative[lo]
+
+            counts = hi - lo
+            corrected = interval_sums(1.0 / exposure)
+            corrected_sq = interval_sums(1.0 / exposure**2)
+            exposure_sum = interval_sums(exposure)
+
+        interval_duration = interval_set.durations
+        empty = counts == 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Total corrected counts are the sum of 1 / Exposure
+            count_rate = np.where(empty, np.nan, corrected / interval_duration)
+            # Poisson error of the weighted counts
+            count_rate_err = np.where(
+                empty, np.nan, np.sqrt(corrected_sq) / interval_duration
+            )
+            mean_exposure = np.where(empty, np.nan, exposure_sum / counts)
+
+        results_df = pd.DataFrame(
+            {
+                "START": starts,
+                "STOP": stops,
+                "Count Rate": count_rate,
+                "Count Rate Error": count_rate_err,
+                "Counts": counts,
+                "Mean Exposure": mean_exposure,
+            }
+        )
 
         # Log output
         print(f"    Processed {len(results_df)} intervals.")
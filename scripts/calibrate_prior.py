@@ -0,0 +1,294 @@
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from scripts.expo_events import Events
+
+# In-memory cache of critical priors, used when no cache directory is given
+_cache = {}
+
+
+def combine_exposure_profiles(*profiles):
+    """
+    Exposure profile of an event list merged from several modules.
+
+    The detected rate of a merged list follows the sum of the module correction factors,
+    so the combined FRACTION is their mean on the union of the table boundaries (a
+    module without a table entry contributes 0). Only the shape of the profile matters
+    for the simulations.
+
+    Parameters:
+        *profiles (pd.DataFrame): Correction tables with 'TSTART', 'TSTOP', and 'FRACTION' columns.
+
+    Returns:
+        (pd.DataFrame): Combined correction table sorted by TSTART.
+    """
+    cuts = np.unique(
+        np.concatenate(
+            [np.concatenate([p["TSTART"], p["TSTOP"]]) for p in profiles]
+        ).astype(float)
+    )
+    tstart, tstop = cuts[:-1], cuts[1:]
+    mid = 0.5 * (tstart + tstop)
+
+    fraction = np.zeros(len(mid))
+    for profile in profiles:
+        profile = profile.sort_values("TSTART", kind="stable")
+        p_start = profile["TSTART"].to_numpy(dtype=float)
+        p_stop = profile["TSTOP"].to_numpy(dtype=float)
+        idx = np.searchsorted(p_start, mid, side="right") - 1
+        covered = idx >= 0
+        covered[covered] = mid[covered] < p_stop[idx[covered]]
+        fraction[covered] += profile["FRACTION"].to_numpy(dtype=float)[idx[covered]]
+    fraction /= len(profiles)
+
+    keep = fraction > 0
+    return pd.DataFrame(
+        {"TSTART": tstart[keep], "TSTOP": tstop[keep], "FRACTION": fraction[keep]}
+    )
+
+
+def simulate_null_events(n_events, gti, exposure_profile=None, rng=None):
+    """
+    Simulate a constant-rate event list observed through the GTIs and exposure profile.
+
+    The intrinsic source rate is constant, so the detected events follow the exposure
+    correction factor (e.g. live time, PSF, vignetting) inside the GTIs. The times are
+    returned on the gap-suppressed time axis used by the Bayesian Block step.
+
+    Parameters:
+        n_events (int): Number of events to simulate.
+        gti (pd.DataFrame): GTI DataFrame with 'START' and 'STOP' columns.
+        exposure_profile (pd.DataFrame): Correction table with 'TSTART', 'TSTOP', and 'FRACTION' columns (optional, default 1).
+        rng (np.random.Generator): Random number generator (optional).
+
+    Returns:
+        (tuple): Gap-suppressed event times and their exposure correction factors.
+    """
+    rng = np.random.default_rng(rng)
+    seg_start, seg_stop, seg_fraction, seg_shift = _exposure_segments(
+        gti, exposure_profile
+    )
+
+    # Pick a segment with probability proportional to duration x correction factor
+    weights = np.cumsum((seg_stop - seg_start) * seg_fraction)
+    seg = np.searchsorted(weights, rng.uniform(0, weights[-1], n_events), side="right")
+    seg = np.minimum(seg, len(weights) - 1)
+
+    times = seg_start[seg] + rng.uniform(size=n_events) * (seg_stop - seg_start)[seg]
+    times -= seg_shift[seg]
+    order = np.argsort(times)
+    return times[order], seg_fraction[seg][order]
+
+
+def _exposure_segments(gti, exposure_profile):
+    """
+    Split the GTIs into segments of constant correction factor.
+
+    Parameters:
+        gti (pd.DataFrame): GTI DataFrame with 'START' and 'STOP' columns.
+        exposure_profile (pd.DataFrame): Correction table with 'TSTART', 'TSTOP', and 'FRACTION' columns, or None.
+
+    Returns:
+        (tuple): Segment starts, stops, correction factors, and cumulative gap before each segment.
+    """
+    starts = gti["START"].to_numpy(dtype=float)
+    stops = gti["STOP"].to_numpy(dtype=float)
+    cumulative_gap_times = np.insert(np.cumsum(starts[1:] - stops[:-1]), 0, 0)
+
+    if exposure_profile is None or exposure_profile.empty:
+        positive = stops > starts
+        return (
+            starts[positive],
+            stops[positive],
+            np.ones(positive.sum()),
+            cumulative_gap_times[positive],
+        )
+
+    # Cut every GTI at the correction table boundaries inside it
+    tstart = exposure_profile["TSTART"].to_numpy(dtype=float)
+    tstop = exposure_profile["TSTOP"].to_numpy(dtype=float)
+    fraction = exposure_profile["FRACTION"].to_numpy(dtype=float)
+    cuts = np.union1d(tstart, tstop)
+
+    gti_idx = np.searchsorted(starts, cuts, side="right") - 1
+    inside = gti_idx >= 0
+    inside[inside] = (cuts[inside] > starts[gti_idx[inside]]) & (
+        cuts[inside] < stops[gti_idx[inside]]
+    )
+    bounds = np.concatenate([starts, cuts[inside], stops])
+    owner = np.concatenate(
+        [np.arange(len(starts)), gti_idx[inside], np.arange(len(starts))]
+    )
+    order = np.lexsort((bounds, owner))
+    bounds, owner = bounds[order], owner[order]
+    same = owner[1:] == owner[:-1]
+    seg_start, seg_stop, seg_gti = bounds[:-1][same], bounds[1:][same], owner[1:][same]
+
+    # Correction factor of each segment (1.0 where the table has no entry)
+    mid = 0.5 * (seg_start + seg_stop)
+    idx = np.searchsorted(tstart, mid, side="right") - 1
+    matched = idx >= 0
+    matched[matched] = mid[matched] < tstop[idx[matched]]
+    seg_fraction = np.ones(len(mid))
+    seg_fraction[matched] = fraction[idx[matched]]
+
+    positive = seg_stop > seg_start
+    return (
+        seg_start[positive],
+        seg_stop[positive],
+        seg_fraction[positive],
+        cumulative_gap_times[seg_gti][positive],
+    )
+
+
+def critical_ncp_prior(times, exposure, tol=0.05):
+    """
+    Find the smallest ncp_prior for which the Bayesian Block fit has a single block.
+
+    The block statistics are computed once and the prior is bisected, so each step costs
+    one dynamic programming solve. Any prior above the returned value gives no change points.
+
+    Parameters:
+        times (np.ndarray): Sorted photon arrival times.
+        exposure (np.ndarray): Exposure correction factor of each photon.
+        tol (float): Bisection tolerance on ncp_prior.
+
+    Returns:
+        (float): Critical ncp_prior (upper end of the bisection bracket).
+    """
+    fitfunc = Events()
+    _, prefix = fitfunc.prepare(times, ex=exposure)
+
+    def n_blocks(ncp_prior):
+        _, last = fitfunc.solve(prefix, ncp_prior)
+        return len(fitfunc.change_point_indices(last)) - 1
+
+    lo, hi = 0.0, 4.0
+    while n_blocks(hi) > 1:
+        lo, hi = hi, 2 * hi
+    while hi - lo > tol:
+        mid = 0.5 * (lo + hi)
+        if n_blocks(mid) > 1:
+            lo = mid
+        else:
+            hi = mid
+    return hi
+
+
+def _simulate_and_solve(task):
+    """
+    Simulate one null light curve and return its critical ncp_prior.
+
+    Parameters:
+        task (tuple): (seed sequence, n_events, gti, exposure_profile, tol).
+
+    Returns:
+        (float): Critical ncp_prior of the simulated event list.
+    """
+    seed, n_events, gti, exposure_profile, tol = task
+    times, exposure = simulate_null_events(
+        n_events, gti, exposure_profile, np.random.default_rng(seed)
+    )
+    return critical_ncp_prior(times, exposure, tol=tol)
+
+
+def _cache_key(n_events, gti, exposure_profile, n_sims, seed, tol):
+    """
+    Hash the simulation setup: number of events, GTI layout, exposure profile, and trials.
+
+    Returns:
+        (str): Hex digest identifying the calibration.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{n_events}|{n_sims}|{seed}|{tol}".encode())
+    digest.update(gti[["START", "STOP"]].to_numpy(dtype=float).tobytes())
+    if exposure_profile is not None:
+        columns = ["TSTART", "TSTOP", "FRACTION"]
+        digest.update(exposure_profile[columns].to_numpy(dtype=float).tobytes())
+    return digest.hexdigest()
+
+
+def calibrate_ncp_prior(
+    n_events,
+    gti,
+    fp_rate=0.01,
+    exposure_profile=None,
+    n_sims=1000,
+    n_workers=None,
+    seed=0,
+    tol=0.05,
+    cache_dir=None,
+):
+    """
+    Calibrate ncp_prior for a target false positive rate with simulated signal-free data.
+
+    Each trial simulates `n_events` constant-rate events through the observation GTIs and
+    exposure profile and finds the smallest prior that yields no change point. The
+    calibrated ncp_prior is the (1 - fp_rate) quantile of these critical priors, so a
+    fraction `fp_rate` of the null trials would show a spurious change point. Trials run
+    in a process pool with independent, reproducible seeds. Critical priors are cached
+    per (number of events, GTI layout, exposure profile, trials), so other target rates
+    for the same observation are free.
+
+    Parameters:
+        n_events (int): Number of events in the observation.
+        gti (pd.DataFrame): GTI DataFrame with 'START' and 'STOP' columns.
+        fp_rate (float): Target false positive rate.
+        exposure_profile (pd.DataFrame): Correction table with 'TSTART', 'TSTOP', and 'FRACTION' columns (optional).
+        n_sims (int): Number of simulated null light curves.
+        n_workers (int): Number of worker processes. None uses all cores, 1 runs in this process.
+        seed (int): Seed for the simulations.
+        tol (float): Bisection tolerance on ncp_prior.
+        cache_dir (str): Directory for cached calibrations (optional, in-memory cache if None).
+
+    Returns:
+        (float): Calibrated ncp_prior.
+        (pd.DataFrame): Critical ncp_prior of each trial in a 'critical_ncp_prior' column.
+    """
+    key = _cache_key(n_events, gti, exposure_profile, n_sims, seed, tol)
+    cache_file = None if cache_dir is None else os.path.join(cache_dir, f"{key}.json")
+
+    if cache_file is not None and os.path.exists(cache_file):
+        with open(cache_file) as f:
+            critical = np.array(json.load(f)["critical_ncp_prior"])
+        print(f"    Loaded {len(critical)} cached trials from {cache_file}")
+    elif cache_file is None and key in _cache:
+        critical = _cache[key]
+    else:
+        seeds = np.random.SeedSequence(seed).spawn(n_sims)
+        tasks = [(s, n_events, gti, exposure_profile, tol) for s in seeds]
+        if n_workers == 1:
+            critical = np.array([_simulate_and_solve(task) for task in tasks])
+        else:
+            n_workers = n_workers or os.cpu_count()
+            chunksize = max(1, n_sims // (4 * n_workers))
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                critical = np.array(
+                    list(pool.map(_simulate_and_solve, tasks, chunksize=chunksize))
+                )
+
+        if cache_file is None:
+            _cache[key] = critical
+        else:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(cache_file, "w") as f:
+                json.dump(
+                    {
+                        "n_events": int(n_events),
+                        "n_gti": len(gti),
+                        "n_sims": n_sims,
+                        "seed": seed,
+                        "tol": tol,
+                        "critical_ncp_prior": critical.tolist(),
+                    },
+                    f,
+                )
+
+    ncp_prior = float(np.quantile(critical, 1 - fp_rate, method="higher"))
+    print(f"    Calibrated ncp_prior for fp_rate {fp_rate}: {ncp_prior:.3f}")
+
+    return ncp_prior, pd.DataFrame({"critical_ncp_prior": critical})
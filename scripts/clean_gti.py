@@ -1,46 +1,136 @@
 import pandas as pd
 import numpy as np
 
+from scripts.get_event_corr_factor import load_corr_table
+from scripts.interval_set import IntervalSet
+
+
+def _mean_fraction(corr_table, starts, stops):
+    """
+    Time-weighted mean correction FRACTION of the lccorr table inside each interval.
+
+    Parameters:
+        corr_table (pd.DataFrame): Sorted correction table with 'TSTART', 'TSTOP', and 'FRACTION' columns.
+        starts (np.ndarray): Interval start times.
+        stops (np.ndarray): Interval stop times.
+
+    Returns:
+        (np.ndarray): Mean FRACTION of each interval (NaN where the table has no entry).
+    """
+    tstart = corr_table["TSTART"].to_numpy(dtype=float)
+    width = corr_table["TSTOP"].to_numpy(dtype=float) - tstart
+    fraction = corr_table["FRACTION"].to_numpy(dtype=float)
+    cum_weighted = np.concatenate([[0.0], np.cumsum(fraction * width)])
+    cum_covered = np.concatenate([[0.0], np.cumsum(width)])
+
+    def integrals(t):
+        idx = np.searchsorted(tstart, t, side="right") - 1
+        inside = idx >= 0
+        part = np.zeros(len(t))
+        part[inside] = np.clip(t[inside] - tstart[idx[inside]], 0, width[idx[inside]])
+        weighted = np.zeros(len(t))
+        covered = np.zeros(len(t))
+        weighted[inside] = (
+            cum_weighted[idx[inside]] + fraction[idx[inside]] * part[inside]
+        )
+        covered[inside] = cum_covered[idx[inside]] + part[inside]
+        return weighted, covered
+
+    weighted_stop, covered_stop = integrals(stops)
+    weighted_start, covered_start = integrals(starts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (weighted_stop - weighted_start) / (covered_stop - covered_start)
+
 
 def clean_gti(
-    gti: pd.DataFrame, events: pd.DataFrame, threshold=30, starttrim=10, stoptrim=10
+    gti: pd.DataFrame,
+    events: pd.DataFrame,
+    threshold=30,
+    starttrim=10,
+    stoptrim=10,
+    min_rate=None,
+    max_gap=None,
+    corr_table=None,
+    min_fraction=None,
 ):
     """
     Clean GTIs by trimming and filtering based on duration and events.
 
+    Events are counted in every GTI (START <= TIME <= STOP) with searchsorted on the sorted
+    event times. The optional criteria are evaluated in the same pass and add a column each.
+
     Parameters:
-        gti (pd.DataFrame): GTI DataFrame with 'START' and 'STOP' columns.
+        gti (pd.DataFrame): GTI DataFrame with 'START' and 'STOP' columns (not modified).
         events (pd.DataFrame): Events DataFrame with 'TIME' column.
         threshold (float): Minimum duration for a valid GTI (seconds).
         starttrim (float): Seconds to trim from GTI start times.
         stoptrim (float): Seconds to trim from GTI stop times.
+        min_rate (float): Minimum event rate in a GTI (counts/s), adds 'EVENT_RATE' (optional).
+        max_gap (float): Maximum time without events inside a GTI (seconds), adds 'MAX_GAP' (optional).
+        corr_table (pd.DataFrame or str): lccorr table (or file) with 'TSTART', 'TSTOP', and 'FRACTION' columns (optional).
+        min_fraction (float): Minimum mean FRACTION (dead time threshold) of a GTI, needs corr_table, adds 'MEAN_FRACTION' (optional).
 
     Returns:
         (pd.DataFrame): Cleaned GTI DataFrame.
     """
     try:
         # Trim GTI intervals
-        gti["START"] += starttrim
-        gti["STOP"] -= stoptrim
+        trimmed = IntervalSet.from_df(gti).trim(starttrim, stoptrim)
+        valid_gti = gti.copy()
+        valid_gti["START"] = trimmed.starts
+        valid_gti["STOP"] = trimmed.stops
 
         # Calculate GTI durations
-        gti["DURATION"] = gti["STOP"] - gti["START"]
+        valid_gti["DURATION"] = trimmed.durations
 
         # Filter GTIs by duration
-        valid_gti = gti[gti["DURATION"] > threshold]
+        long_enough = trimmed.durations > threshold
+        valid_gti = valid_gti[long_enough]
+        gti_set = trimmed[long_enough]
 
         # Count events within each GTI
-        valid_gti = valid_gti.assign(
-            EVENT_COUNT=valid_gti.apply(
-                lambda row: (
-                    (events["TIME"] >= row["START"]) & (events["TIME"] <= row["STOP"])
-                ).sum(),
-                axis=1,
+        times = events["TIME"].to_numpy(dtype=float)
+        if not np.all(times[1:] >= times[:-1]):
+            times = np.sort(times)
+        starts, stops = gti_set.starts, gti_set.stops
+        lo = np.searchsorted(times, starts, side="left")
+        hi = np.searchsorted(times, stops, side="right")
+        event_count = hi - lo
+        valid_gti = valid_gti.assign(EVENT_COUNT=event_count)
+        keep = event_count > 0
+
+        if min_rate is not None:
+            valid_gti["EVENT_RATE"] = event_count / valid_gti["DURATION"].to_numpy()
+            keep &= valid_gti["EVENT_RATE"].to_numpy() >= min_rate
+
+        if max_gap is not None:
+            # Gaps at the GTI edges; an empty GTI is one gap
+            has_events = event_count > 0
+            gaps = valid_gti["DURATION"].to_numpy(dtype=float).copy()
+            gaps[has_events] = np.maximum(
+                times[lo[has_events]] - starts[has_events],
+                stops[has_events] - times[hi[has_events] - 1],
             )
-        )
 
-        # Retain GTIs with at least one event
-        final_gti = valid_gti[valid_gti["EVENT_COUNT"] > 0]
+            # Gaps between consecutive events of the same GTI
+            idx = gti_set.index(times)
+            same = (idx[1:] >= 0) & (idx[1:] == idx[:-1])
+            np.maximum.at(gaps, idx[1:][same], np.diff(times)[same])
+
+            valid_gti["MAX_GAP"] = gaps
+            keep &= gaps <= max_gap
+
+        if min_fraction is not None:
+            if corr_table is None:
+                raise ValueError("min_fraction needs a corr_table.")
+            if isinstance(corr_table, str):
+                corr_table = load_corr_table(corr_table)
+            mean_fraction = _mean_fraction(corr_table, starts, stops)
+            valid_gti["MEAN_FRACTION"] = mean_fraction
+            keep &= ~(mean_fraction < min_fraction)
+
+        # Retain GTIs with at least one event that pass the optional criteria
+        final_gti = valid_gti[keep]
 
         # Log changes for debugging
         print(f"    GTIs before cleaning: {len(gti)}")
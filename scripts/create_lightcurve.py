@@ -1,7 +1,22 @@
 import numpy as np
 import pandas as pd
 from scripts.find_blocks import upper_limit_gehrels, lower_limit_gehrels
-from scripts.get_binned_corr_factor import get_binned_corr_factor
+from scripts.interval_set import IntervalSet
+
+
+def gti_time_before(times, starts, stops):
+    """
+    Total GTI time before each time.
+
+    Parameters:
+        times (np.ndarray): Times at which to evaluate the GTI time.
+        starts (np.ndarray): Sorted GTI start times.
+        stops (np.ndarray): GTI stop times.
+
+    Returns:
+        (np.ndarray): GTI time elapsed between the first GTI start and each time.
+    """
+    return IntervalSet(starts, stops).exposure_before(times)
 
 
 def generate_lightcurve(
@@ -15,54 +30,107 @@ def generate_lightcurve(
     Generate a regularly binned light curve from filtered event data.
 
     Parameters:
-        events_df (pd.DataFrame): Filtered events with columns ['TIME', 'Energy', 'Exposure'].
+        events_df (pd.DataFrame): Filtered events with columns ['TIME', 'Energy', 'CORRECTION_FACTOR'].
         gti_df (pd.DataFrame): GTI intervals with columns ['START', 'STOP'].
         binsize (int): Time bin size in seconds (default: 100).
-        energy_range (tuple): (Emin, Emax) energy range in keV (default: (3.0, 79.0)).
-        gti_average (bool): Use GTI-based binning if True (default: True).
+        energy_range (tuple): (Emin, Emax) energy range in keV (default: (3.0, 79.0)). None keeps all events.
+        gti_average (bool): Use GTI-based binning if True (default: True). Bins start at each GTI start and are cut at its stop.
 
     Returns:
         (pd.DataFrame): Regularly binned light curve with columns:
-                      ['bin_start', 'bin_end', 'count_rate', 'upper_limit', 'lower_limit'].
+                      ['bin_start', 'bin_end', 'count_rate', 'upper_limit', 'lower_limit', 'counts', 'exposure'].
+                      'exposure' is the GTI time inside each bin, used for the rates.
     """
     # Validate required columns
-    required_columns = ["TIME", "Energy"]
+    required_columns = ["TIME", "Energy"] if energy_range is not None else ["TIME"]
     for col in required_columns:
         if col not in events_df.columns:
             raise ValueError(f"Missing required column: {col}")
 
     # Filter events by energy range
-    filtered_events = events_df[
-        (events_df["Energy"] >= energy_range[0])
-        & (events_df["Energy"] <= energy_range[1])
-    ]
+    if energy_range is None:
+        filtered_events = events_df
+    else:
+        filtered_events = events_df[
+            (events_df["Energy"] >= energy_range[0])
+            & (events_df["Energy"] <= energy_range[1])
+        ]
     if filtered_events.empty:
         raise ValueError("No events found in the specified energy range.")
 
+    # Time-ordered event times and correction factors
+    times = filtered_events["TIME"].to_numpy(dtype=float)
+    all_times = events_df["TIME"].to_numpy(dtype=float)
+    fraction = events_df["CORRECTION_FACTOR"].to_numpy(dtype=float)
+    if not np.all(all_times[1:] >= all_times[:-1]):
+        order = np.argsort(all_times, kind="stable")
+        all_times, fraction = all_times[order], fraction[order]
+    times = np.sort(times)
+
+    starts = gti_df["START"].to_numpy(dtype=float)
+    stops = gti_df["STOP"].to_numpy(dtype=float)
+
     # Define time bins based on GTIs and events
     if gti_average:
-        bins = []
-        for _, gti in gti_df.iterrows():
-            bins += list(np.arange(gti["START"], gti["STOP"], binsize))
-        bins = sorted(set(bins))
+        # Bins start at each GTI start and the last bin of a GTI is cut at its stop
+        n_bins = np.maximum(np.ceil((stops - starts) / binsize).astype(int), 0)
+        gti_idx = np.repeat(np.arange(len(starts)), n_bins)
+        first_bin = np.repeat(np.cumsum(n_bins) - n_bins, n_bins)
+        bin_start = starts[gti_idx] + (np.arange(n_bins.sum()) - first_bin) * binsize
+        bin_end = np.minimum(bin_start + binsize, stops[gti_idx])
     else:
-        observation_start = gti_df["START"].min()
+        observation_start = starts.min()
         observation_stop = max(
-            gti_df["STOP"].max(), events_df["TIME"].max()
+            stops.max(), events_df["TIME"].max()
         )  # Extend to max event time
-        bins = np.arange(observation_start, observation_stop + binsize, binsize)
+        edges = np.arange(observation_start, observation_stop + binsize, binsize)
+        bin_start, bin_end = edges[:-1], edges[1:]
 
-    # Bin the events
-    bin_edges = np.array(bins)
-    event_counts, _ = np.histogram(filtered_events["TIME"], bins=bin_edges)
+    # GTI time inside each bin (partial overlaps count their covered part only)
+    bin_exposure = gti_time_before(bin_end, starts, stops) - gti_time_before(
+        bin_start, starts, stops
+    )
 
-    # Calculate bin durations
-    bin_durations = np.diff(bin_edges)
-    count_rates = event_counts / bin_durations
+    # Remove bins outside GTIs
+    valid = bin_exposure > 0
+    bin_start, bin_end, bin_exposure = (
+        bin_start[valid],
+        bin_end[valid],
+        bin_exposure[valid],
+    )
 
-    # Confidence intervals using Gehrels' method
-    upper_limits = upper_limit_gehrels(0.8413, event_counts) / bin_durations
-    lower_limits = lower_limit_gehrels(0.8413, event_counts) / bin_durations
+    # Bin the events: [start, end), with events at the stop of the last bin included
+    closed = np.append(bin_start[1:] > bin_end[:-1], True)
+    lo = np.searchsorted(times, bin_start, side="left")
+    hi = np.where(
+        closed,
+        np.searchsorted(times, bin_end, side="right"),
+        np.searchsorted(times, bin_end, side="left"),
+    )
+    event_counts = hi - lo
+
+    # Correct for Livetime, vignetting, and PSF completeness: mean factor of the bin events
+    all_lo = np.searchsorted(all_times, bin_start, side="left")
+    all_hi = np.where(
+        closed,
+        np.searchsorted(all_times, bin_end, side="right"),
+        np.searchsorted(all_times, bin_end, side="left"),
+    )
+    cumulative_fraction = np.concatenate([[0.0], np.cumsum(fraction)])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correction_factor = (
+            cumulative_fraction[all_hi] - cumulative_fraction[all_lo]
+        ) / (all_hi - all_lo)
+
+        count_rates = event_counts / bin_exposure / correction_factor
+
+        # Confidence intervals using Gehrels' method
+        upper_limits = (
+            upper_limit_gehrels(0.8413, event_counts) / bin_exposure / correction_factor
+        )
+        lower_limits = (
+            lower_limit_gehrels(0.8413, event_counts) / bin_exposure / correction_factor
+        )
 
     # Set count_rate, upper_limit, and lower_limit to NaN for rows where count_rate = 0.0
     mask_zero_counts = event_counts == 0
@@ -70,58 +138,61 @@ def generate_lightcurve(
     upper_limits[mask_zero_counts] = np.nan
     lower_limits[mask_zero_counts] = np.nan
 
-    # Remove bins outside GTIs (allow partial overlaps)
-    valid_bins = []
-    for start, stop in zip(bin_edges[:-1], bin_edges[1:]):
-        if any((gti_df["START"] < stop) & (gti_df["STOP"] > start)):
-            valid_bins.append((start, stop))
-
-    # Correct for Livetime, vignetting, and PSF completeness for each light curve bin
-    correction_factor = get_binned_corr_factor(events_df, valid_bins)
-
-    count_rates[: len(valid_bins)] /= correction_factor
-    upper_limits[: len(valid_bins)] /= correction_factor
-    lower_limits[: len(valid_bins)] /= correction_factor
-
     # Format as DataFrame
-    valid_bins = np.array(valid_bins)
     lightcurve_df = pd.DataFrame(
         {
-            "bin_start": valid_bins[:, 0],
-            "bin_end": valid_bins[:, 1],
-            "count_rate": count_rates[: len(valid_bins)],
-            "upper_limit": upper_limits[: len(valid_bins)],
-            "lower_limit": lower_limits[: len(valid_bins)],
+            "bin_start": bin_start,
+            "bin_end": bin_end,
+            "count_rate": count_rates,
+            "upper_limit": upper_limits,
+            "lower_limit": lower_limits,
+            "counts": event_counts,
+            "exposure": bin_exposure,
         }
     )
 
-    # Filter out bins longer than the specified binsize - trim in between GTI bins
-    lightcurve_df = lightcurve_df[
-        (lightcurve_df["bin_end"] - lightcurve_df["bin_start"]) <= binsize
-    ]
-
-    print(f"    Light Curve Time Range: {bin_edges[0]} - {bin_edges[-1]}")
+    print(f"    Light Curve Time Range: {bin_start[0]} - {bin_end[-1]}")
     print(
         f"    Event Time Range: {events_df['TIME'].min()} - {events_df['TIME'].max()}"
     )
-    print(f"    Removed {len(valid_bins) - len(lightcurve_df)} oversized bins.")
+    print(f"    Number of bins in GTIs: {len(lightcurve_df)}")
 
     return lightcurve_df
 
 
 def plot_prep(gti_df, bb_df):
+    """
+    Give each GTI-split block segment the rate and limits of the merged block containing it.
+
+    Segments are matched to blocks with an interval join: the start of each segment is
+    searched into the sorted block starts, and the match is kept if the segment also
+    ends inside that block. Segments without a containing block keep their own values.
+
+    Parameters:
+        gti_df (pd.DataFrame): GTI-split blocks with 'start', 'stop', 'rate', 'upperlim', and 'lowerlim' columns.
+        bb_df (pd.DataFrame): Merged blocks with the same columns.
+
+    Returns:
+        (pd.DataFrame): Copy of gti_df with the rates and limits of the containing blocks.
+    """
     plot_frame = gti_df.copy()
-    # Filter events in the current block
-    if not bb_df.empty:
-        for a, row in gti_df.iterrows():
-            row_start = row["start"]
-            row_stop = row["stop"]
-
-            for _, block in bb_df.iterrows():
-                if row_stop <= block["stop"]:
-                    if row_start >= block["start"]:
-                        plot_frame["rate"][a] = block["rate"]
-                        plot_frame["upperlim"][a] = block["upperlim"]
-                        plot_frame["lowerlim"][a] = block["lowerlim"]
+    if bb_df.empty or plot_frame.empty:
+        return plot_frame
+
+    # Sort the blocks by start (stable, so the last of equal starts wins as before)
+    blocks = bb_df.sort_values("start", kind="stable")
+    block_start = blocks["start"].to_numpy()
+    block_stop = blocks["stop"].to_numpy()
+
+    row_start = plot_frame["start"].to_numpy()
+    row_stop = plot_frame["stop"].to_numpy()
+    idx = np.searchsorted(block_start, row_start, side="right") - 1
+    matched = idx >= 0
+    matched[matched] = row_stop[matched] <= block_stop[idx[matched]]
+
+    for col in ["rate", "upperlim", "lowerlim"]:
+        values = plot_frame[col].to_numpy(dtype=float, copy=True)
+        values[matched] = blocks[col].to_numpy(dtype=float)[idx[matched]]
+        plot_frame[col] = values
 
     return plot_frame
@@ -127,3 +127,59 @@ def load_event_file(file_path):
             return df
     except Exception as e:
         raise RuntimeError(f"Failed to load event file {file_path}: {e}")
+
+
+def count_event_rows(file_path):
+    """
+    Read the number of rows in the event extension without loading the event data.
+
+    Parameters:
+        file_path (str): Path to the event FITS file.
+
+    Returns:
+        (int): Number of event rows (NAXIS2 of the first extension).
+    """
+    try:
+        with fits.open(file_path, memmap=True) as hdul:
+            return int(hdul[1].header.get("NAXIS2", 0))
+    except Exception as e:
+        raise RuntimeError(f"Failed to read event count from file {file_path}: {e}")
+
+
+def iter_event_chunks(file_path, chunk_size=1000000):
+    """
+    Read an event file in chunks of rows instead of loading the whole event list.
+
+    The FITS table is memory mapped and only `chunk_size` rows are converted at a time.
+
+    Parameters:
+        file_path (str): Path to the event FITS file.
+        chunk_size (int): Number of event rows per chunk (default 1000000).
+
+    Yields:
+        (pd.DataFrame): Event DataFrame chunk with 'TIME', 'PI', and 'Energy' columns.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer.")
+
+    try:
+        with fits.open(file_path, memmap=True) as hdul:
+            event_data = hdul[1].data
+            n_rows = 0 if event_data is None else len(event_data)
+
+            for lo in range(0, n_rows, chunk_size):
+                rows = event_data[lo : lo + chunk_size]
+
+                # Convert columns to native byte order
+                df = pd.DataFrame(
+                    {
+                        "TIME": np.asarray(rows["TIME"], dtype=np.float64),
+                        "PI": np.asarray(rows["PI"]).astype(np.float64),
+                    }
+                )
+
+                # Calculate Energy
+                df["Energy"] = df["PI"] * 0.04 + 1.6
+                yield df
+    except Exception as e:
+        raise RuntimeError(f"Failed to stream event file {file_path}: {e}")
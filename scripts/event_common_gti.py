@@ -1,4 +1,4 @@
-import pandas as pd
+from scripts.interval_set import IntervalSet
 
 
 def filter_events_with_common_gti(events, gti):
@@ -13,14 +13,9 @@ def filter_events_with_common_gti(events, gti):
         (pd.DataFrame): Filtered event DataFrame with valid observation times.
     """
     try:
-        filtered_events = []
-
-        for _, interval in gti.iterrows():
-            start, stop = interval["START"], interval["STOP"]
-            events_in_gti = events[(events["TIME"] >= start) & (events["TIME"] <= stop)]
-            filtered_events.append(events_in_gti)
-
-        filtered_events = pd.concat(filtered_events, ignore_index=True)
+        # Keep events with START <= TIME <= STOP of a common GTI
+        in_gti = IntervalSet.from_df(gti).contains(events["TIME"].to_numpy())
+        filtered_events = events[in_gti].reset_index(drop=True)
 
         print(f"    Original events: {len(events)}")
         print(f"    Filtered events: {len(filtered_events)}")
@@ -51,7 +51,13 @@ References
 
 from __future__ import annotations
 
+import hashlib
+import json
+import os
+import time
 import warnings
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from inspect import signature
 from typing import TYPE_CHECKING
 
@@ -60,7 +66,7 @@ import numpy as np
 from astropy.utils.exceptions import AstropyUserWarning
 
 if TYPE_CHECKING:
-    from collections.abc import KeysView
+    from collections.abc import Callable, KeysView
     from typing import Literal
 
     from numpy.typing import ArrayLike, NDArray
@@ -69,7 +75,16 @@ if TYPE_CHECKING:
 
 # TODO: implement other fitness functions from appendix C of Scargle 2013
 
-__all__ = ["Events", "FitnessFunc", "PointMeasures", "RegularEvents", "bayesian_blocks"]
+__all__ = [
+    "BlockFitResult",
+    "Events",
+    "FitProgress",
+    "FitnessFunc",
+    "IncrementalBlocks",
+    "PointMeasures",
+    "RegularEvents",
+    "bayesian_blocks",
+]
 
 
 def bayesian_blocks(
@@ -78,8 +93,11 @@ def bayesian_blocks(
     sigma: ArrayLike | float | None = None,
     ex: ArrayLike | None = None,
     fitness: Literal["events", "regular_events", "measures"] | FitnessFunc = "events",
+    return_stats: bool = False,
+    checkpoint: str | None = None,
+    progress: Callable[[dict], None] | None = None,
     **kwargs,
-) -> NDArray[float]:
+) -> NDArray[float] | BlockFitResult:
     r"""Compute optimal segmentation of data with Scargle's Bayesian Blocks.
 
     This is a flexible implementation of the Bayesian Blocks algorithm
@@ -119,14 +137,27 @@ def bayesian_blocks(
         Alternatively, the fitness parameter can be an instance of
         :class:`FitnessFunc` or a subclass thereof.
 
+    return_stats : bool, optional
+        if True, return a :class:`BlockFitResult` with the per-block
+        statistics of the fit instead of the edges alone
+
+    checkpoint : str, optional
+        directory where the state of the fit is saved periodically; rerunning
+        the same fit with the same directory resumes from the last checkpoint
+
+    progress : callable, optional
+        called with a progress report during the fit, see
+        :meth:`FitnessFunc.solve` and :class:`FitProgress`
+
     **kwargs :
         any additional keyword arguments will be passed to the specified
         :class:`FitnessFunc` derived class.
 
     Returns
     -------
-    edges : ndarray
-        array containing the (N+1) edges defining the N bins
+    edges : ndarray or BlockFitResult
+        array containing the (N+1) edges defining the N bins, or the full
+        fit result if ``return_stats`` is True
 
     Examples
     --------
@@ -192,7 +223,88 @@ def bayesian_blocks(
     else:
         raise ValueError("fitness parameter not understood")
 
-    return fitfunc.fit(t, x, sigma, ex)
+    return fitfunc.fit(
+        t,
+        x,
+        sigma,
+        ex,
+        return_stats=return_stats,
+        checkpoint=checkpoint,
+        progress=progress,
+    )
+
+
+@dataclass
+class BlockFitResult:
+    """Bayesian Blocks fit with the statistics of each block.
+
+    All per-block quantities are differences of the prefix sums used by the
+    dynamic programming, so no pass over the data is needed to get them.
+
+    Attributes
+    ----------
+    edges : ndarray
+        the (M+1) edges defining the M optimal blocks
+    counts : ndarray
+        number of events (sum of ``x``) in each block
+    exposure : ndarray
+        exposure-weighted duration of each block (sum of the cell widths)
+    fitness : ndarray
+        fitness contribution of each block, without the prior
+    start_index, stop_index : ndarray
+        each block holds the events ``start_index:stop_index`` of the
+        time-sorted input (data cells for point measures)
+    ncp_prior : float
+        prior on the number of change points used for the fit
+    """
+
+    edges: NDArray[float]
+    counts: NDArray[float]
+    exposure: NDArray[float]
+    fitness: NDArray[float]
+    start_index: NDArray[int]
+    stop_index: NDArray[int]
+    ncp_prior: float
+
+    @property
+    def n_blocks(self) -> int:
+        return len(self.edges) - 1
+
+
+class FitProgress:
+    """Progress callback for :func:`bayesian_blocks` that logs each report.
+
+    The reports are printed and kept, so the final one can be added to a run
+    summary after the fit.
+
+    Parameters
+    ----------
+    verbose : bool, optional
+        if True, print each report
+
+    Attributes
+    ----------
+    reports : list of dict
+        every report received, see :meth:`FitnessFunc.solve`
+    """
+
+    def __init__(self, verbose: bool = True) -> None:
+        self.verbose = verbose
+        self.reports = []
+
+    def __call__(self, report: dict) -> None:
+        self.reports.append(report)
+        if self.verbose:
+            print(
+                f"    Cell {report['R']}/{report['N']}: "
+                f"{report['elapsed']:.1f} s elapsed, ~{report['eta']:.1f} s left, "
+                f"{report['n_blocks']} blocks"
+            )
+
+    @property
+    def last(self) -> dict | None:
+        """Most recent report, None before the first one."""
+        return self.reports[-1] if self.reports else None
 
 
 class FitnessFunc:
@@ -223,6 +335,15 @@ class FitnessFunc:
       Specify the form of the prior given the false-alarm probability ``p0``
       (See [1]_ for details).
 
+    With ``n_threads`` > 1, :meth:`solve` splits the candidate starts of
+    each last block into up to ``n_threads`` chunks of at least
+    ``min_chunk_size`` cells and evaluates them in a thread pool. NumPy
+    releases the GIL in the fitness kernels, so the chunks run in
+    parallel; the per-chunk maxima are reduced
+    in order, so the result is identical to the serial fit. The threads only
+    pay off with several free cores and long fits; time them with
+    ``scripts/benchmark_threads.py`` before enabling them.
+
     For examples of implemented fitness functions, see :class:`Events`,
     :class:`RegularEvents`, and :class:`PointMeasures`.
 
@@ -232,15 +353,22 @@ class FitnessFunc:
        https://ui.adsabs.harvard.edu/abs/2013ApJ...764..167S
     """
 
+    # smallest number of candidate starts evaluated by one thread: a chunk costs
+    # ~20 us of fixed kernel overhead plus ~20 us to dispatch, against ~10 ns per
+    # start, so below ~3e4 starts the dispatch outweighs the parallel work
+    min_chunk_size = 32768
+
     def __init__(
         self,
         p0: float = 0.05,
         gamma: float | None = None,
         ncp_prior: float | None = None,
+        n_threads: int | None = None,
     ) -> None:
         self.p0 = p0
         self.gamma = gamma
         self.ncp_prior = ncp_prior
+        self.n_threads = n_threads
 
     def validate_input(
         self,
@@ -268,12 +396,24 @@ class FitnessFunc:
         """
         # validate array input
         t = np.asarray(t, dtype=float)
-
-        # find unique values of t
-        t = np.array(t)
         if t.ndim != 1:
             raise ValueError("t must be a one-dimensional array")
-        unq_t, unq_ind, unq_inv = np.unique(t, return_index=True, return_inverse=True)
+
+        # sort only if needed: pipeline times are usually already sorted, so
+        # an O(N) check replaces the O(N log N) sort of np.unique
+        order = None
+        if np.any(t[1:] < t[:-1]):
+            order = np.argsort(t, kind="stable")
+            t = t[order]
+
+        # runs of repeated times, found from the differences of sorted times
+        new_run = np.empty(len(t), dtype=bool)
+        new_run[:1] = True
+        np.not_equal(t[1:], t[:-1], out=new_run[1:])
+        repeats = not new_run.all()
+        if repeats:
+            run_starts = np.flatnonzero(new_run)
+            run_counts = np.diff(np.append(run_starts, len(t)))
 
         # if x is not specified, x will be counts at each time
         if x is None:
@@ -282,12 +422,10 @@ class FitnessFunc:
             else:
                 sigma = 1.0
 
-            if len(unq_t) == len(t):
-                x = np.ones_like(t)
+            if repeats:
+                x = run_counts.astype(float)
             else:
-                x = np.bincount(unq_inv)
-
-            t = unq_t
+                x = np.ones_like(t)
 
         # if x is specified, then we need to simultaneously sort t and x
         else:
@@ -296,14 +434,14 @@ class FitnessFunc:
 
             if x.shape not in [(), (1,), (t.size,)]:
                 raise ValueError("x does not match shape of t")
-            x += np.zeros_like(t)
+            x = x + np.zeros_like(t)
 
-            if len(unq_t) != len(t):
+            if repeats:
                 raise ValueError(
                     "Repeated values in t not supported when x is specified"
                 )
-            t = unq_t
-            x = x[unq_ind]
+            if order is not None:
+                x = x[order]
 
         # verify the given sigma value
         if sigma is None:
@@ -313,15 +451,22 @@ class FitnessFunc:
             if sigma.shape not in [(), (1,), (t.size,)]:
                 raise ValueError("sigma does not match the shape of x")
 
-        # validate array input
-        ex = np.asarray(ex, dtype=float)
-
-        # if ex is not specified, x will be counts at each time
+        # exposure of each point; repeated times get the mean exposure of
+        # their run
         if ex is None:
-            if len(unq_t) == len(t):
-                ex = np.ones_like(t)
-            else:
-                ex = np.bincount(unq_inv)
+            ex = np.ones(len(run_starts) if repeats else len(t))
+        else:
+            ex = np.asarray(ex, dtype=float)
+            if ex.shape not in [(), (1,), (t.size,)]:
+                raise ValueError("ex does not match shape of t")
+            ex = ex + np.zeros_like(t)
+            if order is not None:
+                ex = ex[order]
+            if repeats:
+                ex = np.add.reduceat(ex, run_starts) / run_counts
+
+        if repeats:
+            t = t[run_starts]
 
         return t, x, sigma, ex
 
@@ -366,7 +511,10 @@ class FitnessFunc:
         x: ArrayLike | None = None,
         sigma: ArrayLike | float | None = None,
         ex: ArrayLike | None = None,
-    ) -> NDArray[float]:
+        return_stats: bool = False,
+        checkpoint: str | None = None,
+        progress: Callable[[dict], None] | None = None,
+    ) -> NDArray[float] | BlockFitResult:
         """Fit the Bayesian Blocks model given the specified fitness function.
 
         Parameters
@@ -378,23 +526,318 @@ class FitnessFunc:
         sigma : array-like or float, optional
             data errors
         ex : array-like, optional
+        return_stats : bool, optional
+            if True, also return the per-block statistics, see
+            :meth:`block_stats`
+        checkpoint : str, optional
+            directory where the DP state is saved during the fit, see
+            :meth:`solve`
+        progress : callable, optional
+            called with a progress report during the fit, see :meth:`solve`
 
         Returns
         -------
-        edges : ndarray
-            array containing the (M+1) edges defining the M optimal bins
+        edges : ndarray or BlockFitResult
+            array containing the (M+1) edges defining the M optimal bins, or
+            the full fit result if ``return_stats`` is True
+        """
+        t, prefix = self.prepare(t, x, sigma, ex)
+
+        # Compute ncp_prior if not defined
+        N = len(t)
+        if self.ncp_prior is None:
+            ncp_prior = self.compute_ncp_prior(N)
+        else:
+            ncp_prior = self.ncp_prior
+
+        best, last = self.solve(
+            prefix, ncp_prior, checkpoint=checkpoint, progress=progress
+        )
+        change_points = self.change_point_indices(last)
+
+        if return_stats:
+            return self.block_stats(t, prefix, change_points, ncp_prior)
+        return t[change_points]
+
+    def block_stats(
+        self,
+        t: NDArray[float],
+        prefix: dict[str, NDArray[float]],
+        change_points: NDArray[int],
+        ncp_prior: float,
+    ) -> BlockFitResult:
+        """Per-block statistics of a fit from the prefix sums.
+
+        Parameters
+        ----------
+        t : ndarray
+            validated data times from :meth:`prepare`
+        prefix : dict
+            prefix sums from :meth:`prepare`
+        change_points : ndarray
+            change point indices from :meth:`change_point_indices`
+        ncp_prior : float
+            prior on the number of change points
+
+        Returns
+        -------
+        result : BlockFitResult
+            edges and statistics of each block
+        """
+        # block j holds the cells bounds[j]:bounds[j + 1]
+        bounds = change_points.copy()
+        bounds[-1] = len(t)
+        block_sums = {key: S[bounds[1:]] - S[bounds[:-1]] for key, S in prefix.items()}
+
+        if "N_k" in prefix:
+            index = np.rint(prefix["N_k"][bounds]).astype(int)
+        else:
+            index = bounds
+        zeros = np.zeros(len(bounds) - 1)
+
+        return BlockFitResult(
+            edges=t[change_points],
+            counts=block_sums.get("N_k", np.diff(bounds).astype(float)),
+            exposure=block_sums.get("T_k", zeros),
+            fitness=self.fitness(**block_sums),
+            start_index=index[:-1],
+            stop_index=index[1:],
+            ncp_prior=ncp_prior,
+        )
+
+    def prepare(
+        self,
+        t: ArrayLike,
+        x: ArrayLike | None = None,
+        sigma: ArrayLike | float | None = None,
+        ex: ArrayLike | None = None,
+    ) -> tuple[NDArray[float], dict[str, NDArray[float]]]:
+        """Validate the data and precompute the block statistics of the fit.
+
+        The returned prefix sums do not depend on the prior, so they can be
+        shared by several calls to :meth:`solve` with different priors.
+
+        Parameters
+        ----------
+        t : array-like
+            data times (one dimensional, length N)
+        x : array-like, optional
+            data values
+        sigma : array-like or float, optional
+            data errors
+        ex : array-like, optional
+            exposure factor of each data point
+
+        Returns
+        -------
+        t, prefix : ndarray, dict
+            validated data times and the prefix sums from :meth:`prefix_sums`
         """
         t, x, sigma, ex = self.validate_input(t, x, sigma, ex)
 
-        # compute values needed for computation, below
-        if "a_k" in self._fitness_args:
-            ak_raw = np.ones_like(x) / sigma**2
-        if "b_k" in self._fitness_args:
-            bk_raw = x / sigma**2
-        if "c_k" in self._fitness_args:
-            ck_raw = x * x / sigma**2
+        # exposure-weighted width of each data cell and the prefix sums of
+        # the quantities entering the fitness function
+        widths = self.cell_widths(t, ex)
+        prefix = self.prefix_sums(x, sigma, widths)
+        return t, prefix
+
+    def solve(
+        self,
+        prefix: dict[str, NDArray[float]],
+        ncp_prior: float,
+        checkpoint: str | None = None,
+        checkpoint_every: int = 10000,
+        progress: Callable[[dict], None] | None = None,
+        progress_every: int = 10000,
+    ) -> tuple[NDArray[float], NDArray[int]]:
+        """Run the dynamic programming recursion for one prior.
+
+        With ``checkpoint``, ``best`` and ``last`` live in memory-mapped
+        ``.npy`` files in that directory, and ``state.json`` records the
+        next cell to process and a hash of the prefix sums and prior. A
+        later call with the same inputs and directory resumes from the last
+        saved cell; a call with other inputs starts over.
+
+        With ``progress``, the callable is called every ``progress_every``
+        cells and once at the end with a dict holding ``R`` (cells done),
+        ``N``, ``elapsed`` and ``eta`` (seconds, from the quadratic cost of
+        the recursion), ``n_blocks`` (blocks of the optimal fit of the cells
+        done) and ``candidates`` (block starts evaluated by this call).
+
+        Parameters
+        ----------
+        prefix : dict
+            prefix sums from :meth:`prepare` or :meth:`prefix_sums`
+        ncp_prior : float
+            prior on the number of change points
+        checkpoint : str, optional
+            directory holding the checkpoint of the recursion
+        checkpoint_every : int, optional
+            number of cells between two checkpoints
+        progress : callable, optional
+            called with a progress report
+        progress_every : int, optional
+            number of cells between two progress reports
+
+        Returns
+        -------
+        best, last : ndarray
+            optimal fitness of the data ending at each cell, and the start
+            of the optimal last block of the data ending at each cell
+        """
+        # arrays to store the best configuration
+        N = len(next(iter(prefix.values()))) - 1
+        if checkpoint is None:
+            best = np.zeros(N, dtype=float)
+            last = np.zeros(N, dtype=int)
+            R_start = 0
+        else:
+            key = self._checkpoint_key(prefix, ncp_prior)
+            best, last, R_start = self._open_checkpoint(checkpoint, key, N)
 
-        # create length-(N + 1) array of cell edges
+        # ----------------------------------------------------------------
+        # Start with first data cell; add one cell at each iteration
+        # ----------------------------------------------------------------
+        t_start = time.perf_counter()
+        pool = None
+        if self.n_threads is not None and self.n_threads > 1:
+            # the calling thread evaluates one chunk itself
+            pool = ThreadPoolExecutor(max_workers=self.n_threads - 1)
+        try:
+            for R in range(R_start, N):
+                last[R], best[R] = self.best_last_block(
+                    prefix, best, R, ncp_prior, pool=pool
+                )
+                if checkpoint is not None and (R + 1) % checkpoint_every == 0:
+                    self._save_checkpoint(checkpoint, key, best, last, R + 1)
+                if progress is not None and (R + 1) % progress_every == 0:
+                    progress(self._progress_report(last, R + 1, R_start, t_start))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        if checkpoint is not None:
+            self._save_checkpoint(checkpoint, key, best, last, N)
+        if progress is not None and (N % progress_every != 0 or N == R_start):
+            progress(self._progress_report(last, N, R_start, t_start))
+        if checkpoint is not None:
+            best, last = np.array(best), np.array(last)
+        return best, last
+
+    @staticmethod
+    def _progress_report(
+        last: NDArray[int], R: int, R_start: int, t_start: float
+    ) -> dict:
+        """Progress of a recursion that has processed cells ``0..R-1``."""
+        N = len(last)
+        elapsed = time.perf_counter() - t_start
+
+        # the step for cell r evaluates r + 1 candidate starts
+        candidates = (R * (R + 1) - R_start * (R_start + 1)) // 2
+        remaining = (N * (N + 1) - R * (R + 1)) // 2
+        eta = elapsed * remaining / candidates if candidates > 0 else 0.0
+
+        # blocks of the optimal fit of cells 0..R-1
+        n_blocks = 0
+        ind = R
+        while ind > 0:
+            ind = last[ind - 1]
+            n_blocks += 1
+
+        return {
+            "R": R,
+            "N": N,
+            "elapsed": elapsed,
+            "eta": eta,
+            "n_blocks": n_blocks,
+            "candidates": candidates,
+        }
+
+    def _checkpoint_key(
+        self, prefix: dict[str, NDArray[float]], ncp_prior: float
+    ) -> str:
+        """Hash identifying the inputs of a recursion."""
+        digest = hashlib.sha256()
+        digest.update(type(self).__name__.encode())
+        digest.update(np.float64(ncp_prior).tobytes())
+        # fitness parameters (dt, p0, gamma, ...); the threading does not change the fit
+        params = [
+            (name, getattr(self, name, None))
+            for name in signature(type(self).__init__).parameters
+            if name not in ("self", "n_threads")
+        ]
+        digest.update(repr(params).encode())
+        for key in sorted(prefix):
+            digest.update(key.encode())
+            digest.update(np.ascontiguousarray(prefix[key], dtype=float).tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _open_checkpoint(
+        checkpoint: str, key: str, N: int
+    ) -> tuple[NDArray[float], NDArray[int], int]:
+        """Open the checkpoint files, resuming if they match the inputs."""
+        os.makedirs(checkpoint, exist_ok=True)
+        state_file = os.path.join(checkpoint, "state.json")
+        best_file = os.path.join(checkpoint, "best.npy")
+        last_file = os.path.join(checkpoint, "last.npy")
+
+        if os.path.exists(state_file):
+            with open(state_file) as f:
+                state = json.load(f)
+            if state.get("hash") == key and state.get("N") == N:
+                best = np.lib.format.open_memmap(best_file, mode="r+")
+                last = np.lib.format.open_memmap(last_file, mode="r+")
+                return best, last, int(state["R"])
+
+        # claim the directory before the arrays of another fit are overwritten
+        FitnessFunc._write_state(checkpoint, key, N, 0)
+        best = np.lib.format.open_memmap(best_file, mode="w+", dtype=float, shape=(N,))
+        last = np.lib.format.open_memmap(last_file, mode="w+", dtype=int, shape=(N,))
+        return best, last, 0
+
+    @staticmethod
+    def _save_checkpoint(
+        checkpoint: str,
+        key: str,
+        best: NDArray[float],
+        last: NDArray[int],
+        R: int,
+    ) -> None:
+        """Flush the DP arrays, then record that cells ``0..R-1`` are done."""
+        best.flush()
+        last.flush()
+        FitnessFunc._write_state(checkpoint, key, len(best), R)
+
+    @staticmethod
+    def _write_state(checkpoint: str, key: str, N: int, R: int) -> None:
+        """Atomically replace ``state.json`` of a checkpoint directory."""
+        state_file = os.path.join(checkpoint, "state.json")
+        with open(state_file + ".tmp", "w") as f:
+            json.dump({"R": R, "N": N, "hash": key}, f)
+        os.replace(state_file + ".tmp", state_file)
+
+    @staticmethod
+    def cell_widths(t: NDArray[float], ex: NDArray[float]) -> NDArray[float]:
+        """Exposure-weighted width of the data cell around each point.
+
+        The cell of each point extends half way to its neighbours (only to
+        one side for the first and last point), and its width is multiplied
+        by the exposure factor ``ex`` of the point.
+
+        Parameters
+        ----------
+        t : ndarray
+            sorted, unique data times (length N >= 2)
+        ex : ndarray or float
+            exposure factor of each point
+
+        Returns
+        -------
+        widths : ndarray
+            length-N array of exposure-weighted cell widths
+        """
+        # create length-N array of cell widths
         # edges = np.concatenate([t[:1], 0.5 * (t[1:] + t[:-1]), t[-1:]]) #ORIGINAL
         nbpts = len(t)
         edges = np.concatenate(
@@ -407,61 +850,157 @@ class FitnessFunc:
         edges *= ex
         # edges = np.concatenate([t[:1], 0.5 * (t[1:] + t[:-1])])
         # edges=np.concatenate([t[:1]*ex[:1], (0.5 * (t[1:] + t[:-1]))*(ex[-1]), t[-1:]*ex[-1:]])
-        # block_length = (t[-1] - edges) #ORIGINAL
+        return edges
 
-        block_length = np.sum(edges) - np.concatenate(([0.0], np.cumsum(edges)))
+    def prefix_sums(
+        self,
+        x: NDArray[float],
+        sigma: NDArray[float] | float,
+        widths: NDArray[float],
+    ) -> dict[str, NDArray[float]]:
+        """Prefix sums of the per-cell quantities used by the fitness function.
 
-        # arrays to store the best configuration
-        N = len(t)
-        best = np.zeros(N, dtype=float)
-        last = np.zeros(N, dtype=int)
+        The value of a fitness argument for the block of cells ``k..R`` is
+        ``S[R + 1] - S[k]``, where ``S`` is the length-(N + 1) prefix sum
+        returned for that argument (eqs. 31-33 of Scargle 2013 for
+        ``a_k``, ``b_k`` and ``c_k``).
 
-        # Compute ncp_prior if not defined
-        if self.ncp_prior is None:
-            ncp_prior = self.compute_ncp_prior(N)
-        else:
-            ncp_prior = self.ncp_prior
+        Parameters
+        ----------
+        x : ndarray
+            data values (counts for event data)
+        sigma : ndarray or float
+            data errors
+        widths : ndarray
+            exposure-weighted cell widths, see :meth:`cell_widths`
 
-        # ----------------------------------------------------------------
-        # Start with first data cell; add one cell at each iteration
-        # ----------------------------------------------------------------
-        for R in range(N):
-            # Compute fit_vec : fitness of putative last block (end at R)
-            kwds = {}
+        Returns
+        -------
+        prefix : dict
+            prefix sums keyed by fitness argument name
+        """
+        per_cell = {}
 
-            # T_k: width/duration of each block
-            if "T_k" in self._fitness_args:
-                kwds["T_k"] = block_length[: (R + 1)] - block_length[R + 1]
+        # T_k: width/duration of each block
+        if "T_k" in self._fitness_args:
+            per_cell["T_k"] = widths
 
-            # N_k: number of elements in each block
-            if "N_k" in self._fitness_args:
-                kwds["N_k"] = np.cumsum(x[: (R + 1)][::-1])[::-1]
+        # N_k: number of elements in each block
+        if "N_k" in self._fitness_args:
+            per_cell["N_k"] = x
 
-            # a_k: eq. 31
-            if "a_k" in self._fitness_args:
-                kwds["a_k"] = 0.5 * np.cumsum(ak_raw[: (R + 1)][::-1])[::-1]
+        # a_k: eq. 31
+        if "a_k" in self._fitness_args:
+            per_cell["a_k"] = 0.5 * np.ones_like(x) / sigma**2
 
-            # b_k: eq. 32
-            if "b_k" in self._fitness_args:
-                kwds["b_k"] = -np.cumsum(bk_raw[: (R + 1)][::-1])[::-1]
+        # b_k: eq. 32
+        if "b_k" in self._fitness_args:
+            per_cell["b_k"] = -x / sigma**2
 
-            # c_k: eq. 33
-            if "c_k" in self._fitness_args:
-                kwds["c_k"] = 0.5 * np.cumsum(ck_raw[: (R + 1)][::-1])[::-1]
+        # c_k: eq. 33
+        if "c_k" in self._fitness_args:
+            per_cell["c_k"] = 0.5 * x * x / sigma**2
 
-            # evaluate fitness function
-            fit_vec = self.fitness(**kwds)
+        return {
+            key: np.concatenate([[0.0], np.cumsum(value, dtype=float)])
+            for key, value in per_cell.items()
+        }
 
-            A_R = fit_vec - ncp_prior
-            A_R[1:] += best[:R]
+    def best_last_block(
+        self,
+        prefix: dict[str, NDArray[float]],
+        best: NDArray[float],
+        R: int,
+        ncp_prior: float,
+        pool: ThreadPoolExecutor | None = None,
+    ) -> tuple[int, float]:
+        """Find the optimal start of the last block of the data ending at cell ``R``.
 
-            i_max = np.argmax(A_R)
-            last[R] = i_max
-            best[R] = A_R[i_max]
+        Parameters
+        ----------
+        prefix : dict
+            prefix sums from :meth:`prefix_sums` (at least ``R + 2`` long)
+        best : ndarray
+            optimal fitness of the data ending at each cell before ``R``
+        R : int
+            index of the last cell
+        ncp_prior : float
+            prior on the number of change points
+        pool : ThreadPoolExecutor, optional
+            thread pool evaluating chunks of the candidate starts in parallel
 
-        # ----------------------------------------------------------------
-        # Now find changepoints by iteratively peeling off the last block
-        # ----------------------------------------------------------------
+        Returns
+        -------
+        i_max, best_R : int, float
+            start of the optimal last block and the optimal total fitness
+        """
+        n_chunks = (
+            1 if pool is None else min(self.n_threads, (R + 1) // self.min_chunk_size)
+        )
+        if n_chunks <= 1:
+            return self._best_in_range(prefix, best, R, ncp_prior, 0, R + 1)
+
+        # the calling thread evaluates the first chunk while the pool runs the rest
+        bounds = np.linspace(0, R + 1, n_chunks + 1).astype(int)
+        futures = [
+            pool.submit(
+                self._best_in_range,
+                prefix,
+                best,
+                R,
+                ncp_prior,
+                bounds[k],
+                bounds[k + 1],
+            )
+            for k in range(1, n_chunks)
+        ]
+        chunks = [self._best_in_range(prefix, best, R, ncp_prior, 0, bounds[1])]
+        chunks += [future.result() for future in futures]
+
+        # first chunk holding the maximum, as np.argmax over all starts
+        k_max = np.argmax([value for _, value in chunks])
+        return chunks[k_max]
+
+    def _best_in_range(
+        self,
+        prefix: dict[str, NDArray[float]],
+        best: NDArray[float],
+        R: int,
+        ncp_prior: float,
+        lo: int,
+        hi: int,
+    ) -> tuple[int, float]:
+        """Best start of the last block ending at cell ``R`` among starts ``lo..hi-1``."""
+        # Compute fit_vec : fitness of putative last block (end at R)
+        kwds = {key: S[R + 1] - S[lo:hi] for key, S in prefix.items()}
+
+        # evaluate fitness function
+        fit_vec = self.fitness(**kwds)
+
+        # a block starting at i > 0 follows the best fit of the cells before i
+        A_R = fit_vec - ncp_prior
+        first = max(lo, 1)
+        A_R[first - lo :] += best[first - 1 : hi - 1]
+
+        i_max = np.argmax(A_R)
+        return lo + i_max, A_R[i_max]
+
+    @staticmethod
+    def change_point_indices(last: NDArray[int]) -> NDArray[int]:
+        """Find the change points by iteratively peeling off the last block.
+
+        Parameters
+        ----------
+        last : ndarray
+            start of the optimal last block of the data ending at each cell
+
+        Returns
+        -------
+        change_points : ndarray
+            indices of the cells at the block edges; the final entry is the
+            last cell
+        """
+        N = len(last)
         change_points = np.zeros(N, dtype=int)
         i_cp = N
         ind = N
@@ -478,7 +1017,7 @@ class FitnessFunc:
         # the last one will be the end of the array so make end of array
         change_points[-1] -= 1
 
-        return t[change_points]
+        return change_points
 
 
 class Events(FitnessFunc):
@@ -504,6 +1043,9 @@ class Events(FitnessFunc):
         above, using the definition :math:`{\tt ncp\_prior} = -\ln({\tt
         gamma})`.
         If ``ncp_prior`` is specified, ``gamma`` and ``p0`` is ignored.
+    n_threads : int, optional
+        Number of threads evaluating the candidate block starts of each step
+        of the fit. None or 1 runs serially.
     """
 
     def fitness(self, N_k: NDArray[float], T_k: NDArray[float]) -> NDArray[float]:
@@ -559,6 +1101,9 @@ class RegularEvents(FitnessFunc):
         above, using the definition :math:`{\tt ncp\_prior} = -\ln({\tt
         gamma})`.  If ``ncp_prior`` is specified, ``gamma`` and ``p0`` are
         ignored.
+    n_threads : int, optional
+        Number of threads evaluating the candidate block starts of each step
+        of the fit. None or 1 runs serially.
     """
 
     def __init__(
@@ -567,20 +1112,22 @@ class RegularEvents(FitnessFunc):
         p0: float = 0.05,
         gamma: float | None = None,
         ncp_prior: float | None = None,
+        n_threads: int | None = None,
     ) -> None:
         self.dt = dt
-        super().__init__(p0, gamma, ncp_prior)
+        super().__init__(p0, gamma, ncp_prior, n_threads)
 
     def validate_input(
         self,
         t: ArrayLike,
         x: ArrayLike | None = None,
         sigma: float | ArrayLike | None = None,
-    ) -> tuple[NDArray[float], NDArray[float], NDArray[float]]:
-        t, x, sigma = super().validate_input(t, x, sigma)
+        ex: ArrayLike | None = None,
+    ) -> tuple[NDArray[float], NDArray[float], NDArray[float], NDArray[float]]:
+        t, x, sigma, ex = super().validate_input(t, x, sigma, ex)
         if not np.all((x == 0) | (x == 1)):
             raise ValueError("Regular events must have only 0 and 1 in x")
-        return t, x, sigma
+        return t, x, sigma, ex
 
     def fitness(self, T_k: NDArray[float], N_k: NDArray[float]) -> NDArray[float]:
         # Eq. C23 of Scargle 2013
@@ -619,6 +1166,9 @@ class PointMeasures(FitnessFunc):
         above, using the definition :math:`{\tt ncp\_prior} = -\ln({\tt
         gamma})`.  If ``ncp_prior`` is specified, ``gamma`` and ``p0`` are
         ignored.
+    n_threads : int, optional
+        Number of threads evaluating the candidate block starts of each step
+        of the fit. None or 1 runs serially.
     """
 
     def __init__(
@@ -626,8 +1176,9 @@ class PointMeasures(FitnessFunc):
         p0: float = 0.05,
         gamma: float | None = None,
         ncp_prior: float | None = None,
+        n_threads: int | None = None,
     ) -> None:
-        super().__init__(p0, gamma, ncp_prior)
+        super().__init__(p0, gamma, ncp_prior, n_threads)
 
     def fitness(self, a_k: NDArray[float], b_k: ArrayLike) -> NDArray[float]:
         # eq. 41 from Scargle 2013
@@ -638,7 +1189,232 @@ class PointMeasures(FitnessFunc):
         t: ArrayLike,
         x: ArrayLike | None,
         sigma: float | ArrayLike | None,
-    ) -> tuple[NDArray[float], NDArray[float], NDArray[float]]:
+        ex: ArrayLike | None = None,
+    ) -> tuple[NDArray[float], NDArray[float], NDArray[float], NDArray[float]]:
         if x is None:
             raise ValueError("x must be specified for point measures")
-        return super().validate_input(t, x, sigma)
+        return super().validate_input(t, x, sigma, ex)
+
+
+class IncrementalBlocks:
+    r"""Incremental Bayesian Blocks fit of event data arriving in batches.
+
+    The dynamic programming state (``best``, ``last`` and the prefix sums of
+    counts and exposure-weighted cell widths) is kept between calls, so each
+    :meth:`update` only extends the DP over the new photons instead of
+    refitting from scratch. The segmentation of all data received so far is
+    identical to a batch :func:`bayesian_blocks` fit of the same data.
+
+    The width of the most recent cell depends on the next photon, so the DP
+    is committed up to the second to last cell and the final cell is
+    evaluated on demand by :meth:`change_points`.
+
+    This supports the triggering use case mentioned for :class:`Events`:
+    :meth:`update` reports whether a new change point appeared, and the
+    optional ``on_trigger`` callback is called with the new edges. The prior
+    must be fixed for an incremental fit, so use ``ncp_prior`` or ``gamma``
+    calibrated on signal-free data rather than ``p0``.
+
+    Parameters
+    ----------
+    fitness : str or object
+        ``'events'`` or a :class:`FitnessFunc` instance whose fitness only
+        depends on ``N_k`` and ``T_k``
+    on_trigger : callable, optional
+        called as ``on_trigger(fitter, new_edges)`` when an update creates
+        new change points
+    **kwargs :
+        passed to the fitness class when ``fitness`` is a string or class,
+        e.g. ``ncp_prior`` or ``gamma``
+
+    Examples
+    --------
+    >>> fitter = IncrementalBlocks(ncp_prior=6.0)
+    >>> for times, exposures in batches:  # doctest: +SKIP
+    ...     if fitter.update(times, exposures):
+    ...         print("flare trigger", fitter.change_points())
+    """
+
+    def __init__(
+        self,
+        fitness: Literal["events"] | FitnessFunc = "events",
+        on_trigger=None,
+        **kwargs,
+    ) -> None:
+        fitness = {"events": Events}.get(fitness, fitness)
+        if type(fitness) is type and issubclass(fitness, FitnessFunc):
+            fitfunc = fitness(**kwargs)
+        elif isinstance(fitness, FitnessFunc):
+            fitfunc = fitness
+        else:
+            raise ValueError("fitness parameter not understood")
+
+        if not set(fitfunc._fitness_args) <= {"N_k", "T_k"}:
+            raise ValueError("incremental fits only support event fitness functions")
+
+        if fitfunc.ncp_prior is not None:
+            self.ncp_prior = fitfunc.ncp_prior
+        elif fitfunc.gamma is not None:
+            self.ncp_prior = -np.log(fitfunc.gamma)
+        else:
+            raise ValueError(
+                "incremental fits need a fixed ``ncp_prior`` or ``gamma``; "
+                "``p0`` depends on the final number of data points"
+            )
+
+        self.fitfunc = fitfunc
+        self.on_trigger = on_trigger
+
+        # data cells: times, counts and mean exposure of each unique time
+        self.N = 0
+        self.t = np.zeros(0, dtype=float)
+        self.x = np.zeros(0, dtype=float)
+        self.ex = np.zeros(0, dtype=float)
+
+        # DP state committed for cells 0..n_done-1
+        self.n_done = 0
+        self.best = np.zeros(0, dtype=float)
+        self.last = np.zeros(0, dtype=int)
+        self.prefix = {"N_k": np.zeros(1), "T_k": np.zeros(1)}
+
+        self._edges = np.zeros(0, dtype=float)
+
+    @staticmethod
+    def _grow(arr: NDArray, size: int) -> NDArray:
+        # amortized growth of the state buffers
+        if len(arr) >= size:
+            return arr
+        out = np.zeros(max(size, 2 * len(arr)), dtype=arr.dtype)
+        out[: len(arr)] = arr
+        return out
+
+    def update(self, times: ArrayLike, exposures: ArrayLike | None = None) -> bool:
+        """Add a batch of photons and extend the fit.
+
+        Parameters
+        ----------
+        times : array-like
+            photon arrival times, not earlier than any previous photon
+        exposures : array-like or float, optional
+            exposure factor of each photon (default 1)
+
+        Returns
+        -------
+        triggered : bool
+            True if the segmentation now has change points that it did not
+            have before this update
+        """
+        times = np.asarray(times, dtype=float).ravel()
+        if exposures is None:
+            exposures = np.ones_like(times)
+        exposures = np.asarray(exposures, dtype=float) + np.zeros_like(times)
+        if times.size == 0:
+            return False
+
+        order = np.argsort(times, kind="stable")
+        times, exposures = times[order], exposures[order]
+        if self.N and times[0] < self.t[self.N - 1]:
+            raise ValueError("photon times must not precede previous updates")
+
+        # collapse repeated times into counts with a mean exposure factor
+        run_start = np.concatenate([[0], np.flatnonzero(np.diff(times)) + 1])
+        counts = np.diff(np.concatenate([run_start, [times.size]])).astype(float)
+        ex_sum = np.add.reduceat(exposures, run_start)
+        times = times[run_start]
+
+        # photons at the time of the last cell join that (uncommitted) cell
+        if self.N and times[0] == self.t[self.N - 1]:
+            n_old = self.x[self.N - 1]
+            self.ex[self.N - 1] = (self.ex[self.N - 1] * n_old + ex_sum[0]) / (
+                n_old + counts[0]
+            )
+            self.x[self.N - 1] += counts[0]
+            times, counts, ex_sum = times[1:], counts[1:], ex_sum[1:]
+
+        n_new = len(times)
+        size = self.N + n_new
+        self.t = self._grow(self.t, size)
+        self.x = self._grow(self.x, size)
+        self.ex = self._grow(self.ex, size)
+        self.t[self.N : size] = times
+        self.x[self.N : size] = counts
+        self.ex[self.N : size] = ex_sum / counts
+        self.N = size
+
+        self._extend()
+
+        # trigger on change points that were not present before
+        old_edges = self._edges
+        self._edges = self.change_points()
+        new_edges = np.setdiff1d(self._edges[1:-1], old_edges[1:-1])
+        if new_edges.size and self.on_trigger is not None:
+            self.on_trigger(self, new_edges)
+        return bool(new_edges.size)
+
+    def _extend(self) -> None:
+        # commit the DP for every cell whose width is final (all but the last)
+        n_commit = self.N - 1
+        if n_commit <= self.n_done:
+            return
+
+        lo = self.n_done
+        t = self.t[: self.N]
+        ex = self.ex[: self.N]
+        if lo == 0:
+            widths = self.fitfunc.cell_widths(t, ex)[:n_commit]
+        else:
+            widths = self.fitfunc.cell_widths(t[lo - 1 :], ex[lo - 1 :])[
+                1 : n_commit - lo + 1
+            ]
+
+        for key, per_cell in (("T_k", widths), ("N_k", self.x[lo:n_commit])):
+            S = self._grow(self.prefix[key], n_commit + 1)
+            S[lo : n_commit + 1] = np.cumsum(np.concatenate([[S[lo]], per_cell]))
+            self.prefix[key] = S
+
+        self.best = self._grow(self.best, n_commit)
+        self.last = self._grow(self.last, n_commit)
+        prefix = self._fitness_prefix()
+        for R in range(lo, n_commit):
+            self.last[R], self.best[R] = self.fitfunc.best_last_block(
+                prefix, self.best, R, self.ncp_prior
+            )
+        self.n_done = n_commit
+
+    def _fitness_prefix(self) -> dict[str, NDArray[float]]:
+        return {key: self.prefix[key] for key in self.fitfunc._fitness_args}
+
+    def change_points(self) -> NDArray[float]:
+        """Edges of the optimal segmentation of all photons received so far.
+
+        Returns
+        -------
+        edges : ndarray
+            block edges, as returned by :func:`bayesian_blocks`
+        """
+        N = self.N
+        if N < 2:
+            return self.t[:N].copy()
+
+        # provisional last cell, evaluated without committing it
+        t = self.t[N - 2 : N]
+        width = self.fitfunc.cell_widths(t, self.ex[N - 2 : N])[-1]
+        prefix = {}
+        for key, per_cell in (("T_k", width), ("N_k", self.x[N - 1])):
+            S = np.empty(N + 1)
+            S[:N] = self.prefix[key][:N]
+            S[N] = S[N - 1] + per_cell
+            prefix[key] = S
+        prefix = {key: prefix[key] for key in self.fitfunc._fitness_args}
+
+        last = np.empty(N, dtype=int)
+        last[: N - 1] = self.last[: N - 1]
+        last[N - 1], _ = self.fitfunc.best_last_block(
+            prefix, self.best, N - 1, self.ncp_prior
+        )
+        return self.t[: self.N][self.fitfunc.change_point_indices(last)]
+
+    @property
+    def n_blocks(self) -> int:
+        """Number of blocks in the current segmentation."""
+        return max(len(self._edges) - 1, 0)
@@ -16,10 +16,11 @@ def find_blocks(time, exposure, fp_rate=0.05, ncp_prior=None, do_iter=False):
     Returns:
         (dict): Bayesian block structure with change points, counts, rates, etc.
     """
-    # Step 1: Sort time and exposure
-    sorted_indices = np.argsort(time)
-    time = time[sorted_indices]
-    exposure = exposure[sorted_indices]
+    # Step 1: Sort time and exposure (merged events are usually sorted already)
+    if np.any(time[1:] < time[:-1]):
+        sorted_indices = np.argsort(time)
+        time = time[sorted_indices]
+        exposure = exposure[sorted_indices]
 
     # Step 2: Calculate durations and event counts per block
     block_start = [time[0]]
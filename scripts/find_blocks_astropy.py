@@ -1,28 +1,169 @@
 # from astropy.stats import bayesian_blocks
-from scripts.expo_events import bayesian_blocks
+from scripts.expo_events import bayesian_blocks, Events
 import pandas as pd
 import numpy as np
 from scripts.find_blocks import upper_limit_gehrels, lower_limit_gehrels
 
 
-def bba_astropy(time, ncp_prior, fp_rate=0.05, x_list=None):
+def fp_rate_to_ncp_prior(fp_rate, n_events):
+    """
+    Convert a false positive rate into the ncp_prior used for event data (as Shuo did).
+
+    Parameters:
+        fp_rate (float): False positive rate for change points.
+        n_events (int): Number of photon events in the fit.
+
+    Returns:
+        (float): Number of change point prior.
+    """
+    return 4 - np.log10(fp_rate / (0.0136 * (n_events**0.478)))
+
+
+def auto_cell_size(time, target_counts=10):
+    """
+    Cell size giving about `target_counts` photons per cell at the mean count rate.
+
+    Parameters:
+        time (np.ndarray): Photon arrival times.
+        target_counts (float): Mean number of photons per cell.
+
+    Returns:
+        (float): Cell size in seconds.
+    """
+    span = np.max(time) - np.min(time)
+    return span * target_counts / len(time)
+
+
+def bin_events(time, exposure, cell_size):
+    """
+    Aggregate photons into fine time cells for a binned Bayesian Block fit.
+
+    Parameters:
+        time (np.ndarray): Photon arrival times.
+        exposure (np.ndarray): Exposure correction factor of each photon (or None).
+        cell_size (float): Width of the time cells (seconds).
+
+    Returns:
+        (tuple): Start time of each non-empty cell, its photon count, and the mean
+            exposure of its photons.
+    """
+    t0 = np.min(time)
+    cell = ((time - t0) // cell_size).astype(np.int64)
+    counts = np.bincount(cell)
+    occupied = np.flatnonzero(counts)
+    if exposure is None:
+        mean_exposure = np.ones(len(occupied))
+    else:
+        mean_exposure = np.bincount(cell, weights=exposure)[occupied] / counts[occupied]
+    return t0 + cell_size * occupied, counts[occupied], mean_exposure
+
+
+def refine_edges(time, exposure, edges, window):
+    """
+    Move each interior block edge to the best photon boundary near it.
+
+    Every interior edge is placed at the photon time inside [edge - window, edge + window]
+    that maximizes the Events fitness of the two blocks on either side, keeping the
+    neighbouring edges fixed. Edges are refined from left to right.
+
+    Parameters:
+        time (np.ndarray): Photon arrival times.
+        exposure (np.ndarray): Exposure correction factor of each photon (or None).
+        edges (np.ndarray): Block edges from a binned fit.
+        window (float): Half width of the search window around each edge (seconds).
+
+    Returns:
+        (np.ndarray): Refined block edges.
+    """
+    fitfunc = Events()
+    t, x, _, ex = fitfunc.validate_input(time, None, None, exposure)
+    cum_counts = np.concatenate([[0.0], np.cumsum(x)])
+    cum_widths = np.concatenate([[0.0], np.cumsum(fitfunc.cell_widths(t, ex))])
+
+    def block_fitness(lo, hi):
+        return fitfunc.fitness(
+            N_k=cum_counts[hi] - cum_counts[lo], T_k=cum_widths[hi] - cum_widths[lo]
+        )
+
+    edges = np.array(edges, dtype=float)
+    bounds = np.searchsorted(t, edges, side="left")
+    bounds[-1] = len(t)
+    for j in range(1, len(edges) - 1):
+        lo = max(np.searchsorted(t, edges[j] - window, side="left"), bounds[j - 1] + 1)
+        hi = min(np.searchsorted(t, edges[j] + window, side="right"), bounds[j + 1] - 1)
+        if hi < lo:
+            continue
+        split = np.arange(lo, hi + 1)
+        fit = block_fitness(bounds[j - 1], split) + block_fitness(split, bounds[j + 1])
+        bounds[j] = split[np.argmax(fit)]
+        edges[j] = t[bounds[j]]
+    return edges
+
+
+def bba_astropy(
+    time,
+    ncp_prior,
+    fp_rate=0.05,
+    x_list=None,
+    cell_size=None,
+    refine=False,
+    refine_window=None,
+    n_threads=None,
+    checkpoint=None,
+    progress=None,
+):
     """
     Perform Bayesian Block segmentation using Astropy.
 
+    With `cell_size`, the photons are first aggregated into time cells (counts and mean
+    exposure per cell) and the Events fitness runs on the cells, so the O(N^2) fit scales
+    with the number of cells instead of photons. The edges then lie on cell boundaries;
+    `refine` moves each of them back to photon resolution inside a small window.
+
     Parameters:
         time (np.ndarray): Photon arrival times.
         ncp_prior (float): (optional) Number of change point prior
         fp_rate (float): False positive rate for change points.
+        x_list (np.ndarray): Exposure correction factor of each photon (optional).
+        cell_size (float or str): Cell width in seconds, "auto" for about 10 photons per
+            cell, or None to fit the individual photons.
+        refine (bool): Refine binned edges to photon resolution.
+        refine_window (float): Half width of the refinement window (default: one cell).
+        n_threads (int): Threads evaluating the block starts of each step of the fit (optional).
+        checkpoint (str): Directory for a resumable checkpoint of the fit (optional).
+        progress (callable): Called with progress reports of the fit, e.g. `FitProgress` (optional).
 
     Returns:
         (pd.DataFrame): DataFrame with Bayesian Block intervals and statistics.
     """
+    if cell_size is not None:
+        return _bba_binned(
+            time,
+            ncp_prior,
+            fp_rate,
+            x_list,
+            cell_size,
+            refine,
+            refine_window,
+            n_threads,
+            checkpoint,
+            progress,
+        )
+
     # make x values (correct for exposure)
     exp_list = x_list
     # change_points = bayesian_blocks(time, fitness="events", p0=fp_rate)
-    change_points = bayesian_blocks(
-        time, ex=exp_list, fitness="events", ncp_prior=ncp_prior
+    fit_result = bayesian_blocks(
+        time,
+        ex=exp_list,
+        fitness="events",
+        ncp_prior=ncp_prior,
+        return_stats=True,
+        n_threads=n_threads,
+        checkpoint=checkpoint,
+        progress=progress,
     )  # exposure version
+    change_points = fit_result.edges
     # change_points = bayesian_blocks(time, fitness="events", ncp_prior=ncp_prior)
     # Tuning Hyperparameter p0:
     # Perform Bayesian Blocks segmentation with different p0 values
@@ -31,11 +172,91 @@ def bba_astropy(time, ncp_prior, fp_rate=0.05, x_list=None):
     #     print(f"    p0 = {p0}, Number of change points: {len(change_points) - 1}")
     print(f"    Change points: {change_points}")
 
+    counts = fit_result.counts.astype(int)  # from the fit, no re-histogram
+    return blocks_to_frame(change_points, counts, fp_rate)
+
+
+def _bba_binned(
+    time,
+    ncp_prior,
+    fp_rate,
+    x_list,
+    cell_size,
+    refine,
+    refine_window,
+    n_threads,
+    checkpoint,
+    progress,
+):
+    """
+    Binned Bayesian Block fit behind `bba_astropy(cell_size=...)`.
+
+    Parameters:
+        time (np.ndarray): Photon arrival times.
+        ncp_prior (float): Number of change point prior.
+        fp_rate (float): False positive rate for change points.
+        x_list (np.ndarray): Exposure correction factor of each photon (or None).
+        cell_size (float or str): Cell width in seconds or "auto".
+        refine (bool): Refine the edges to photon resolution.
+        refine_window (float): Half width of the refinement window (default: one cell).
+        n_threads (int): Threads evaluating the block starts of each step of the fit.
+        checkpoint (str): Directory for a resumable checkpoint of the fit.
+        progress (callable): Called with progress reports of the fit.
+
+    Returns:
+        (pd.DataFrame): DataFrame with Bayesian Block intervals and statistics.
+    """
+    time = np.asarray(time, dtype=float)
+    if cell_size == "auto":
+        cell_size = auto_cell_size(time)
+    cell_start, cell_counts, cell_exposure = bin_events(time, x_list, cell_size)
+    print(
+        f"    Binned {len(time)} photons into {len(cell_start)} cells of {cell_size:g} s."
+    )
+
+    fit_result = bayesian_blocks(
+        cell_start + 0.5 * cell_size,
+        x=cell_counts,
+        ex=cell_exposure,
+        fitness="events",
+        ncp_prior=ncp_prior,
+        return_stats=True,
+        n_threads=n_threads,
+        checkpoint=checkpoint,
+        progress=progress,
+    )
+
+    # Block edges on cell boundaries, the outer edges at the first and last photon
+    change_points = fit_result.edges - 0.5 * cell_size
+    change_points[0] = time.min()
+    change_points[-1] = time.max()
+    if refine:
+        window = cell_size if refine_window is None else refine_window
+        change_points = refine_edges(time, x_list, change_points, window)
+    print(f"    Change points: {change_points}")
+
+    sorted_time = np.sort(time)
+    bounds = np.searchsorted(sorted_time, change_points, side="left")
+    bounds[-1] = len(sorted_time)
+    return blocks_to_frame(change_points, np.diff(bounds), fp_rate)
+
+
+def blocks_to_frame(change_points, counts, fp_rate):
+    """
+    Bayesian Block table from the block edges and counts.
+
+    Parameters:
+        change_points (np.ndarray): Block edges.
+        counts (np.ndarray): Number of photons in each block.
+        fp_rate (float): False positive rate for change points.
+
+    Returns:
+        (pd.DataFrame): DataFrame with Bayesian Block intervals and statistics.
+    """
     # Calculate intervals, durations, and rates
     block_start = change_points[:-1]
     block_stop = change_points[1:]
     durations = block_stop - block_start
-    counts = np.histogram(time, bins=change_points)[0]
     rates = counts / durations
     block_label = np.array(range(0, len(durations)))
 
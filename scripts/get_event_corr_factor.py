@@ -17,37 +17,77 @@ def get_event_corr_factor(filename, tt):
     """
     try:
         # Read the correction factor FITS file
-        with fits.open(filename) as hdul:
-            data = hdul[1].data
-
-            # Convert relevant columns to a DataFrame with proper byte order
-            df_corr = pd.DataFrame(
-                {
-                    "TSTART": data["TSTART"].byteswap().newbyteorder(),
-                    "TSTOP": data["TSTOP"].byteswap().newbyteorder(),
-                    "FRACTION": data["FRACTION"].byteswap().newbyteorder(),
-                }
-            )
+        df_corr = load_corr_table(filename)
 
         # Debugging: Print the first few rows of the correction factor DataFrame
         # print(f"Correction Factor DataFrame (Converted):\n{df_corr.head()}")
 
-        # Initialize the correction factor array with a default value (e.g., 1.0)
-        correction_factors = np.full(len(tt), 1.0)
-
-        # Match photon times to correction intervals
-        for i, t in enumerate(tt):
-            match = df_corr[(df_corr["TSTART"] <= t) & (df_corr["TSTOP"] > t)]
-            if not match.empty:
-                correction_factors[i] = match.iloc[0]["FRACTION"]
-            else:
-                # Log warning if no match is found
-                # pass
-                print(
-                    f"Warning: No match found for photon time {t}. Using default correction factor 1.0."
-                )
-
-        return correction_factors
+        return lookup_corr_factor(df_corr, tt)
 
     except Exception as e:
         raise RuntimeError(f"Error in GetEventcorrfactor: {e}")
+
+
+def load_corr_table(filename):
+    """
+    Load the correction factor table of a light curve correction FITS file.
+
+    Parameters:
+        filename (str): Path to the correction factor FITS file.
+
+    Returns:
+        (pd.DataFrame): Correction table with 'TSTART', 'TSTOP', and 'FRACTION' columns sorted by TSTART.
+    """
+    with fits.open(filename) as hdul:
+        data = hdul[1].data
+
+        # Convert relevant columns to a DataFrame with proper byte order
+        df_corr = pd.DataFrame(
+            {
+                "TSTART": data["TSTART"].byteswap().newbyteorder(),
+                "TSTOP": data["TSTOP"].byteswap().newbyteorder(),
+                "FRACTION": data["FRACTION"].byteswap().newbyteorder(),
+            }
+        )
+
+    return df_corr.sort_values(by="TSTART", kind="stable").reset_index(drop=True)
+
+
+def lookup_corr_factor(df_corr, tt):
+    """
+    Look up the correction factor of each photon time in a loaded correction table.
+
+    Each time is matched to the interval TSTART <= t < TSTOP with a single searchsorted
+    call, so the lookup can be repeated cheaply on chunks of a large event list.
+
+    Parameters:
+        df_corr (pd.DataFrame): Correction table from `load_corr_table`.
+        tt (array-like): Photon arrival times.
+
+    Returns:
+        (np.ndarray): Array of correction factors corresponding to photon times (1.0 where unmatched).
+    """
+    tt = np.asarray(tt, dtype=float)
+    tstart = df_corr["TSTART"].to_numpy()
+    tstop = df_corr["TSTOP"].to_numpy()
+    fraction = df_corr["FRACTION"].to_numpy()
+
+    # Initialize the correction factor array with a default value (e.g., 1.0)
+    correction_factors = np.full(len(tt), 1.0)
+    if len(tstart) == 0:
+        idx = np.full(len(tt), -1)
+    else:
+        idx = np.searchsorted(tstart, tt, side="right") - 1
+
+    # Match photon times to correction intervals
+    matched = idx >= 0
+    matched[matched] = tt[matched] < tstop[idx[matched]]
+    correction_factors[matched] = fraction[idx[matched]]
+
+    # Log warning if no match is found
+    for t in tt[~matched]:
+        print(
+            f"Warning: No match found for photon time {t}. Using default correction factor 1.0."
+        )
+
+    return correction_factors
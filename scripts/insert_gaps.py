@@ -1,96 +1,68 @@
+import numpy as np
 import pandas as pd
 
+from scripts.time_axis import TimeAxis
 
-def insert_gti_gaps(bba_df, gti_df):
+
+def insert_gti_gaps(bba_df, gti_df, time_axis=None):
     """
     Adjust BBA blocks to account for GTI gaps, splitting blocks as necessary.
 
+    The block edges are mapped from the gap-suppressed time axis back to observation time
+    with `TimeAxis.restore` (starts after a gap they fall on, stops before it). A block
+    that spans one or more gaps is split into one piece per GTI it covers.
+
     Parameters:
         bba_df (pd.DataFrame): Bayesian Blocks DataFrame with 'start' and 'stop' columns.
         gti_df (pd.DataFrame): GTI DataFrame with 'START' and 'STOP' columns.
+        time_axis (TimeAxis): Time axis the blocks were fit on (optional, default built from gti_df).
 
     Returns:
         (pd.DataFrame): Corrected BBA DataFrame with gaps reintroduced and blocks split if needed.
         (pd.DataFrame): GTI gaps DataFrame with calculated gap durations.
     """
-    # print(f"BBA Blocks Time Range: {bba_df['start'].min()} - {bba_df['stop'].max()}")
-    # print(f"GTI Time Range: {gti_df['START'].min()} - {gti_df['STOP'].max()}")
-
     # Step 1: Identify Gaps Between GTIs
-    gti_gaps = []
-    for i in range(len(gti_df) - 1):
-        gap_start = gti_df.iloc[i]["STOP"]
-        gap_stop = gti_df.iloc[i + 1]["START"]
-        gap_duration = gap_stop - gap_start
-
-        if gap_duration > 0:
-            gti_gaps.append(
-                {
-                    "GAP_START": gap_start,
-                    "GAP_STOP": gap_stop,
-                    "GAP_DURATION": gap_duration,
-                }
-            )
-            # print(f"Identified Gap: START={gap_start}, STOP={gap_stop}, DURATION={gap_duration}")
-
-    gti_gaps_df = pd.DataFrame(gti_gaps)
-
-    # Step 2: Adjust BBA Blocks Iteratively
-    cumulative_shift = 0
-    corrected_blocks = bba_df.copy()
-
-    for _, gap in gti_gaps_df.iterrows():
-        gap_start = gap["GAP_START"]
-        gap_stop = gap["GAP_STOP"]
-        gap_duration = gap["GAP_DURATION"]
-        print(
-            f"Processing Gap: START={gap_start}, STOP={gap_stop}, DURATION={gap_duration}"
-        )
-
-        new_corrected_blocks = []
+    if time_axis is None:
+        time_axis = TimeAxis.from_gti(gti_df)
+    gti_set = time_axis.gti
+    gaps = gti_set.complement()
+    gti_gaps_df = pd.DataFrame(
+        {
+            "GAP_START": gaps.starts,
+            "GAP_STOP": gaps.stops,
+            "GAP_DURATION": gaps.durations,
+        }
+    )
+    print(f"    GTI gaps: {len(gti_gaps_df)}")
 
-        for _, block in corrected_blocks.iterrows():
-            block_start = block["start"]
-            block_stop = block["stop"]
+    # Step 2: Map the block edges back to observation time
+    # A start on a gap belongs after it, a stop on a gap before it
+    block_start = bba_df["start"].to_numpy(dtype=float)
+    block_stop = bba_df["stop"].to_numpy(dtype=float)
+    first = time_axis.suppressed_index(block_start, side="right")
+    last = np.maximum(time_axis.suppressed_index(block_stop, side="left"), first)
 
-            if block_stop <= gap_start:
-                new_corrected_blocks.append(
-                    {**block.to_dict(), "start": block_start, "stop": block_stop}
-                )
-                print(
-                    f"Block Unaffected by Gap: start={block_start}, stop={block_stop}"
-                )
-            elif block_start >= gap_start:
-                new_corrected_blocks.append(
-                    {
-                        **block.to_dict(),
-                        "start": block_start + gap_duration,
-                        "stop": block_stop + gap_duration,
-                    }
-                )
-                print(
-                    f"Block Shifted After Gap: start={block_start + gap_duration}, stop={block_stop + gap_duration}"
-                )
-            else:
-                print(f"Block Overlaps Gap: start={block_start}, stop={block_stop}")
-                if block_start < gap_start:
-                    new_corrected_blocks.append(
-                        {**block.to_dict(), "start": block_start, "stop": gap_start}
-                    )
-                    print(f"  Sub-block 1: start={block_start}, stop={gap_start}")
-                new_corrected_blocks.append(
-                    {
-                        **block.to_dict(),
-                        "start": gap_stop,
-                        "stop": block_stop + gap_duration,
-                    }
-                )
-                print(
-                    f"  Sub-block 2: start={gap_stop}, stop={block_stop + gap_duration}"
-                )
+    # Step 3: Split each block into one piece per GTI it covers
+    n_pieces = last - first + 1
+    block = np.repeat(np.arange(len(bba_df)), n_pieces)
+    gti = first[block] + (
+        np.arange(n_pieces.sum()) - np.repeat(np.cumsum(n_pieces) - n_pieces, n_pieces)
+    )
+    piece_start = np.where(
+        gti == first[block],
+        time_axis.restore(block_start, side="right")[block],
+        gti_set.starts[gti],
+    )
+    piece_stop = np.where(
+        gti == last[block],
+        time_axis.restore(block_stop, side="left")[block],
+        gti_set.stops[gti],
+    )
 
-        corrected_blocks = pd.DataFrame(new_corrected_blocks)
-        cumulative_shift += gap_duration
-        print(f"Cumulative Shift Updated: {cumulative_shift} seconds")
+    corrected_blocks = bba_df.iloc[block].reset_index(drop=True)
+    corrected_blocks["start"] = piece_start
+    corrected_blocks["stop"] = piece_stop
+    print(f"    Blocks before inserting gaps: {len(bba_df)}")
+    print(f"    Blocks after inserting gaps: {len(corrected_blocks)}")
 
     return corrected_blocks, gti_gaps_df
@@ -0,0 +1,296 @@
+import numpy as np
+import pandas as pd
+
+
+class IntervalSet:
+    """
+    Set of time intervals (e.g. GTIs) backed by start and stop arrays.
+
+    The intervals keep the order they were given in, so results of `count`, `index`, and
+    `trim` line up with the rows of the table they came from. `normalize` sorts the
+    intervals and merges the overlapping ones; union, intersection, difference, and
+    complement always return normalized sets. Every operation is vectorized with
+    sorting and searchsorted, so GTI work costs O(n log n) instead of a Python loop
+    over rows.
+
+    Parameters:
+        starts (array-like): Interval start times.
+        stops (array-like): Interval stop times.
+    """
+
+    def __init__(self, starts, stops):
+        self.starts = np.atleast_1d(np.asarray(starts, dtype=float))
+        self.stops = np.atleast_1d(np.asarray(stops, dtype=float))
+        if self.starts.shape != self.stops.shape or self.starts.ndim != 1:
+            raise ValueError("starts and stops must be 1D arrays of the same length.")
+
+    @classmethod
+    def from_df(cls, df, start="START", stop="STOP"):
+        """
+        Build an interval set from a table of intervals.
+
+        Parameters:
+            df (pd.DataFrame): Intervals, one per row.
+            start (str): Name of the start column.
+            stop (str): Name of the stop column.
+
+        Returns:
+            (IntervalSet): Intervals in the row order of the table.
+        """
+        if not all(col in df.columns for col in [start, stop]):
+            raise ValueError(f"DataFrame must contain '{start}' and '{stop}' columns.")
+        return cls(df[start].to_numpy(dtype=float), df[stop].to_numpy(dtype=float))
+
+    def to_df(self, start="START", stop="STOP"):
+        """
+        Table of the intervals.
+
+        Parameters:
+            start (str): Name of the start column.
+            stop (str): Name of the stop column.
+
+        Returns:
+            (pd.DataFrame): One row per interval.
+        """
+        return pd.DataFrame({start: self.starts, stop: self.stops})
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __getitem__(self, key):
+        return IntervalSet(self.starts[key], self.stops[key])
+
+    def __eq__(self, other):
+        if not isinstance(other, IntervalSet):
+            return NotImplemented
+        return np.array_equal(self.starts, other.starts) and np.array_equal(
+            self.stops, other.stops
+        )
+
+    def __repr__(self):
+        return f"IntervalSet({len(self)} intervals, exposure={self.exposure:g})"
+
+    @property
+    def durations(self):
+        """Length of each interval."""
+        return self.stops - self.starts
+
+    @property
+    def exposure(self):
+        """Total time covered by the intervals (overlaps counted once)."""
+        normalized = self.normalize()
+        return float(np.sum(normalized.stops - normalized.starts))
+
+    def is_sorted(self):
+        """Whether the starts are in increasing order."""
+        return bool(np.all(self.starts[1:] >= self.starts[:-1]))
+
+    def is_disjoint(self):
+        """Whether no two intervals overlap (touching intervals are allowed)."""
+        order = np.argsort(self.starts, kind="stable")
+        return bool(np.all(self.starts[order][1:] >= self.stops[order][:-1]))
+
+    def normalize(self):
+        """
+        Sort the intervals, drop empty ones, and merge the overlapping or touching ones.
+
+        Returns:
+            (IntervalSet): Sorted disjoint intervals.
+        """
+        keep = self.stops > self.starts
+        order = np.argsort(self.starts[keep], kind="stable")
+        starts = self.starts[keep][order]
+        stops = self.stops[keep][order]
+        if len(starts) == 0:
+            return IntervalSet(starts, stops)
+
+        # A new interval begins where the start lies after every earlier stop
+        reach = np.maximum.accumulate(stops)
+        first = np.concatenate([[True], starts[1:] > reach[:-1]])
+        last = np.concatenate([first[1:], [True]])
+        return IntervalSet(starts[first], reach[last])
+
+    def union(self, other):
+        """
+        Time covered by either set.
+
+        Parameters:
+            other (IntervalSet): Second set.
+
+        Returns:
+            (IntervalSet): Normalized union.
+        """
+        return IntervalSet(
+            np.concatenate([self.starts, other.starts]),
+            np.concatenate([self.stops, other.stops]),
+        ).normalize()
+
+    def intersection(self, other):
+        """
+        Time covered by both sets (e.g. the common GTIs of two modules).
+
+        Parameters:
+            other (IntervalSet): Second set.
+
+        Returns:
+            (IntervalSet): Normalized intersection.
+        """
+        a, b = self.normalize(), other.normalize()
+
+        # Intervals of b overlapping each interval of a: b.stop > a.start and b.start < a.stop
+        lo = np.searchsorted(b.stops, a.starts, side="right")
+        hi = np.searchsorted(b.starts, a.stops, side="left")
+        n_overlaps = np.maximum(hi - lo, 0)
+        ia = np.repeat(np.arange(len(a)), n_overlaps)
+        ib = (
+            np.arange(n_overlaps.sum())
+            - np.repeat(np.cumsum(n_overlaps) - n_overlaps, n_overlaps)
+            + lo[ia]
+        )
+
+        starts = np.maximum(a.starts[ia], b.starts[ib])
+        stops = np.minimum(a.stops[ia], b.stops[ib])
+        return IntervalSet(starts, stops).normalize()
+
+    def complement(self, tmin=None, tmax=None):
+        """
+        Gaps between the intervals, optionally extended to a time range.
+
+        Parameters:
+            tmin (float): Start of the range (optional, first interval start if None).
+            tmax (float): Stop of the range (optional, last interval stop if None).
+
+        Returns:
+            (IntervalSet): Normalized gaps inside [tmin, tmax].
+        """
+        normalized = self.normalize()
+        starts = np.concatenate([[-np.inf], normalized.stops])
+        stops = np.concatenate([normalized.starts, [np.inf]])
+        lower = -np.inf if tmin is None else tmin
+        upper = np.inf if tmax is None else tmax
+        starts = np.clip(starts, lower, upper)
+        stops = np.clip(stops, lower, upper)
+        keep = np.isfinite(starts) & np.isfinite(stops) & (stops > starts)
+        return IntervalSet(starts[keep], stops[keep])
+
+    def difference(self, other):
+        """
+        Time covered by this set but not by `other`.
+
+        Parameters:
+            other (IntervalSet): Set to remove.
+
+        Returns:
+            (IntervalSet): Normalized difference.
+        """
+        if len(self) == 0:
+            return self.normalize()
+        return self.intersection(other.complement(self.starts.min(), self.stops.max()))
+
+    def trim(self, start=0.0, stop=0.0):
+        """
+        Shorten every interval at both ends (row order kept, lengths may become negative).
+
+        Parameters:
+            start (float): Seconds removed from each start.
+            stop (float): Seconds removed from each stop.
+
+        Returns:
+            (IntervalSet): Trimmed intervals.
+        """
+        return IntervalSet(self.starts + start, self.stops - stop)
+
+    def filter_duration(self, min_duration):
+        """
+        Keep the intervals longer than a minimum duration (row order kept).
+
+        Parameters:
+            min_duration (float): Minimum duration (seconds).
+
+        Returns:
+            (IntervalSet): Intervals with duration > min_duration.
+        """
+        return self[self.durations > min_duration]
+
+    def index(self, times, closed="both"):
+        """
+        Interval holding each time, for disjoint intervals.
+
+        Parameters:
+            times (array-like): Times to look up.
+            closed (str): "both" for START <= t <= STOP, "left" for START <= t < STOP.
+
+        Returns:
+            (np.ndarray): Row index of the interval holding each time, -1 outside the set.
+        """
+        times = np.asarray(times, dtype=float)
+        order = np.argsort(self.starts, kind="stable")
+        idx = np.searchsorted(self.starts[order], times, side="right") - 1
+        inside = idx >= 0
+        stops = self.stops[order][idx[inside]]
+        if closed == "both":
+            inside[inside] = times[inside] <= stops
+        elif closed == "left":
+            inside[inside] = times[inside] < stops
+        else:
+            raise ValueError("closed must be 'both' or 'left'.")
+        return np.where(inside, order[idx], -1)
+
+    def contains(self, times, closed="both"):
+        """
+        Whether each time lies inside the set, for disjoint intervals.
+
+        Parameters:
+            times (array-like): Times to test.
+            closed (str): "both" for START <= t <= STOP, "left" for START <= t < STOP.
+
+        Returns:
+            (np.ndarray): Boolean mask.
+        """
+        return self.index(times, closed) >= 0
+
+    def count(self, times, closed="both"):
+        """
+        Number of times inside each interval.
+
+        Parameters:
+            times (np.ndarray): Sorted times (e.g. event arrival times).
+            closed (str): "both" for START <= t <= STOP, "left" for START <= t < STOP.
+
+        Returns:
+            (np.ndarray): Count of each interval, in row order.
+        """
+        side = "right" if closed == "both" else "left"
+        return np.searchsorted(times, self.stops, side=side) - np.searchsorted(
+            times, self.starts, side="left"
+        )
+
+    def exposure_before(self, times):
+        """
+        Time covered by the sorted, disjoint intervals before each time.
+
+        Parameters:
+            times (np.ndarray): Times at which to evaluate the covered time.
+
+        Returns:
+            (np.ndarray): Time covered between the first start and each time.
+        """
+        times = np.asarray(times, dtype=float)
+        durations = self.durations
+        cumulative = np.concatenate([[0.0], np.cumsum(durations)])
+        idx = np.searchsorted(self.starts, times, side="right") - 1
+        covered = np.zeros(len(times))
+        inside = idx >= 0
+        covered[inside] = cumulative[idx[inside]] + np.minimum(
+            times[inside] - self.starts[idx[inside]], durations[idx[inside]]
+        )
+        return covered
+
+    def cumulative_gaps(self):
+        """
+        Total gap time before each interval, for sorted intervals.
+
+        Returns:
+            (np.ndarray): Sum of the gaps between the first interval and each interval.
+        """
+        return np.insert(np.cumsum(self.starts[1:] - self.stops[:-1]), 0, 0)
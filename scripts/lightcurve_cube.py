@@ -0,0 +1,287 @@
+import numpy as np
+import pandas as pd
+from scripts.find_blocks import upper_limit_gehrels, lower_limit_gehrels
+
+# NuSTAR PI channel to energy conversion (see load_event_file)
+PI_GAIN = 0.04
+PI_OFFSET = 1.6
+
+
+def energy_to_channels(energy_range):
+    """
+    First and last PI channel whose energy lies inside an energy range (inclusive).
+
+    Parameters:
+        energy_range (tuple): (Emin, Emax) energy range in keV.
+
+    Returns:
+        (tuple): First and last PI channel.
+    """
+    lo = np.ceil((energy_range[0] - PI_OFFSET) / PI_GAIN - 1e-6)
+    hi = np.floor((energy_range[1] - PI_OFFSET) / PI_GAIN + 1e-6)
+    return int(lo), int(hi)
+
+
+class LightCurveCube:
+    """
+    Cumulative event counts over (time bin, PI channel) for one observation.
+
+    The cube is built once from the merged events at the finest time resolution. The
+    counts of any time range and energy band are then a difference of four cube entries,
+    so light curves (at any multiple of the resolution), hardness ratios, and spectra
+    need no refiltering or rebinning of the events. The cumulative GTI time and the
+    cumulative correction factor of the events are kept per time bin for the rates.
+
+    Parameters:
+        counts (np.ndarray): Cumulative counts, shape (n_bins + 1, n_channels + 1).
+        gti_time (np.ndarray): Cumulative GTI time at each time bin edge.
+        corr_sum (np.ndarray): Cumulative sum of the event correction factors at each time bin edge.
+        t0 (float): Start time of the first bin.
+        time_resolution (float): Width of the finest time bin (seconds).
+        pi_min (int): First PI channel of the cube.
+    """
+
+    def __init__(self, counts, gti_time, corr_sum, t0, time_resolution, pi_min):
+        self.counts = counts
+        self.gti_time = gti_time
+        self.corr_sum = corr_sum
+        self.t0 = float(t0)
+        self.time_resolution = float(time_resolution)
+        self.pi_min = int(pi_min)
+
+    @property
+    def n_bins(self):
+        return self.counts.shape[0] - 1
+
+    @property
+    def n_channels(self):
+        return self.counts.shape[1] - 1
+
+    @classmethod
+    def from_events(cls, events_df, gti_df, time_resolution=1.0, pi_range=(35, 1909)):
+        """
+        Build the cube from merged events.
+
+        Parameters:
+            events_df (pd.DataFrame): Events with 'TIME' and 'PI' (or 'Energy') columns, and optionally 'Exposure'.
+            gti_df (pd.DataFrame): GTI intervals with columns ['START', 'STOP'].
+            time_resolution (float): Width of the finest time bin (seconds).
+            pi_range (tuple): First and last PI channel kept (default: 3-78 keV).
+
+        Returns:
+            (LightCurveCube): Cumulative count cube.
+        """
+        times = events_df["TIME"].to_numpy(dtype=float)
+        if "PI" in events_df.columns:
+            pi = events_df["PI"].to_numpy()
+        else:
+            pi = (events_df["Energy"].to_numpy() - PI_OFFSET) / PI_GAIN
+        pi = np.rint(pi).astype(np.int64)
+        if "Exposure" in events_df.columns:
+            corr = events_df["Exposure"].to_numpy(dtype=float)
+        else:
+            corr = np.ones(len(times))
+
+        starts = gti_df["START"].to_numpy(dtype=float)
+        stops = gti_df["STOP"].to_numpy(dtype=float)
+        t0 = starts.min()
+        t_end = max(stops.max(), times.max() if len(times) else t0)
+        n_bins = max(1, int(np.ceil((t_end - t0) / time_resolution - 1e-9)))
+        n_channels = pi_range[1] - pi_range[0] + 1
+
+        # 2D histogram of the events, then cumulative sums along both axes
+        time_idx = np.clip(((times - t0) // time_resolution).astype(np.int64), 0, None)
+        time_idx = np.minimum(time_idx, n_bins - 1)
+        keep = (pi >= pi_range[0]) & (pi <= pi_range[1]) & (times >= t0)
+        flat = time_idx[keep] * n_channels + (pi[keep] - pi_range[0])
+        hist = np.bincount(flat, minlength=n_bins * n_channels)
+        dtype = np.int32 if keep.sum() < np.iinfo(np.int32).max else np.int64
+        counts = np.zeros((n_bins + 1, n_channels + 1), dtype=dtype)
+        counts[1:, 1:] = hist.reshape(n_bins, n_channels).cumsum(0).cumsum(1)
+
+        # Cumulative GTI time at each bin edge
+        edges = t0 + time_resolution * np.arange(n_bins + 1)
+        gti_cumulative = np.concatenate([[0.0], np.cumsum(stops - starts)])
+        idx = np.searchsorted(starts, edges, side="right") - 1
+        gti_time = np.zeros(len(edges))
+        inside = idx >= 0
+        gti_time[inside] = gti_cumulative[idx[inside]] + np.clip(
+            edges[inside] - starts[idx[inside]], 0, (stops - starts)[idx[inside]]
+        )
+
+        # Cumulative correction factor of the events (all energies) per time bin
+        corr_hist = np.bincount(time_idx[keep], weights=corr[keep], minlength=n_bins)
+        corr_sum = np.concatenate([[0.0], np.cumsum(corr_hist)])
+
+        print(
+            f"    Cube of {n_bins} time bins x {n_channels} channels "
+            f"({keep.sum()} events)."
+        )
+        return cls(counts, gti_time, corr_sum, t0, time_resolution, pi_range[0])
+
+    def save(self, path):
+        """
+        Save the cube to a compressed .npz file.
+
+        Parameters:
+            path (str): Output file path.
+        """
+        np.savez_compressed(
+            path,
+            counts=self.counts,
+            gti_time=self.gti_time,
+            corr_sum=self.corr_sum,
+            t0=self.t0,
+            time_resolution=self.time_resolution,
+            pi_min=self.pi_min,
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a cube saved with `save`.
+
+        Parameters:
+            path (str): Path of the .npz file.
+
+        Returns:
+            (LightCurveCube): Cumulative count cube.
+        """
+        with np.load(path) as data:
+            return cls(
+                data["counts"],
+                data["gti_time"],
+                data["corr_sum"],
+                data["t0"],
+                data["time_resolution"],
+                data["pi_min"],
+            )
+
+    def _channel_slice(self, energy_range):
+        """Cube column bounds of an energy range (all channels if None)."""
+        if energy_range is None:
+            return 0, self.n_channels
+        lo, hi = energy_to_channels(energy_range)
+        lo = min(max(lo - self.pi_min, 0), self.n_channels)
+        hi = min(max(hi - self.pi_min + 1, 0), self.n_channels)
+        return lo, max(lo, hi)
+
+    def _band_counts(self, rows, energy_range):
+        """Cumulative band counts at the given time bin edges."""
+        lo, hi = self._channel_slice(energy_range)
+        return self.counts[rows, hi].astype(np.int64) - self.counts[rows, lo]
+
+    def lightcurve(self, binsize, energy_range=None):
+        """
+        Light curve of an energy band, like `generate_lightcurve`.
+
+        Bins are multiples of the cube resolution starting at the first GTI; bins without
+        GTI coverage are dropped and partially covered bins use their GTI time.
+
+        Parameters:
+            binsize (float): Time bin size in seconds (a multiple of the cube resolution).
+            energy_range (tuple): (Emin, Emax) energy range in keV. None keeps all events.
+
+        Returns:
+            (pd.DataFrame): Light curve with columns ['bin_start', 'bin_end', 'counts', 'exposure',
+                'count_rate', 'upper_limit', 'lower_limit'].
+        """
+        step = int(round(binsize / self.time_resolution))
+        if step < 1 or not np.isclose(step * self.time_resolution, binsize):
+            raise ValueError("binsize must be a multiple of the cube time resolution.")
+
+        rows = np.append(np.arange(0, self.n_bins, step), self.n_bins)
+        counts = np.diff(self._band_counts(rows, energy_range))
+        exposure = np.diff(self.gti_time[rows])
+        all_counts = np.diff(self.counts[rows, -1].astype(np.int64))
+        corr = np.diff(self.corr_sum[rows])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            correction = np.where(all_counts > 0, corr / all_counts, 1.0)
+            scale = 1.0 / (exposure * correction)
+            count_rate = counts * scale
+            upper_limit = upper_limit_gehrels(0.8413, counts) * scale
+            lower_limit = lower_limit_gehrels(0.8413, counts) * scale
+
+        # Empty bins have no rate (as in generate_lightcurve)
+        count_rate[counts == 0] = np.nan
+        upper_limit[counts == 0] = np.nan
+        lower_limit[counts == 0] = np.nan
+
+        edges = self.t0 + self.time_resolution * rows
+        in_gti = exposure > 0
+        return pd.DataFrame(
+            {
+                "bin_start": edges[:-1][in_gti],
+                "bin_end": edges[1:][in_gti],
+                "counts": counts[in_gti],
+                "exposure": exposure[in_gti],
+                "count_rate": count_rate[in_gti],
+                "upper_limit": upper_limit[in_gti],
+                "lower_limit": lower_limit[in_gti],
+            }
+        )
+
+    def hardness_ratio(self, binsize, soft_band, hard_band):
+        """
+        Hardness ratio (H - S) / (H + S) light curve.
+
+        Parameters:
+            binsize (float): Time bin size in seconds (a multiple of the cube resolution).
+            soft_band (tuple): (Emin, Emax) of the soft band in keV.
+            hard_band (tuple): (Emin, Emax) of the hard band in keV.
+
+        Returns:
+            (pd.DataFrame): Columns ['bin_start', 'bin_end', 'soft_counts', 'hard_counts',
+                'hardness_ratio', 'hardness_ratio_err'].
+        """
+        soft = self.lightcurve(binsize, soft_band)
+        hard = self.lightcurve(binsize, hard_band)
+        s = soft["counts"].to_numpy()
+        h = hard["counts"].to_numpy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = (h - s) / (h + s)
+            ratio_err = 2 * np.sqrt(h**2 * s + s**2 * h) / (h + s) ** 2
+        return pd.DataFrame(
+            {
+                "bin_start": soft["bin_start"],
+                "bin_end": soft["bin_end"],
+                "soft_counts": s,
+                "hard_counts": h,
+                "hardness_ratio": ratio,
+                "hardness_ratio_err": ratio_err,
+            }
+        )
+
+    def spectrum(self, tstart, tstop, energy_range=None):
+        """
+        Counts spectrum of a time window (snapped to the cube resolution).
+
+        Parameters:
+            tstart (float): Window start time.
+            tstop (float): Window stop time.
+            energy_range (tuple): (Emin, Emax) energy range in keV. None keeps all channels.
+
+        Returns:
+            (pd.DataFrame): Columns ['PI', 'Energy', 'counts', 'rate'].
+        """
+        rows = np.clip(
+            np.rint((np.array([tstart, tstop]) - self.t0) / self.time_resolution),
+            0,
+            self.n_bins,
+        ).astype(int)
+        window = self.counts[rows[1]].astype(np.int64) - self.counts[rows[0]]
+        lo, hi = self._channel_slice(energy_range)
+        counts = np.diff(window[lo : hi + 1])
+        exposure = self.gti_time[rows[1]] - self.gti_time[rows[0]]
+        pi = self.pi_min + np.arange(lo, hi)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = counts / exposure
+        return pd.DataFrame(
+            {
+                "PI": pi,
+                "Energy": pi * PI_GAIN + PI_OFFSET,
+                "counts": counts,
+                "rate": rate,
+            }
+        )
@@ -0,0 +1,195 @@
+from astropy.io import fits
+from astropy.table import Table
+import numpy as np
+import pandas as pd
+from scripts.create_lightcurve import gti_time_before
+from scripts.find_blocks import upper_limit_gehrels, lower_limit_gehrels
+from scripts.time_axis import pack_times, unpack_times
+
+
+def _level_frame(edges, counts, exposure, corr_sum, n_all):
+    """
+    Light curve table of one pyramid level from its summed bin quantities.
+
+    Parameters:
+        edges (np.ndarray): Bin edges of the level.
+        counts (np.ndarray): Band counts per bin.
+        exposure (np.ndarray): GTI time per bin.
+        corr_sum (np.ndarray): Sum of the correction factors of the events in each bin (all energies).
+        n_all (np.ndarray): Number of events in each bin (all energies).
+
+    Returns:
+        (pd.DataFrame): Light curve with the columns of `generate_lightcurve`, bins outside GTIs removed.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correction_factor = corr_sum / n_all
+        scale = 1.0 / (exposure * correction_factor)
+        count_rate = counts * scale
+        upper_limit = upper_limit_gehrels(0.8413, counts) * scale
+        lower_limit = lower_limit_gehrels(0.8413, counts) * scale
+
+    # Empty bins have no rate (as in generate_lightcurve)
+    empty = counts == 0
+    count_rate[empty] = np.nan
+    upper_limit[empty] = np.nan
+    lower_limit[empty] = np.nan
+
+    in_gti = exposure > 0
+    return pd.DataFrame(
+        {
+            "bin_start": edges[:-1][in_gti],
+            "bin_end": edges[1:][in_gti],
+            "count_rate": count_rate[in_gti],
+            "upper_limit": upper_limit[in_gti],
+            "lower_limit": lower_limit[in_gti],
+            "counts": counts[in_gti],
+            "exposure": exposure[in_gti],
+            "correction_factor": correction_factor[in_gti],
+        }
+    )
+
+
+def build_lightcurve_pyramid(
+    events_df, gti_df, binsizes=(10, 100, 1000, 10000), energy_range=None
+):
+    """
+    Build light curves at several bin sizes, each level summing the level below.
+
+    The finest level is binned once on a regular grid starting at the first GTI. Every
+    coarser level sums the counts, GTI time, and event correction factors of groups of
+    finer bins, then recomputes the rates and Gehrels limits.
+
+    Parameters:
+        events_df (pd.DataFrame): Events with columns ['TIME', 'Energy', 'CORRECTION_FACTOR'].
+        gti_df (pd.DataFrame): GTI intervals with columns ['START', 'STOP'].
+        binsizes (tuple): Increasing bin sizes in seconds, each a multiple of the previous one.
+        energy_range (tuple): (Emin, Emax) energy range in keV. None keeps all events.
+
+    Returns:
+        (dict): Light curve DataFrame of each bin size.
+    """
+    binsizes = [float(b) for b in binsizes]
+    factors = [int(round(b / a)) for a, b in zip(binsizes[:-1], binsizes[1:])]
+    for a, b, f in zip(binsizes[:-1], binsizes[1:], factors):
+        if f < 1 or not np.isclose(f * a, b):
+            raise ValueError("Each bin size must be a multiple of the previous one.")
+
+    starts = gti_df["START"].to_numpy(dtype=float)
+    stops = gti_df["STOP"].to_numpy(dtype=float)
+    times = events_df["TIME"].to_numpy(dtype=float)
+    fraction = events_df["CORRECTION_FACTOR"].to_numpy(dtype=float)
+    in_band = np.ones(len(times), dtype=bool)
+    if energy_range is not None:
+        energy = events_df["Energy"].to_numpy()
+        in_band = (energy >= energy_range[0]) & (energy <= energy_range[1])
+
+    # Finest level, padded to a whole number of bins of the coarsest level
+    t0 = starts.min()
+    t_end = max(stops.max(), times.max())
+    n_coarse = int(np.ceil((t_end - t0) / binsizes[-1])) or 1
+    n_bins = n_coarse * int(np.prod(factors))
+    edges = t0 + binsizes[0] * np.arange(n_bins + 1)
+
+    idx = np.minimum(((times - t0) // binsizes[0]).astype(np.int64), n_bins - 1)
+    keep = idx >= 0
+    counts = np.bincount(idx[keep & in_band], minlength=n_bins)
+    n_all = np.bincount(idx[keep], minlength=n_bins)
+    corr_sum = np.bincount(idx[keep], weights=fraction[keep], minlength=n_bins)
+    gti_time = gti_time_before(edges, starts, stops)
+    exposure = np.diff(gti_time)
+
+    pyramid = {}
+    for level, binsize in enumerate(binsizes):
+        if level > 0:
+            f = factors[level - 1]
+            counts = counts.reshape(-1, f).sum(axis=1)
+            n_all = n_all.reshape(-1, f).sum(axis=1)
+            corr_sum = corr_sum.reshape(-1, f).sum(axis=1)
+            edges = edges[::f]
+            exposure = np.diff(gti_time[:: int(round(binsize / binsizes[0]))])
+        pyramid[binsize] = _level_frame(edges, counts, exposure, corr_sum, n_all)
+        print(f"    {binsize:g} s level: {len(pyramid[binsize])} bins in GTIs.")
+
+    return pyramid
+
+
+def save_lightcurve_pyramid(pyramid, path, reference=None, resolution=1e-3):
+    """
+    Save a light curve pyramid to one FITS file, one binary table extension per level.
+
+    The bin times are stored relative to the TIMEZERO keyword as int32 ticks of TIMERES
+    seconds, half the size of float64 (int64 past ~24 days at 1 ms, see `pack_times`),
+    and restored by `load_lightcurve_pyramid`.
+
+    Parameters:
+        pyramid (dict): Light curve DataFrame of each bin size.
+        path (str): Output FITS file path.
+        reference (float): TIMEZERO of the bin times (optional, start of the first bin, so
+            the stored times are whole multiples of the bin size).
+        resolution (float): Time resolution kept for the bin times (seconds).
+    """
+    if reference is None:
+        reference = min(df["bin_start"].min() for df in pyramid.values())
+
+    hdus = [fits.PrimaryHDU()]
+    for binsize, lightcurve_df in pyramid.items():
+        packed = lightcurve_df.copy()
+        for col in ["bin_start", "bin_end"]:
+            packed[col] = pack_times(packed[col].to_numpy(), reference, resolution)
+        hdu = fits.table_to_hdu(Table.from_pandas(packed))
+        hdu.name = f"LC_{binsize:g}S"
+        hdu.header["BINSIZE"] = (binsize, "Bin size (s)")
+        hdu.header["TIMEZERO"] = (reference, "Offset of the bin times (s)")
+        hdu.header["TIMERES"] = (resolution, "Tick size of integer bin times (s)")
+        hdus.append(hdu)
+    fits.HDUList(hdus).writeto(path, overwrite=True)
+
+
+def load_lightcurve_pyramid(path):
+    """
+    Load a light curve pyramid saved with `save_lightcurve_pyramid`.
+
+    Parameters:
+        path (str): Path of the FITS file.
+
+    Returns:
+        (dict): Light curve DataFrame of each bin size.
+    """
+    pyramid = {}
+    with fits.open(path) as hdul:
+        for hdu in hdul[1:]:
+            lightcurve_df = Table(hdu.data).to_pandas()
+            if "TIMEZERO" in hdu.header:
+                for col in ["bin_start", "bin_end"]:
+                    lightcurve_df[col] = unpack_times(
+                        lightcurve_df[col].to_numpy(),
+                        hdu.header["TIMEZERO"],
+                        hdu.header["TIMERES"],
+                    )
+            pyramid[float(hdu.header["BINSIZE"])] = lightcurve_df
+    return pyramid
+
+
+def select_pyramid_level(pyramid, tstart=None, tstop=None, max_bins=2000):
+    """
+    Pick the finest pyramid level with at most `max_bins` bins in a time window.
+
+    Parameters:
+        pyramid (dict): Light curve DataFrame of each bin size.
+        tstart (float): Window start time (optional, start of the light curve if None).
+        tstop (float): Window stop time (optional, end of the light curve if None).
+        max_bins (int): Largest number of bins to plot.
+
+    Returns:
+        (tuple): Bin size of the selected level and its bins inside the window.
+    """
+    for binsize in sorted(pyramid):
+        lightcurve_df = pyramid[binsize]
+        window = np.ones(len(lightcurve_df), dtype=bool)
+        if tstart is not None:
+            window &= lightcurve_df["bin_end"].to_numpy() > tstart
+        if tstop is not None:
+            window &= lightcurve_df["bin_start"].to_numpy() < tstop
+        if window.sum() <= max_bins:
+            break
+    return binsize, lightcurve_df[window].reset_index(drop=True)
@@ -1,6 +1,102 @@
+import numpy as np
 import pandas as pd
 
 
+def _sorted_times(frame):
+    """
+    Return the TIME values of an event DataFrame and the row order that sorts them.
+
+    Parameters:
+        frame (pd.DataFrame): Event DataFrame with a 'TIME' column.
+
+    Returns:
+        (tuple): Time-ordered TIME array and the row order (None if already sorted).
+    """
+    times = frame["TIME"].to_numpy()
+    if len(times) < 2 or np.all(times[1:] >= times[:-1]):
+        return times, None
+
+    # Fall back to a stable sort for unsorted (or NaN padded) modules
+    order = np.argsort(times, kind="stable")
+    return times[order], order
+
+
+def merge_positions(sorted_times):
+    """
+    Compute the merged output position of every element of several sorted time arrays.
+
+    The arrays are concatenated and ranked with a stable argsort (earlier streams win
+    ties). NumPy's stable sort of floats is timsort, which finds the k presorted runs
+    and merges them, so this is a k-way merge in O(N log k) time: linear for the two
+    NuSTAR modules, and independent of the number of pairs of streams.
+
+    Parameters:
+        sorted_times (list): Time arrays, each sorted in increasing order.
+
+    Returns:
+        (list): One integer position array per input array.
+    """
+    if len(sorted_times) == 0:
+        return []
+    order = np.argsort(np.concatenate(sorted_times), kind="stable")
+    rank = np.empty(len(order), dtype=np.intp)
+    rank[order] = np.arange(len(order))
+    return np.split(rank, np.cumsum([len(times) for times in sorted_times])[:-1])
+
+
+def merge_sorted_events(event_frames, labels=None):
+    """
+    Merge any number of time-sorted event DataFrames into one time-sorted DataFrame.
+
+    Each output row position is computed with `merge_positions` (a k-way merge of the time
+    arrays), and each column is scattered straight into a preallocated array, so the
+    unsorted concatenation is never built or sorted. Ties in TIME keep the order of
+    `event_frames` (events of earlier streams first) and the original order within a stream.
+
+    Parameters:
+        event_frames (list): Event DataFrames with a 'TIME' column, each sorted by TIME.
+        labels (list, optional): Value of the 'Module' column for each stream. Leave as None to keep existing columns.
+
+    Returns:
+        (pd.DataFrame): Merged event DataFrame sorted by TIME with a fresh index.
+    """
+    if labels is not None and len(labels) != len(event_frames):
+        raise ValueError("labels must have one entry per event DataFrame.")
+
+    sorted_times = [_sorted_times(frame) for frame in event_frames]
+    n_total = sum(len(times) for times, _ in sorted_times)
+    positions = merge_positions([times for times, _ in sorted_times])
+
+    columns = []
+    for frame in event_frames:
+        columns += [col for col in frame.columns if col not in columns]
+    if labels is not None and "Module" not in columns:
+        columns.append("Module")
+
+    merged = {}
+    for col in columns:
+        values = []
+        for k, frame in enumerate(event_frames):
+            if labels is not None and col == "Module":
+                values.append(np.full(len(frame), labels[k], dtype=object))
+            elif col in frame.columns:
+                values.append(frame[col].to_numpy())
+            else:
+                values.append(np.full(len(frame), np.nan))
+
+        dtypes = [v.dtype for v in values if len(v)] or [v.dtype for v in values]
+        if all(np.issubdtype(d, np.number) or d == bool for d in dtypes):
+            out = np.empty(n_total, dtype=np.result_type(*dtypes))
+        else:
+            out = np.empty(n_total, dtype=object)
+
+        for v, pos, (_, order) in zip(values, positions, sorted_times):
+            out[pos] = v if order is None else v[order]
+        merged[col] = out
+
+    return pd.DataFrame(merged, columns=columns)
+
+
 def merge_events(eventsA, eventsB, exposureA, exposureB):
     """
     Merge photon event data from modules A and B into a unified dataset.
@@ -22,11 +118,8 @@ def merge_events(eventsA, eventsB, exposureA, exposureB):
         eventsB["Exposure"] = exposureB
         eventsB["Module"] = "B"
 
-        # Concatenate the DataFrames
-        events_combined = pd.concat([eventsA, eventsB], ignore_index=True)
-
-        # Sort by TIME
-        events_combined = events_combined.sort_values(by="TIME").reset_index(drop=True)
+        # Merge the time-sorted modules (A before B for equal times)
+        events_combined = merge_sorted_events([eventsA, eventsB])
 
         # Log statistics for the merged DataFrame
         print(f"    Number of events Module A: {len(eventsA)}")
@@ -0,0 +1,148 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from scripts.event_filter import filter_events_by_energy
+from scripts.find_blocks_astropy import bba_astropy, fp_rate_to_ncp_prior
+
+
+def band_label(band):
+    """
+    Label of an energy band, used for dictionary keys and file names (e.g. '3-10').
+
+    Parameters:
+        band (tuple): (energy_min, energy_max) in keV.
+
+    Returns:
+        (str): Band label.
+    """
+    return f"{band[0]:g}-{band[1]:g}"
+
+
+def _fit_band(task):
+    """
+    Run the Bayesian Block fit of one energy band.
+
+    Parameters:
+        task (tuple): (time, exposure, ncp_prior, fp_rate) of the band events.
+
+    Returns:
+        (pd.DataFrame): Bayesian Block table from `bba_astropy`.
+    """
+    time, exposure, ncp_prior, fp_rate = task
+    return bba_astropy(time, ncp_prior, fp_rate, x_list=exposure)
+
+
+def multi_band_blocks(
+    events, energy_bands, fp_rate=0.01, ncp_prior=None, n_workers=None
+):
+    """
+    Fit Bayesian Blocks in several energy bands from one set of prepared events.
+
+    The events are loaded, GTI filtered, exposure corrected, merged, and gap suppressed
+    once (steps 1-9); only the fit of step 10 runs per band, in a pool of worker processes.
+
+    Parameters:
+        events (pd.DataFrame): Gap-suppressed events with 'TIME', 'Energy', and 'Exposure' columns.
+        energy_bands (list): (energy_min, energy_max) tuples in keV.
+        fp_rate (float): False positive rate for change points.
+        ncp_prior (float): Number of change point prior (optional, computed from fp_rate and the band events if None).
+        n_workers (int): Number of worker processes. None uses all cores, 1 runs in this process.
+
+    Returns:
+        (dict): Bayesian Block table of each band, keyed by band label.
+    """
+    try:
+        tasks = []
+        for band in energy_bands:
+            band_events = filter_events_by_energy(events, band[0], band[1])
+            if band_events.empty:
+                raise ValueError(f"No events in the {band_label(band)} keV band.")
+            band_prior = ncp_prior
+            if band_prior is None:
+                band_prior = fp_rate_to_ncp_prior(fp_rate, len(band_events))
+            tasks.append(
+                (
+                    band_events["TIME"].values,
+                    band_events["Exposure"].values,
+                    band_prior,
+                    fp_rate,
+                )
+            )
+            print(f"    {band_label(band)} keV: {len(band_events)} events.")
+
+        if n_workers == 1:
+            results = [_fit_band(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers) as pool:
+                results = list(pool.map(_fit_band, tasks))
+
+        return {band_label(band): df for band, df in zip(energy_bands, results)}
+
+    except Exception as e:
+        raise RuntimeError(f"Error in multi-band Bayesian Blocks: {e}")
+
+
+def hardness_ratio(events, band_blocks, soft_band, hard_band):
+    """
+    Hardness ratio (H - S) / (H + S) on the union of the soft and hard band change points.
+
+    The ratio and its error use the photon counts. The band rates are exposure corrected
+    like the other rates of the pipeline: each photon counts 1 / Exposure.
+
+    Parameters:
+        events (pd.DataFrame): Gap-suppressed events with 'TIME', 'Energy', and 'Exposure' columns.
+        band_blocks (dict): Bayesian Block tables keyed by band label (from `multi_band_blocks`).
+        soft_band (tuple): (energy_min, energy_max) of the soft band in keV.
+        hard_band (tuple): (energy_min, energy_max) of the hard band in keV.
+
+    Returns:
+        (pd.DataFrame): Intervals with 'start', 'stop', 'duration', 'soft_counts', 'hard_counts',
+            'soft_rate', 'hard_rate', 'hardness_ratio', and 'hardness_ratio_err' columns.
+    """
+    try:
+        edges = np.unique(
+            np.concatenate(
+                [
+                    band_blocks[band_label(band)][col].values
+                    for band in (soft_band, hard_band)
+                    for col in ("start", "stop")
+                ]
+            )
+        )
+
+        counts, corrected = [], []
+        for band in (soft_band, hard_band):
+            band_events = filter_events_by_energy(events, band[0], band[1])
+            band_times = band_events["TIME"].values
+            counts.append(np.histogram(band_times, bins=edges)[0])
+            corrected.append(
+                np.histogram(
+                    band_times, bins=edges, weights=1.0 / band_events["Exposure"].values
+                )[0]
+            )
+        soft, hard = counts
+
+        durations = np.diff(edges)
+        total = soft + hard
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = (hard - soft) / total
+            # Poisson errors on S and H propagated through (H - S) / (H + S)
+            ratio_err = 2 * np.sqrt(hard**2 * soft + soft**2 * hard) / total**2
+
+        return pd.DataFrame(
+            {
+                "start": edges[:-1],
+                "stop": edges[1:],
+                "duration": durations,
+                "soft_counts": soft,
+                "hard_counts": hard,
+                "soft_rate": corrected[0] / durations,
+                "hard_rate": corrected[1] / durations,
+                "hardness_ratio": ratio,
+                "hardness_ratio_err": ratio_err,
+            }
+        )
+
+    except Exception as e:
+        raise RuntimeError(f"Error in calculating hardness ratios: {e}")
@@ -1,7 +1,46 @@
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from matplotlib.collections import LineCollection
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import numpy as np
 import pandas as pd
+from scripts.lightcurve_pyramid import select_pyramid_level
+
+
+def minmax_per_column(x, y, lower, upper, n_columns):
+    """
+    Reduce a light curve to the min/max rate and error band in each pixel column.
+
+    Parameters:
+        x (np.ndarray): Bin centers.
+        y (np.ndarray): Count rates (NaN for empty bins).
+        lower (np.ndarray): Lower limits.
+        upper (np.ndarray): Upper limits.
+        n_columns (int): Number of pixel columns across the x range.
+
+    Returns:
+        (tuple): Column centers, min rate, max rate, min lower limit, max upper limit (NaN in empty columns).
+    """
+    x_lo, x_hi = np.nanmin(x), np.nanmax(x)
+    width = (x_hi - x_lo) / n_columns if x_hi > x_lo else 1.0
+    column = np.minimum(((x - x_lo) / width).astype(np.int64), n_columns - 1)
+
+    order = np.argsort(column, kind="stable")
+    column, y, lower, upper = column[order], y[order], lower[order], upper[order]
+    first = np.flatnonzero(np.diff(column, prepend=-1))
+
+    reduced = [np.full(n_columns, np.nan) for _ in range(4)]
+    with np.errstate(invalid="ignore"):
+        for out, values, reduce in zip(
+            reduced,
+            (y, y, lower, upper),
+            (np.fmin, np.fmax, np.fmin, np.fmax),
+        ):
+            out[column[first]] = reduce.reduceat(values, first)
+
+    centers = x_lo + width * (np.arange(n_columns) + 0.5)
+    return (centers, *reduced)
 
 
 def plot_lightcurve(
@@ -11,11 +50,18 @@ def plot_lightcurve(
     lc_csv_path,
     bb_csv_path,
     line_times,
-    convert_nustar_to_utc,
+    convert_nustar_to_utc=None,
     plot_lines=False,
     title="Light Curve",
     xlabel="Time (UTC)",
     ylabel="Count Rate (cts/s)",
+    pyramid=None,
+    time_window=None,
+    max_bins=2000,
+    fast_render=False,
+    fast_dpi=150,
+    svg_path=None,
+    time_axis=None,
 ):
     """
     Plot the regularly binned light curve with Bayesian Block overlay, convert times to UTC, and save final data.
@@ -31,20 +77,42 @@ def plot_lightcurve(
         lc_csv_path (str): output path for lightcurve csv
         bb_csv_path (str):output path for bayesian block csv
         line_times (array): UTC times for vertical lines to plot
-        convert_nustar_to_utc (function): Convert NuSTAR mission time to UTC.
+        convert_nustar_to_utc (function): Convert NuSTAR mission time to UTC (not needed if time_axis is given). Must be a fixed offset from an epoch (as `save_bba_results.convert_nustar_to_utc`): only its value at 0 is used, and all times are that epoch plus seconds. A conversion with leap seconds or clock corrections is not supported.
         plot_lines (Boolean): (default False)
         title (str): (default "Light Curve")
         xlabel (str): (default "Time (UTC))
         ylabel (str): (default "Count Rate (cts/s)")
+        pyramid (dict): Light curve pyramid; if given, the level fitting the time window replaces lightcurve_df (optional)
+        time_window (tuple): (start, stop) mission times to plot (optional, default whole light curve)
+        max_bins (int): Largest number of light curve bins picked from the pyramid (default 2000)
+        fast_render (Boolean): Draw on a headless Agg canvas with the bins reduced to min/max per pixel column and errors as a band (default False). The CSV keeps every bin.
+        fast_dpi (int): Resolution of the fast-render PNG (default 150)
+        svg_path (str): Also save the plot as SVG to this path (optional)
+        time_axis (TimeAxis): Time axis of the observation; its UTC frame is used instead of convert_nustar_to_utc (optional)
     """
 
+    if pyramid is not None:
+        tstart, tstop = time_window if time_window is not None else (None, None)
+        binsize, lightcurve_df = select_pyramid_level(pyramid, tstart, tstop, max_bins)
+        print(f"    Plotting the {binsize:g} s light curve level.")
+
     if lightcurve_df.empty:
         raise ValueError("Error: Light curve DataFrame is empty. Cannot plot.")
 
+    # Matplotlib date number of the mission time reference; every time is epoch + seconds,
+    # so convert_nustar_to_utc must be a fixed offset (see the docstring)
+    if time_axis is not None:
+        epoch = time_axis.convert([0.0], "barycentric", "utc")[0]
+    elif convert_nustar_to_utc is not None:
+        epoch = convert_nustar_to_utc(0.0)
+    else:
+        raise ValueError("Either convert_nustar_to_utc or time_axis is needed.")
+    epoch_num = mdates.date2num(epoch)
+
     # ---- 1️ Compute Bin Centers and Error Bars in Mission Time (FLOATS) ----
 
     bin_centers = (lightcurve_df["bin_start"] + lightcurve_df["bin_end"]) / 2
-    bin_centers = mdates.date2num(bin_centers.apply(convert_nustar_to_utc))
+    bin_centers = epoch_num + bin_centers.to_numpy() / 86400
     bin_half_widths = (lightcurve_df["bin_end"] - lightcurve_df["bin_start"]) / 2
     bin_half_widths = bin_half_widths / 86400
 
@@ -55,18 +123,16 @@ def plot_lightcurve(
 
     # ---- 2️ Convert Time to UTC (AFTER Calculations) ----
 
-    lightcurve_df["UTC_bin_start"] = lightcurve_df["bin_start"].apply(
-        convert_nustar_to_utc
+    epoch = pd.Timestamp(epoch)
+    lightcurve_df["UTC_bin_start"] = epoch + pd.to_timedelta(
+        lightcurve_df["bin_start"], unit="s"
+    )
+    lightcurve_df["UTC_bin_end"] = epoch + pd.to_timedelta(
+        lightcurve_df["bin_end"], unit="s"
     )
-    lightcurve_df["UTC_bin_end"] = lightcurve_df["bin_end"].apply(convert_nustar_to_utc)
-
-    # force conversion to datetime
-    # lightcurve_df['UTC_bin_start'] = mdates.date2num(lightcurve_df['UTC_bin_start'])
-    # lightcurve_df['UTC_bin_end'] = mdates.date2num(lightcurve_df['UTC_bin_end'])
 
     # Convert bin centers **AFTER computing as float**
-    # lightcurve_df['UTC_bin_center'] = pd.Series(bin_centers).apply(convert_nustar_to_utc)
-    lightcurve_df["UTC_bin_center"] = pd.Series(bin_centers)
+    lightcurve_df["UTC_bin_center"] = bin_centers
 
     # Ensure only UTC columns are strings
     lightcurve_df["UTC_bin_start"] = lightcurve_df["UTC_bin_start"].astype(str)
@@ -75,77 +141,74 @@ def plot_lightcurve(
 
     # ---- 3️ Convert Bayesian Blocks Time to UTC ----
     if not bb_df.empty:
-        bb_df["UTC_start"] = bb_df["start"].apply(convert_nustar_to_utc)  # .astype(str)
-        bb_df["UTC_stop"] = bb_df["stop"].apply(convert_nustar_to_utc)  # .astype(str)
-
-        # force datetime conversion
-        bb_df["UTC_start"] = mdates.date2num(bb_df["UTC_start"])
-        bb_df["UTC_stop"] = mdates.date2num(bb_df["UTC_stop"])
+        bb_df["UTC_start"] = epoch_num + bb_df["start"].to_numpy() / 86400
+        bb_df["UTC_stop"] = epoch_num + bb_df["stop"].to_numpy() / 86400
 
-        line_times["UTC_start"] = line_times["start"].apply(
-            convert_nustar_to_utc
-        )  # .astype(str)
-        line_times["UTC_stop"] = line_times["stop"].apply(
-            convert_nustar_to_utc
-        )  # .astype(str)
-
-        line_times["UTC_start"] = mdates.date2num(line_times["UTC_start"])
-        line_times["UTC_stop"] = mdates.date2num(line_times["UTC_stop"])
+        line_times["UTC_start"] = epoch_num + line_times["start"].to_numpy() / 86400
+        line_times["UTC_stop"] = epoch_num + line_times["stop"].to_numpy() / 86400
 
     # Extract YYYY-MM-DD for title
     observation_date = lightcurve_df["UTC_bin_start"].iloc[0].split("T")[0]
     # observation_date = lightcurve_df["UTC_bin_start"][0] #.astype(str)
 
     # ---- 4️ Plot the Light Curve ----
-    plt.figure(figsize=(12, 6))
-
-    # Plot regularly binned light curve
-    plt.errorbar(
-        bin_centers,  # Use FLOAT values, NOT UTC
-        lightcurve_df["count_rate"],
-        xerr=bin_half_widths,
-        yerr=vertical_errors,
-        fmt="o",
-        color="black",
-        ecolor="silver",
-        capsize=1,
-        elinewidth=1,
-        markersize=0.3,
-        label="Binned LC",
-    )
+    if fast_render:
+        # Headless Agg canvas, independent of the pyplot backend
+        fig = Figure(figsize=(12, 6))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+
+        # Min/max of the rates and the error band in each pixel column
+        n_columns = int(fig.get_figwidth() * fast_dpi)
+        x, y_min, y_max, y_low, y_high = minmax_per_column(
+            bin_centers,
+            lightcurve_df["count_rate"].to_numpy(dtype=float),
+            lightcurve_df["lower_limit"].to_numpy(dtype=float),
+            lightcurve_df["upper_limit"].to_numpy(dtype=float),
+            n_columns,
+        )
+        ax.fill_between(
+            x, y_low, y_high, color="silver", linewidth=0, label="Binned LC errors"
+        )
+        ax.vlines(x, y_min, y_max, color="black", linewidth=0.5, label="Binned LC")
+    else:
+        fig = plt.figure(figsize=(12, 6))
+        ax = plt.gca()
 
-    # Plot Bayesian Block horizontal lines (red)
+        # Plot regularly binned light curve
+        ax.errorbar(
+            bin_centers,  # Use FLOAT values, NOT UTC
+            lightcurve_df["count_rate"],
+            xerr=bin_half_widths,
+            yerr=vertical_errors,
+            fmt="o",
+            color="black",
+            ecolor="silver",
+            capsize=1,
+            elinewidth=1,
+            markersize=0.3,
+            label="Binned LC",
+        )
+
+    # Plot Bayesian Block horizontal lines (red), one collection per line style
     if not bb_df.empty:
-        for _, row in bb_df.iterrows():
-            plt.plot(
-                [row["UTC_start"], row["UTC_stop"]],
-                [row["rate"], row["rate"]],
-                color="red",
-                linewidth=0.7,
-                label="Bayesian Blocks" if _ == 0 else None,
+        x = np.column_stack([bb_df["UTC_start"], bb_df["UTC_stop"]])
+        for col, style, label in [
+            ("rate", "solid", "Bayesian Blocks"),
+            ("upperlim", (0, (5, 5)), None),  # Dashed
+            ("lowerlim", (0, (5, 5)), None),  # Dashed
+        ]:
+            y = np.repeat(bb_df[col].to_numpy(dtype=float)[:, None], 2, axis=1)
+            ax.add_collection(
+                LineCollection(
+                    np.stack([x, y], axis=-1),
+                    colors="red",
+                    linestyles=style,
+                    linewidths=0.7,
+                    label=label,
+                )
             )
-            plt.plot(
-                [row["UTC_start"], row["UTC_stop"]],
-                [row["upperlim"], row["upperlim"]],
-                color="red",
-                linestyle=(0, (5, 5)),
-                linewidth=0.7,
-            )  # Dashed
-            plt.plot(
-                [row["UTC_start"], row["UTC_stop"]],
-                [row["lowerlim"], row["lowerlim"]],
-                color="red",
-                linestyle=(0, (5, 5)),
-                linewidth=0.7,
-            )  # Dashed
-
-            # if plot_lines is True:
-            #     plt.axvline(
-            #         x=row["UTC_start"], color="green", linestyle="--", linewidth=0.7
-            #     )
-            #     plt.axvline(
-            #         x=row["UTC_stop"], color="red", linestyle="--", linewidth=0.7
-            #     )
+        ax.autoscale_view()
 
     # if not line_times.empty:
     #     for _, row in line_times.iterrows():
@@ -155,8 +218,8 @@ def plot_lightcurve(
     #         plt.axvline(x=row["UTC_stop"], color="red", linestyle="--", linewidth=0.7)
 
     # Labels, title, and legend
-    plt.title(f"{title} ({observation_date})")  # Include observation date in title
-    plt.xlabel(xlabel)
+    ax.set_title(f"{title} ({observation_date})")  # Include observation date in title
+    ax.set_xlabel(xlabel)
 
     # plt.ylim(0, 2.6)
 
@@ -165,14 +228,24 @@ def plot_lightcurve(
     # plt.xticks(xticks, labels=xlabels)
     # plt.xlim(17267.303013,17267.369417 )
 
-    plt.gca().xaxis.set_major_formatter(mdates.DateFormatter("%H:%M"))
-    plt.gcf().autofmt_xdate()
-    plt.ylabel(ylabel)
-    plt.legend()
+    if time_window is not None:
+        ax.set_xlim(epoch_num + np.asarray(time_window, dtype=float) / 86400)
+
+    ax.xaxis.set_major_formatter(mdates.DateFormatter("%H:%M"))
+    fig.autofmt_xdate()
+    ax.set_ylabel(ylabel)
+    ax.legend()
 
     # Save and close plot
-    plt.savefig(output_path, dpi=300, bbox_inches="tight")
-    plt.close()
+    if fast_render:
+        fig.savefig(output_path, dpi=fast_dpi)
+        if svg_path is not None:
+            fig.savefig(svg_path)
+    else:
+        plt.savefig(output_path, dpi=300, bbox_inches="tight")
+        if svg_path is not None:
+            plt.savefig(svg_path, bbox_inches="tight")
+        plt.close()
     print("    Light Curve plot saved.")
 
     # ---- 5️ Save Light Curve and Bayesian Blocks as CSV ----
@@ -0,0 +1,111 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from scripts.expo_events import Events
+from scripts.find_blocks_astropy import fp_rate_to_ncp_prior
+
+# Shared block statistics of the worker processes (set once per worker)
+_shared = {}
+
+
+def _init_worker(fitfunc, prefix):
+    """
+    Store the precomputed block statistics in a worker process.
+
+    Parameters:
+        fitfunc (FitnessFunc): Fitness function used for the fit.
+        prefix (dict): Prefix sums from `FitnessFunc.prepare`.
+    """
+    _shared["fitfunc"] = fitfunc
+    _shared["prefix"] = prefix
+
+
+def _solve_prior(ncp_prior):
+    """
+    Solve the Bayesian Blocks recursion for one prior using the shared block statistics.
+
+    Parameters:
+        ncp_prior (float): Number of change point prior.
+
+    Returns:
+        (np.ndarray): Indices of the change points.
+    """
+    fitfunc = _shared["fitfunc"]
+    _, last = fitfunc.solve(_shared["prefix"], ncp_prior)
+    return fitfunc.change_point_indices(last)
+
+
+def sweep_ncp_prior(
+    time, exposure=None, ncp_priors=None, p0_values=None, fp_rates=None, n_workers=None
+):
+    """
+    Run the Bayesian Block fit for several priors with one shared precomputation.
+
+    The data validation, exposure-weighted cell widths, and count prefix sums are computed
+    once. The dynamic programming solve for each prior then runs in a pool of worker
+    processes, which receive the shared statistics once when they start.
+
+    Parameters:
+        time (np.ndarray): Photon arrival times (gap suppressed).
+        exposure (np.ndarray): Exposure correction factor of each photon (optional).
+        ncp_priors (list): Number of change point priors to fit (optional).
+        p0_values (list): False alarm probabilities, converted with the Scargle (2013) p0 prior (optional).
+        fp_rates (list): False positive rates, converted as in step 10 of main.py (optional).
+        n_workers (int): Number of worker processes. None uses all cores, 1 runs in this process.
+
+    Returns:
+        (dict): Change point times for each ncp_prior.
+        (pd.DataFrame): Summary with 'ncp_prior', 'p0', 'fp_rate', 'n_blocks', and 'n_change_points' columns.
+    """
+    fitfunc = Events()
+    t, prefix = fitfunc.prepare(time, ex=exposure)
+    n_events = len(time)
+
+    # Collect the priors to fit, remembering where each came from
+    rows = []
+    for ncp_prior in ncp_priors or []:
+        rows.append({"ncp_prior": float(ncp_prior), "p0": np.nan, "fp_rate": np.nan})
+    for p0 in p0_values or []:
+        # Like astropy's compute_ncp_prior: N is the number of cells after prepare
+        fitfunc.p0 = p0
+        rows.append(
+            {"ncp_prior": fitfunc.p0_prior(len(t)), "p0": p0, "fp_rate": np.nan}
+        )
+    for fp_rate in fp_rates or []:
+        rows.append(
+            {
+                "ncp_prior": fp_rate_to_ncp_prior(fp_rate, n_events),
+                "p0": np.nan,
+                "fp_rate": fp_rate,
+            }
+        )
+    if not rows:
+        raise ValueError("Provide at least one of ncp_priors, p0_values, or fp_rates.")
+
+    priors = [row["ncp_prior"] for row in rows]
+    if n_workers == 1:
+        _init_worker(fitfunc, prefix)
+        indices = [_solve_prior(ncp_prior) for ncp_prior in priors]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            initializer=_init_worker,
+            initargs=(fitfunc, prefix),
+        ) as pool:
+            indices = list(pool.map(_solve_prior, priors))
+
+    change_points = {}
+    for row, idx in zip(rows, indices):
+        change_points[row["ncp_prior"]] = t[idx]
+        row["n_blocks"] = len(idx) - 1
+        row["n_change_points"] = len(idx) - 2
+
+    summary = pd.DataFrame(rows).sort_values(by="ncp_prior", kind="stable")
+    summary = summary.reset_index(drop=True)
+
+    print(f"    Fitted {len(priors)} priors on {n_events} events.")
+    for _, row in summary.iterrows():
+        print(f"    ncp_prior = {row['ncp_prior']:.3f}: {int(row['n_blocks'])} blocks")
+
+    return change_points, summary
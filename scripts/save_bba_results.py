@@ -2,6 +2,7 @@ import pandas as pd
 from datetime import datetime, timedelta
 import numpy as np
 from tabulate import tabulate
+from scripts.time_axis import mission_to_utc
 
 
 def convert_nustar_to_utc(nustar_time):
@@ -24,118 +25,81 @@ def calculate_event_counts_and_rates(bba_df, event_df, exposure_col="Exposure"):
     Calculate the number of events (`Counts`), the length of each block (`Length (s)`),
     and the event rate (`Rate (cts/s)`) for each Bayesian Block interval.
 
+    The events are sorted once; the counts and the sums of the correction factors and
+    exposures in each interval (START <= TIME < STOP) are differences of prefix sums at
+    searchsorted positions, and the pieces of each block are combined with np.bincount.
+
     Parameters:
-        bba_df (pd.DataFrame): DataFrame containing BBA block intervals with 'start' and 'stop' columns.
-        event_df (pd.DataFrame): DataFrame containing events with 'TIME' and optional `Exposure` columns.
+        bba_df (pd.DataFrame): DataFrame containing BBA block intervals with 'start', 'stop', and 'block_label' columns.
+        event_df (pd.DataFrame): DataFrame containing events with 'TIME', 'CORRECTION_FACTOR', and `Exposure` columns.
         exposure_col (str): Name of the column in `event_df` containing the exposure correction factor.
 
     Returns:
         (pd.DataFrame): Updated BBA DataFrame with 'Counts', 'Length (s)', and 'Rate (cts/s)' columns.
+        (pd.DataFrame): One row per block label with 'start', 'stop', 'exposure', 'NuSTAR duration',
+            'counts', 'total exposure', 'rate', 'upperlim', and 'lowerlim' columns.
     """
-    counts = []
-    lengths = []
-    rates = []
-
-    # block_frame=bba_df.copy()
-
-    # initialize tuple to store info
-    block_list = [
-        {
-            "start": None,
-            "stop": None,
-            "exposure": 0,
-            "NuSTAR duration": 0,
-            "counts": 0,
-            "total exposure": 0,
-            "rate": 0,
-            "upperlim": 0,
-            "lowerlim": 0,
-        }
-        for i in range(int(bba_df["block_label"].iloc[-1]) + 1)
-    ]
-
-    for _, block in bba_df.iterrows():
-        block_start = block["start"]  # old version
-        block_stop = block["stop"]  # old version
-        block_label = int(block["block_label"])
-
-        # start times
-        if block_list[block_label]["start"] is None:
-            block_list[block_label]["start"] = block_start
-
-        # stop times
-        block_list[block_label]["stop"] = block_stop
-
-        # Calculate block length
-        block_length = block_stop - block_start
-        lengths.append(block_length)  # old version
-        block_list[block_label]["exposure"] += block_length
-
-        # Filter events in the current block
-        block_events = event_df[
-            (event_df["TIME"] >= block_start) & (event_df["TIME"] < block_stop)
-        ]
-
-        # Calculate number of events
-        count = len(block_events)
-        counts.append(count)
-        block_list[block_label]["counts"] += count
-
-        # get correction fraction (PSF, Vignetting, ect)
-        correction_factor = np.mean(block_events["CORRECTION_FACTOR"])
-
-        # Calculate event rate if doing exposure correction
-        if not block_events.empty:
-            total_exposure = block_events[exposure_col].sum()
-            block_list[block_label]["total exposure"] += total_exposure
-            rate = count / block_length
-            rate /= correction_factor
-        else:
-            rate = 0.0
-        rates.append(rate)
-
-        # get the count rates of the chunks
-        block_list[block_label]["rate"] = (
-            block_list[block_label]["counts"] / block_list[block_label]["exposure"]
-        ) / correction_factor
-
-        # get livetime duration
-        block_list[block_label]["NuSTAR duration"] = (
-            block_list[block_label]["stop"] - block_list[block_label]["start"]
-        )
+    # Sort the events once and build prefix sums
+    times = event_df["TIME"].to_numpy(dtype=float)
+    order = (
+        None if np.all(times[1:] >= times[:-1]) else np.argsort(times, kind="stable")
+    )
+    correction = event_df["CORRECTION_FACTOR"].to_numpy(dtype=float)
+    exposure = event_df[exposure_col].to_numpy(dtype=float)
+    if order is not None:
+        times, correction, exposure = times[order], correction[order], exposure[order]
+    cum_correction = np.concatenate([[0.0], np.cumsum(correction)])
+    cum_exposure = np.concatenate([[0.0], np.cumsum(exposure)])
+
+    # Events of each block piece
+    block_start = bba_df["start"].to_numpy(dtype=float)
+    block_stop = bba_df["stop"].to_numpy(dtype=float)
+    lo = np.searchsorted(times, block_start, side="left")
+    hi = np.searchsorted(times, block_stop, side="left")
+    counts = hi - lo
+    lengths = block_stop - block_start
+
+    # get correction fraction (PSF, Vignetting, ect) of each piece
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correction_factor = (cum_correction[hi] - cum_correction[lo]) / counts
+        rates = np.where(counts > 0, counts / lengths / correction_factor, 0.0)
+
+    # Combine the pieces of each block
+    labels = bba_df["block_label"].to_numpy().astype(int)
+    n_labels = int(labels[-1]) + 1
+    block_exposure = np.bincount(labels, weights=lengths, minlength=n_labels)
+    block_counts = np.bincount(labels, weights=counts, minlength=n_labels).astype(int)
+    total_exposure = np.bincount(
+        labels, weights=cum_exposure[hi] - cum_exposure[lo], minlength=n_labels
+    )
 
-        # also compute upper and lower count rate limits (for the block version I am working with)
-        # counts = block_list[block_label]['counts']
-        # length = block_list[block_label]['duration']
+    # First and last piece of each block; the block rate uses the correction of the last piece
+    present, first = np.unique(labels, return_index=True)
+    last = len(labels) - 1 - np.unique(labels[::-1], return_index=True)[1]
+    starts = np.full(n_labels, np.nan)
+    stops = np.full(n_labels, np.nan)
+    starts[present] = block_start[first]
+    stops[present] = block_stop[last]
+    durations = np.zeros(n_labels)
+    durations[present] = block_stop[last] - block_start[first]
+
+    last_correction = np.ones(n_labels)
+    last_correction[present] = correction_factor[last]
+    c = block_counts[present]
+    t = block_exposure[present]
+    block_rates = np.zeros(n_labels)
+    upper_limit = np.zeros(n_labels)
+    lower_limit = np.zeros(n_labels)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        block_rates[present] = c / t / last_correction[present]
 
         # Gehrels approximation
-        if block_list[block_label]["counts"] > 0:
-            upper_limit = (
-                block_list[block_label]["counts"]
-                + np.sqrt(block_list[block_label]["counts"] + 0.75)
-            ) / block_list[block_label]["exposure"]
-            lower_limit = (
-                (
-                    block_list[block_label]["counts"]
-                    - np.sqrt(block_list[block_label]["counts"] - 0.25)
-                )
-                / block_list[block_label]["exposure"]
-                if block_list[block_label]["counts"] > 1
-                else 0.0
-            )
-
-        else:
-            upper_limit = 0.0
-            lower_limit = 0.0
-
-        block_list[block_label]["upperlim"] = upper_limit / correction_factor
-        block_list[block_label]["lowerlim"] = lower_limit / correction_factor
-
-        block.start_list = [
-            block_list[i]["start"] for i in range(int(bba_df["block_label"].iloc[-1]))
-        ]
-        # upper_limits.append(upper_limit)
-        # lower_limits.append(lower_limit)
+        upper_limit[present] = np.where(c > 0, (c + np.sqrt(c + 0.75)) / t, 0.0)
+        lower_limit[present] = np.where(
+            c > 1, (c - np.sqrt(np.maximum(c - 0.25, 0))) / t, 0.0
+        )
+        upper_limit[present] /= last_correction[present]
+        lower_limit[present] /= last_correction[present]
 
     # Add new columns to the BBA DataFrame
     bba_df["Counts"] = counts
@@ -143,7 +107,19 @@ def calculate_event_counts_and_rates(bba_df, event_df, exposure_col="Exposure"):
     bba_df["Rate (cts/s)"] = rates
 
     # construct new flare df
-    flare_df = pd.DataFrame(block_list)
+    flare_df = pd.DataFrame(
+        {
+            "start": starts,
+            "stop": stops,
+            "exposure": block_exposure,
+            "NuSTAR duration": durations,
+            "counts": block_counts,
+            "total exposure": total_exposure,
+            "rate": block_rates,
+            "upperlim": upper_limit,
+            "lowerlim": lower_limit,
+        }
+    )
 
     return bba_df, flare_df
 
@@ -197,8 +173,12 @@ def save_bba_results_txt(bba_df, analysis_params, output_file, save_results_note
 
     """
     # Add UT start and stop columns to BBA DataFrame
-    bba_df["UT_start"] = bba_df["start"].apply(convert_nustar_to_utc).astype(str)
-    bba_df["UT_stop"] = bba_df["stop"].apply(convert_nustar_to_utc).astype(str)
+    bba_df["UT_start"] = pd.Series(
+        mission_to_utc(bba_df["start"].to_numpy(), unit="us"), index=bba_df.index
+    ).astype(str)
+    bba_df["UT_stop"] = pd.Series(
+        mission_to_utc(bba_df["stop"].to_numpy(), unit="us"), index=bba_df.index
+    ).astype(str)
 
     # Add Notes column or populate it with save_results_note
     if save_results_note is not None:
@@ -285,8 +265,12 @@ def save_flare_results_txt(
     # drop the total exposure column
     bba_df.drop(["total exposure"], axis=1)
     # Add UT start and stop columns to BBA DataFrame
-    bba_df["UT_start"] = bba_df["start"].apply(convert_nustar_to_utc).astype(str)
-    bba_df["UT_stop"] = bba_df["stop"].apply(convert_nustar_to_utc).astype(str)
+    bba_df["UT_start"] = pd.Series(
+        mission_to_utc(bba_df["start"].to_numpy(), unit="us"), index=bba_df.index
+    ).astype(str)
+    bba_df["UT_stop"] = pd.Series(
+        mission_to_utc(bba_df["stop"].to_numpy(), unit="us"), index=bba_df.index
+    ).astype(str)
 
     # Add Notes column or populate it with save_results_note
     if save_results_note is not None:
@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+
+from scripts.data_loader import count_event_rows, iter_event_chunks
+from scripts.event_filter import filter_events_by_energy
+from scripts.get_event_corr_factor import load_corr_table, lookup_corr_factor
+from scripts.interval_set import IntervalSet
+from scripts.merge_events import merge_positions
+from scripts.time_axis import TimeAxis
+
+
+def stream_clean_gti(
+    gti: pd.DataFrame,
+    event_file,
+    energy_min,
+    energy_max,
+    threshold=30,
+    starttrim=10,
+    stoptrim=10,
+    time_offset=0.0,
+    chunk_size=1000000,
+):
+    """
+    Clean GTIs like `clean_gti`, counting the energy filtered events chunk by chunk.
+
+    Parameters:
+        gti (pd.DataFrame): GTI DataFrame with 'START' and 'STOP' columns (not modified).
+        event_file (str): Path to the event FITS file.
+        energy_min (float): Minimum energy threshold (keV).
+        energy_max (float): Maximum energy threshold (keV).
+        threshold (float): Minimum duration for a valid GTI (seconds).
+        starttrim (float): Seconds to trim from GTI start times.
+        stoptrim (float): Seconds to trim from GTI stop times.
+        time_offset (float): Time correction added to event times (e.g. barycenter correction).
+        chunk_size (int): Number of event rows read at a time.
+
+    Returns:
+        (pd.DataFrame): Cleaned GTI DataFrame with 'START', 'STOP', 'DURATION', and 'EVENT_COUNT' columns.
+    """
+    try:
+        # Trim GTI intervals and filter by duration
+        trimmed = IntervalSet.from_df(gti).trim(starttrim, stoptrim)
+        long_enough = trimmed.durations > threshold
+        gti_set = trimmed[long_enough]
+        valid_gti = pd.DataFrame(
+            {
+                "START": gti_set.starts,
+                "STOP": gti_set.stops,
+                "DURATION": gti_set.durations,
+            },
+            index=gti.index[long_enough],
+        )
+
+        # Count events within each GTI, one chunk at a time
+        event_count = np.zeros(len(valid_gti), dtype=np.int64)
+        for chunk in iter_event_chunks(event_file, chunk_size):
+            chunk = filter_events_by_energy(chunk, energy_min, energy_max)
+            times = np.sort(chunk["TIME"].to_numpy() + time_offset)
+            event_count += gti_set.count(times)
+        valid_gti["EVENT_COUNT"] = event_count
+
+        # Retain GTIs with at least one event
+        final_gti = valid_gti[valid_gti["EVENT_COUNT"] > 0]
+
+        print(f"    GTIs before cleaning: {len(gti)}")
+        print(f"    GTIs after duration filter: {len(valid_gti)}")
+        print(f"    GTIs after event filter: {len(final_gti)}")
+
+        return final_gti
+    except Exception as e:
+        raise RuntimeError(f"Error during streamed GTI cleaning: {e}")
+
+
+def stream_events(
+    event_files,
+    lccorr_files,
+    gti: pd.DataFrame,
+    energy_min,
+    energy_max,
+    time_offset=0.0,
+    chunk_size=1000000,
+    time_axis=None,
+):
+    """
+    Run steps 2 and 5-9 of the pipeline chunk by chunk for event lists that do not fit in memory.
+
+    Each chunk of FITS rows is filtered by energy, filtered with the common GTIs, matched to
+    its correction factor, and shifted onto the gap-suppressed time axis. Only the time and
+    exposure of the surviving events are kept, in buffers preallocated from the number of
+    rows of each event file. The per-module streams are then merged by time.
+
+    Parameters:
+        event_files (list): Paths to the event FITS files (one per module).
+        lccorr_files (list): Paths to the light curve correction files, in the same order.
+        gti (pd.DataFrame): Merged (common) GTI DataFrame with 'START' and 'STOP' columns.
+        energy_min (float): Minimum energy threshold (keV).
+        energy_max (float): Maximum energy threshold (keV).
+        time_offset (float): Time correction added to event times (e.g. barycenter correction).
+        chunk_size (int): Number of event rows read at a time.
+        time_axis (TimeAxis): Time axis used to suppress the gaps (optional, default built from gti).
+
+    Returns:
+       (tuple): Gap-suppressed event DataFrame with 'TIME' and 'Exposure' columns, cumulative_gap_times
+    """
+    try:
+        if len(event_files) != len(lccorr_files):
+            raise ValueError("Each event file needs a light curve correction file.")
+        if gti.empty:
+            raise ValueError("GTI DataFrame is empty.")
+
+        gti_set = IntervalSet.from_df(gti)
+        if time_axis is None:
+            time_axis = TimeAxis.from_gti(gti)
+        cumulative_gap_times = time_axis.cumulative_gaps
+
+        module_times = []
+        module_exposure = []
+        for event_file, lccorr_file in zip(event_files, lccorr_files):
+            df_corr = load_corr_table(lccorr_file)
+
+            # Preallocate buffers for the largest possible number of events
+            n_rows = count_event_rows(event_file)
+            time_buffer = np.empty(n_rows, dtype=np.float64)
+            exposure_buffer = np.empty(n_rows, dtype=np.float64)
+            n_kept = 0
+
+            for chunk in iter_event_chunks(event_file, chunk_size):
+                # Step 2: energy filter
+                chunk = filter_events_by_energy(chunk, energy_min, energy_max)
+                times = chunk["TIME"].to_numpy() + time_offset
+
+                # Step 5: keep events inside the common GTIs (START <= TIME <= STOP)
+                times = times[gti_set.contains(times)]
+
+                # Step 6: correction factor of each event
+                exposure = lookup_corr_factor(df_corr, times)
+
+                # Step 9: remove the gaps before the GTI holding each event
+                times = time_axis.suppress(times)
+
+                time_buffer[n_kept : n_kept + len(times)] = times
+                exposure_buffer[n_kept : n_kept + len(times)] = exposure
+                n_kept += len(times)
+
+            time_buffer = time_buffer[:n_kept]
+            exposure_buffer = exposure_buffer[:n_kept]
+
+            # Chunks of a module are time ordered; sort only if the file was not
+            if n_kept > 1 and not np.all(time_buffer[1:] >= time_buffer[:-1]):
+                order = np.argsort(time_buffer, kind="stable")
+                time_buffer = time_buffer[order]
+                exposure_buffer = exposure_buffer[order]
+
+            print(f"    {event_file}: {n_rows} rows read, {n_kept} events kept.")
+            module_times.append(time_buffer)
+            module_exposure.append(exposure_buffer)
+
+        # Step 7: merge the time-sorted modules
+        n_total = sum(len(times) for times in module_times)
+        merged_times = np.empty(n_total, dtype=np.float64)
+        merged_exposure = np.empty(n_total, dtype=np.float64)
+        for pos, times, exposure in zip(
+            merge_positions(module_times), module_times, module_exposure
+        ):
+            merged_times[pos] = times
+            merged_exposure[pos] = exposure
+
+        print(f"    Total events after merging: {n_total}")
+        print(f"    Total gap time removed: {cumulative_gap_times[-1]}")
+
+        events_no_gaps = pd.DataFrame(
+            {"TIME": merged_times, "Exposure": merged_exposure}
+        )
+        return events_no_gaps, cumulative_gap_times
+
+    except Exception as e:
+        raise RuntimeError(f"Error in streaming events: {e}")
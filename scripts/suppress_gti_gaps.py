@@ -1,10 +1,14 @@
-import numpy as np
+from scripts.time_axis import TimeAxis
 
 
 def suppress_gti_gaps(event_df, gti_df, original_tt_stop):
     """
     Remove gaps between GTIs, adjusting photon event times to ensure a continuous timeline.
 
+    The times are mapped with `TimeAxis.suppress`: an event in a GTI (START <= TIME <= STOP)
+    is shifted by the gaps before that GTI, so an event at a STOP ends its GTI on the
+    suppressed axis. Events outside every GTI are unchanged.
+
     Parameters:
         event_df (pd.DataFrame): DataFrame containing photon events with a 'TIME' column.
         gti_df (pd.DataFrame): DataFrame with GTI intervals (START, STOP).
@@ -22,21 +26,10 @@ def suppress_gti_gaps(event_df, gti_df, original_tt_stop):
         if "TIME" not in event_df.columns:
             raise ValueError("Event DataFrame must contain a 'TIME' column.")
 
-        # Calculate gaps between GTIs
-        gap_durations = gti_df["START"][1:].values - gti_df["STOP"][:-1].values
-        cumulative_gap_times = np.cumsum(gap_durations)
-        cumulative_gap_times = np.insert(
-            cumulative_gap_times, 0, 0
-        )  # Include a zero for the first GTI
-
-        # Adjust event times
-        adjusted_times = event_df["TIME"].copy()
-        for i in range(1, len(gti_df)):
-            # Identify events in each GTI and adjust their times
-            mask = (event_df["TIME"] >= gti_df["START"].iloc[i]) & (
-                event_df["TIME"] < gti_df["STOP"].iloc[i]
-            )
-            adjusted_times[mask] -= cumulative_gap_times[i]
+        # Shift each event by the gaps before the GTI holding it
+        time_axis = TimeAxis.from_gti(gti_df)
+        cumulative_gap_times = time_axis.cumulative_gaps
+        adjusted_times = time_axis.suppress(event_df["TIME"].to_numpy(dtype=float))
 
         # Update event DataFrame
         updated_event_df = event_df.copy()
@@ -54,3 +47,4 @@ def suppress_gti_gaps(event_df, gti_df, original_tt_stop):
 
     except Exception as e:
         raise RuntimeError(f"Error in suppressing GTI gaps: {e}")
+
@@ -0,0 +1,336 @@
+import json
+import numpy as np
+
+from scripts.interval_set import IntervalSet
+
+# NuSTAR reference epoch (mission time 0)
+NUSTAR_EPOCH = "2010-01-01T00:00:00"
+
+FRAMES = ("mission", "barycentric", "relative", "suppressed", "utc")
+
+
+def mission_to_utc(times, epoch=NUSTAR_EPOCH, unit="ns"):
+    """
+    Convert NuSTAR times to UTC, vectorized version of `convert_nustar_to_utc`.
+
+    Parameters:
+        times (array-like): Times in seconds since the reference epoch.
+        epoch (str): Reference epoch in ISO format.
+        unit (str): datetime64 unit the times are rounded to, e.g. "us" for the
+            microseconds of `convert_nustar_to_utc`.
+
+    Returns:
+        (np.ndarray): UTC times as datetime64 in `unit`.
+    """
+    seconds = np.asarray(times, dtype=float)
+    # Whole seconds plus the fraction rounded to `unit` (the subtraction is exact)
+    whole = np.floor(seconds)
+    ticks_per_second = np.timedelta64(1, "s") / np.timedelta64(1, unit)
+    fraction = np.rint((seconds - whole) * ticks_per_second)
+    return (
+        np.datetime64(epoch, unit)
+        + whole.astype("timedelta64[s]")
+        + fraction.astype(f"timedelta64[{unit}]")
+    )
+
+
+def utc_to_mission(utc, epoch=NUSTAR_EPOCH):
+    """
+    Convert UTC times to seconds since the NuSTAR reference epoch.
+
+    Parameters:
+        utc (array-like): UTC times (datetime64, datetime, or ISO strings).
+        epoch (str): Reference epoch in ISO format.
+
+    Returns:
+        (np.ndarray): Times in seconds since the epoch.
+    """
+    delta = np.asarray(utc, dtype="datetime64[ns]") - np.datetime64(epoch, "ns")
+    return delta.astype(np.int64) / 1e9
+
+
+def pack_times(times, reference, resolution=1e-6):
+    """
+    Store times as offsets from a reference epoch in a compact dtype.
+
+    Mission times (~3e8 s) need float64, but their offsets from a nearby epoch counted in
+    ticks of `resolution` usually fit int32: +/- 2.1e9 ticks is 24 days at 1 ms and 36
+    minutes at 1 us. The ticks are stored as int32 when they fit, otherwise as int64.
+    Either way every time is kept to within `resolution` / 2.
+
+    Parameters:
+        times (array-like): Times in seconds.
+        reference (float): Reference epoch subtracted from the times (seconds).
+        resolution (float): Time resolution to preserve (seconds).
+
+    Returns:
+        (np.ndarray): int32 or int64 ticks from the reference.
+    """
+    ticks = np.rint((np.asarray(times, dtype=float) - reference) / resolution)
+    limit = np.iinfo(np.int32).max
+    if ticks.size == 0 or np.max(np.abs(ticks)) <= limit:
+        return ticks.astype(np.int32)
+    return ticks.astype(np.int64)
+
+
+def unpack_times(values, reference, resolution=1e-6):
+    """
+    Restore float64 times from `pack_times` output.
+
+    Parameters:
+        values (np.ndarray): Integer ticks from the reference (or float32 offsets of
+            files written before the ticks were used).
+        reference (float): Reference epoch used for packing (seconds).
+        resolution (float): Tick size used for packing (seconds).
+
+    Returns:
+        (np.ndarray): Times in seconds.
+    """
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.integer):
+        return reference + values * resolution
+    return reference + values.astype(float)
+
+
+class TimeAxis:
+    """
+    Mapping between the time frames of one observation.
+
+    The frames are:
+        mission: spacecraft clock time of the event files (seconds since the epoch).
+        barycentric: mission time plus the constant barycenter correction.
+        relative: barycentric time minus the reference epoch of the observation.
+        suppressed: barycentric time with the gaps between the common GTIs removed.
+        utc: barycentric time as UTC datetime64 values.
+
+    The axis is built once from the merged GTIs (in barycentric time) and the barycenter
+    offset. Every conversion is a searchsorted over the GTIs, O(n log g) for n times and
+    g GTIs. The axis is saved as JSON so later tools can reuse the mapping.
+
+    The reference epoch (by default the whole second before the first GTI) is the origin
+    for compact storage of the observation's times, see `pack`.
+
+    Parameters:
+        gti_starts (array-like): Common GTI start times (barycentric).
+        gti_stops (array-like): Common GTI stop times (barycentric).
+        time_offset (float): Barycenter correction added to mission times (seconds).
+        epoch (str): Reference epoch of mission time in ISO format.
+        reference (float): Origin of the relative frame (barycentric seconds, optional).
+    """
+
+    def __init__(
+        self,
+        gti_starts,
+        gti_stops,
+        time_offset=0.0,
+        epoch=NUSTAR_EPOCH,
+        reference=None,
+    ):
+        self.gti = IntervalSet(gti_starts, gti_stops).normalize()
+        if len(self.gti) == 0:
+            raise ValueError("The time axis needs at least one GTI.")
+        self.time_offset = float(time_offset)
+        self.epoch = str(epoch)
+        if reference is None:
+            reference = np.floor(self.gti.starts[0])
+        self.reference = float(reference)
+
+        self.cumulative_gaps = self.gti.cumulative_gaps()
+        # GTI starts on the gap-suppressed axis
+        self._suppressed_starts = self.gti.starts - self.cumulative_gaps
+
+    @classmethod
+    def from_gti(cls, gti_df, time_offset=0.0, epoch=NUSTAR_EPOCH):
+        """
+        Build the axis from a merged GTI table.
+
+        Parameters:
+            gti_df (pd.DataFrame): Common GTIs with 'START' and 'STOP' columns (barycentric).
+            time_offset (float): Barycenter correction added to mission times (seconds).
+            epoch (str): Reference epoch of mission time in ISO format.
+
+        Returns:
+            (TimeAxis): Time axis of the observation.
+        """
+        gti = IntervalSet.from_df(gti_df)
+        return cls(gti.starts, gti.stops, time_offset=time_offset, epoch=epoch)
+
+    @property
+    def total_gap(self):
+        """Gap time removed between the first and last GTI."""
+        return float(self.cumulative_gaps[-1])
+
+    def suppress(self, times):
+        """
+        Barycentric to gap-suppressed time.
+
+        A time in a GTI, START <= TIME <= STOP, is shifted by the gaps before that GTI, so
+        a time at a STOP maps to the end of its GTI on the suppressed axis. Times outside
+        every GTI (in a gap, or before the first GTI) are unchanged, as in
+        `suppress_gti_gaps`; the pipeline filters them out before this step.
+
+        Parameters:
+            times (array-like): Barycentric times.
+
+        Returns:
+            (np.ndarray): Gap-suppressed times.
+        """
+        times = np.asarray(times, dtype=float)
+        idx = self.gti.index(times, closed="both")
+        inside = idx >= 0
+        suppressed = times.copy()
+        suppressed[inside] -= self.cumulative_gaps[idx[inside]]
+        return suppressed
+
+    def suppressed_index(self, times, side="right"):
+        """
+        Index of the GTI holding each gap-suppressed time.
+
+        Parameters:
+            times (array-like): Gap-suppressed times.
+            side (str): Where a time on a GTI boundary goes: "right" to the later GTI
+                (block starts), "left" to the earlier one (block stops).
+
+        Returns:
+            (np.ndarray): GTI index (times before the first GTI get 0).
+        """
+        times = np.asarray(times, dtype=float)
+        idx = np.searchsorted(self._suppressed_starts, times, side=side) - 1
+        return np.clip(idx, 0, None)
+
+    def restore(self, times, side="right"):
+        """
+        Gap-suppressed to barycentric time (the inverse of `suppress`).
+
+        Parameters:
+            times (array-like): Gap-suppressed times.
+            side (str): Where a time on a GTI boundary goes: "right" after the gap
+                (block starts), "left" before it (block stops).
+
+        Returns:
+            (np.ndarray): Barycentric times.
+        """
+        times = np.asarray(times, dtype=float)
+        return times + self.cumulative_gaps[self.suppressed_index(times, side=side)]
+
+    def pack(self, times, resolution=1e-6):
+        """
+        Barycentric times as compact offsets from the reference epoch (see `pack_times`).
+
+        Parameters:
+            times (array-like): Barycentric times.
+            resolution (float): Time resolution to preserve (seconds).
+
+        Returns:
+            (np.ndarray): int32 or int64 ticks from the reference.
+        """
+        return pack_times(times, self.reference, resolution)
+
+    def unpack(self, values, resolution=1e-6):
+        """
+        Barycentric times from `pack` output.
+
+        Parameters:
+            values (np.ndarray): Integer ticks from the reference.
+            resolution (float): Tick size used for packing (seconds).
+
+        Returns:
+            (np.ndarray): Barycentric times.
+        """
+        return unpack_times(values, self.reference, resolution)
+
+    def convert(self, times, source, target, side="right"):
+        """
+        Convert times between any two frames.
+
+        Parameters:
+            times (array-like): Times in the source frame (datetime64 for 'utc').
+            source (str): Frame of the input times, one of `FRAMES`.
+            target (str): Frame of the output times, one of `FRAMES`.
+            side (str): Boundary convention when leaving the suppressed frame (see `restore`).
+
+        Returns:
+            (np.ndarray): Times in the target frame.
+        """
+        if source not in FRAMES or target not in FRAMES:
+            raise ValueError(f"Frames must be one of {FRAMES}.")
+
+        # Go through barycentric time
+        if source == "mission":
+            times = np.asarray(times, dtype=float) + self.time_offset
+        elif source == "suppressed":
+            times = self.restore(times, side=side)
+        elif source == "utc":
+            times = utc_to_mission(times, self.epoch)
+        elif source == "relative":
+            times = np.asarray(times, dtype=float) + self.reference
+        else:
+            times = np.asarray(times, dtype=float)
+
+        if target == "mission":
+            return times - self.time_offset
+        if target == "suppressed":
+            return self.suppress(times)
+        if target == "utc":
+            return mission_to_utc(times, self.epoch)
+        if target == "relative":
+            return times - self.reference
+        return times
+
+    def to_dict(self):
+        """
+        JSON-serializable description of the axis.
+
+        Returns:
+            (dict): GTIs, barycenter offset, epoch, and reference epoch.
+        """
+        return {
+            "gti_start": self.gti.starts.tolist(),
+            "gti_stop": self.gti.stops.tolist(),
+            "time_offset": self.time_offset,
+            "epoch": self.epoch,
+            "reference": self.reference,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuild an axis from `to_dict` output.
+
+        Parameters:
+            data (dict): Axis description.
+
+        Returns:
+            (TimeAxis): Time axis.
+        """
+        return cls(
+            data["gti_start"],
+            data["gti_stop"],
+            time_offset=data["time_offset"],
+            epoch=data["epoch"],
+            reference=data.get("reference"),
+        )
+
+    def save(self, path):
+        """
+        Save the axis as JSON.
+
+        Parameters:
+            path (str): Output file path.
+        """
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load an axis saved with `save`.
+
+        Parameters:
+            path (str): Path of the JSON file.
+
+        Returns:
+            (TimeAxis): Time axis.
+        """
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
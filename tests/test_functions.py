@@ -3,6 +3,7 @@ from astropy.io import fits
 import pandas as pd
 from pandas.testing import assert_frame_equal, assert_series_equal
 import numpy as np
+import json
 from datetime import datetime
 
 
@@ -13,11 +14,11 @@ from scripts.clean_gti import clean_gti
 from scripts.merge_gtis import merge_gtis
 from scripts.event_common_gti import filter_events_with_common_gti
 from scripts.get_event_corr_factor import get_event_corr_factor
-from scripts.merge_events import merge_events
+from scripts.merge_events import merge_events, merge_sorted_events
 from scripts.calculate_average_rate import calculate_average_rate
 from scripts.suppress_gti_gaps import suppress_gti_gaps
 from scripts.find_blocks import find_blocks, format_bayesian_block_output
-from scripts.find_blocks_astropy import bba_astropy
+from scripts.find_blocks_astropy import bba_astropy, bin_events
 from scripts.detailed_flare_analysis import detailed_flare_analysis
 from scripts.insert_gaps import insert_gti_gaps
 from scripts.save_bba_results import (
@@ -28,8 +29,36 @@ from scripts.save_bba_results import (
     calculate_confidence_limits,
 )
 from scripts.create_lightcurve import generate_lightcurve, plot_prep
-from scripts.plot_lc import plot_lightcurve
+from scripts.plot_lc import plot_lightcurve, minmax_per_column
 from scripts.make_readme import write_readme
+from scripts.data_loader import iter_event_chunks
+from scripts.stream_events import stream_events
+from scripts.expo_events import (
+    bayesian_blocks,
+    IncrementalBlocks,
+    Events,
+    RegularEvents,
+    FitProgress,
+)
+from scripts.prior_sweep import sweep_ncp_prior
+from scripts.calibrate_prior import (
+    simulate_null_events,
+    critical_ncp_prior,
+    calibrate_ncp_prior,
+    combine_exposure_profiles,
+)
+from scripts.bootstrap_blocks import bootstrap_change_points
+from scripts.multi_band import multi_band_blocks, hardness_ratio
+from scripts.lightcurve_cube import LightCurveCube
+from scripts.interval_set import IntervalSet
+from scripts.time_axis import TimeAxis, mission_to_utc
+from scripts.lightcurve_pyramid import (
+    build_lightcurve_pyramid,
+    save_lightcurve_pyramid,
+    load_lightcurve_pyramid,
+    select_pyramid_level,
+)
+from scripts.coarse_to_fine import coarse_to_fine_blocks
 
 
 def fits_diff(file1, file2):
@@ -203,6 +232,14 @@ def test_load_event_file(file_path):
     assert_frame_equal(output, eventsA_df)
 
 
+@pytest.mark.parametrize("file_path", [("./tests/data/test_eventsA.fits")])
+def test_iter_event_chunks(file_path):
+    chunks = list(iter_event_chunks(file_path, chunk_size=6))
+    assert [len(chunk) for chunk in chunks] == [6, 6, 6, 2]
+    output = pd.concat(chunks, ignore_index=True)
+    assert_frame_equal(output, eventsA_df, check_dtype=False)
+
+
 @pytest.mark.parametrize("file_path", [("./tests/data/test_eventsA.fits")])
 def test_load_gti_file(file_path):
     output = load_gti_file(file_path)
@@ -256,6 +293,43 @@ def test_clean_gti(eventsfile, threshold, starttrim, stoptrim):
     assert output.equals(expected_output)
 
 
+def test_clean_gti_criteria():
+    gti = pd.DataFrame({"START": [0.0, 100.0, 200.0], "STOP": [50.0, 150.0, 250.0]})
+    events = pd.DataFrame(
+        {"TIME": [1.0, 5.0, 10.0, 45.0, 101.0, 149.0, 210.0, 220.0, 230.0, 240.0]}
+    )
+    corr = pd.DataFrame(
+        {
+            "TSTART": [0.0, 100.0, 200.0],
+            "TSTOP": [100.0, 200.0, 300.0],
+            "FRACTION": [0.9, 0.9, 0.2],
+        }
+    )
+
+    output = clean_gti(
+        gti,
+        events,
+        threshold=10,
+        starttrim=0,
+        stoptrim=0,
+        min_rate=0.05,
+        max_gap=40,
+        corr_table=corr,
+        min_fraction=0.5,
+    )
+
+    # Input GTIs are not modified
+    assert list(gti.columns) == ["START", "STOP"]
+    assert list(gti["START"]) == [0.0, 100.0, 200.0]
+
+    # GTI 1 has a 48 s gap and GTI 2 a low live time fraction
+    assert list(output.index) == [0]
+    assert list(output["EVENT_COUNT"]) == [4]
+    assert list(output["EVENT_RATE"]) == [0.08]
+    assert list(output["MAX_GAP"]) == [35.0]
+    assert list(output["MEAN_FRACTION"]) == [0.9]
+
+
 @pytest.mark.parametrize(
     "eventsfileA,eventsfileB",
     [("./tests/data/test_eventsA.fits", "./tests/data/test_eventsB.fits")],
@@ -397,6 +471,23 @@ def test_merge_events(eventA, eventB, lcA, lcB):
     assert_frame_equal(output, expected, check_dtype=False)
 
 
+def test_merge_sorted_events():
+    streams = [
+        pd.DataFrame({"TIME": [1.0, 4.0, 4.0], "PI": [10, 11, 12]}),
+        pd.DataFrame({"TIME": [0.0, 4.0], "PI": [20, 21]}),
+        pd.DataFrame({"TIME": [2.0, 4.0, 9.0], "PI": [30, 31, 32]}),
+    ]
+    output = merge_sorted_events(streams, labels=["A", "B", "C"])
+    expected = pd.DataFrame(
+        {
+            "TIME": [0.0, 1.0, 2.0, 4.0, 4.0, 4.0, 4.0, 9.0],
+            "PI": [20, 10, 30, 11, 12, 21, 31, 32],
+            "Module": ["B", "A", "C", "A", "A", "B", "C", "C"],
+        }
+    )
+    assert_frame_equal(output, expected, check_dtype=False)
+
+
 @pytest.mark.parametrize(
     "lccorr,data",
     [("./tests/data/test_LCcorrA.fits", "./tests/data/test_eventsA.fits")],
@@ -411,6 +502,30 @@ def test_calculate_average_rate(lccorr, data):
     assert output is None
 
 
+def test_calculate_average_rate_intervals():
+    events = pd.DataFrame(
+        {"TIME": [1.0, 2.0, 3.0, 12.0, 25.0], "Exposure": [0.5, 0.5, 1.0, 0.8, 1.0]}
+    )
+    gti = pd.DataFrame({"START": [0.0, 20.0], "STOP": [10.0, 30.0]})
+    intervals = pd.DataFrame({"START": [10.0, 0.0, 30.0], "STOP": [15.0, 4.0, 40.0]})
+
+    output = calculate_average_rate(
+        events, gti, calculate_average_count_rate=True, intervals=intervals
+    )
+
+    # Results keep the order of the interval table
+    assert list(output["START"]) == [10.0, 0.0, 30.0]
+    assert list(output["Counts"]) == [1, 3, 0]
+    assert np.allclose(output["Count Rate"][:2], [1.25 / 5, 5.0 / 4])
+    assert np.allclose(output["Count Rate Error"][:2], [1.25 / 5, 3.0 / 4])
+    assert np.allclose(output["Mean Exposure"][:2], [0.8, 2.0 / 3])
+    assert output["Count Rate"].isna()[2]
+
+    # Defaults to the GTIs
+    output = calculate_average_rate(events, gti, calculate_average_count_rate=True)
+    assert list(output["Counts"]) == [3, 1]
+
+
 @pytest.mark.parametrize(
     "data,original_tt_stop, expected_df",
     [
@@ -568,16 +683,14 @@ def test_calculate_confidence_limits(data, expected_data):
             True,
             pd.DataFrame(
                 {
-                    "bin_start": [0.0, 450.0],
-                    "bin_end": [
-                        100.0,
-                        504.0,
-                    ],
-                    "count_rate": [0.02796, np.NaN],
-                    "upper_limit": [0.051143, np.NaN],
-                    "lower_limit": [0.009466, np.NaN],
-                },
-                index=[0, 2],
+                    "bin_start": [0.0, 100.0, 450.0, 504.0],
+                    "bin_end": [10.0, 200.0, 500.0, 506.0],
+                    "count_rate": [0.1397984, 0.05102812, np.NaN, np.NaN],
+                    "upper_limit": [0.3247343, 0.08396662, np.NaN, np.NaN],
+                    "lower_limit": [0.01872943, 0.02282126, np.NaN, np.NaN],
+                    "counts": [1, 3, 0, 0],
+                    "exposure": [10.0, 100.0, 50.0, 2.0],
+                }
             ),
         ),
         (
@@ -588,13 +701,14 @@ def test_calculate_confidence_limits(data, expected_data):
             True,
             pd.DataFrame(
                 {
-                    "bin_start": [0.0, 450.0],
-                    "bin_end": [100.0, 504.0],
-                    "count_rate": [0.02796, np.NaN],
-                    "upper_limit": [0.051143, np.NaN],
-                    "lower_limit": [0.009466, np.NaN],
-                },
-                index=[0, 2],
+                    "bin_start": [0.0, 100.0, 450.0, 504.0],
+                    "bin_end": [10.0, 200.0, 500.0, 506.0],
+                    "count_rate": [0.1397984, 0.06803749, np.NaN, np.NaN],
+                    "upper_limit": [0.3247343, 0.1051086, np.NaN, np.NaN],
+                    "lower_limit": [0.01872943, 0.03509898, np.NaN, np.NaN],
+                    "counts": [1, 4, 0, 0],
+                    "exposure": [10.0, 100.0, 50.0, 2.0],
+                }
             ),
         ),
     ],
@@ -619,3 +733,862 @@ def test_generate_lightcurve(
     assert_frame_equal(output, expected, check_dtype=False)
     # assert_series_equal(output["bin_end"], expected["bin_end"], check_dtype=False)
     # assert_series_equal(output["count_rate"], expected["count_rate"], check_dtype=False)
+
+
+@pytest.mark.parametrize(
+    "eventA, eventB, lcA, lcB",
+    [
+        (
+            "./tests/data/test_eventsA.fits",
+            "./tests/data/test_eventsB.fits",
+            "./tests/data/test_LCcorrA.fits",
+            "./tests/data/test_LCcorrB.fits",
+        )
+    ],
+)
+def test_stream_events(eventA, eventB, lcA, lcB):
+    gti = merge_gtis(load_gti_file(eventA), load_gti_file(eventB))
+
+    # In-memory steps 2 and 5-9
+    eventsA = filter_events_with_common_gti(
+        filter_events_by_energy(load_event_file(eventA), 3.0, 79.0), gti
+    )
+    eventsB = filter_events_with_common_gti(
+        filter_events_by_energy(load_event_file(eventB), 3.0, 79.0), gti
+    )
+    merged = merge_events(
+        eventsA,
+        eventsB,
+        get_event_corr_factor(lcA, eventsA["TIME"]),
+        get_event_corr_factor(lcB, eventsB["TIME"]),
+    )
+    expected, _, expected_gaps = suppress_gti_gaps(merged, gti, gti["STOP"].max())
+
+    output, cumulative_gaps = stream_events(
+        [eventA, eventB], [lcA, lcB], gti, 3.0, 79.0, chunk_size=4
+    )
+
+    assert (cumulative_gaps == expected_gaps).all()
+    assert_series_equal(output["TIME"], expected["TIME"], check_dtype=False)
+    assert_series_equal(output["Exposure"], expected["Exposure"], check_dtype=False)
+
+
+def test_incremental_blocks():
+    rng = np.random.default_rng(42)
+    times = np.sort(np.concatenate([rng.uniform(0, 1000, 400), rng.normal(500, 5, 150)]))
+    exposure = rng.uniform(0.4, 0.7, len(times))
+    expected = bayesian_blocks(times, ex=exposure, fitness="events", ncp_prior=6.0)
+
+    fitter = IncrementalBlocks(ncp_prior=6.0)
+    triggers = [
+        fitter.update(times[i : i + 50], exposure[i : i + 50])
+        for i in range(0, len(times), 50)
+    ]
+
+    assert (fitter.change_points() == expected).all()
+    assert fitter.n_blocks == len(expected) - 1
+    assert any(triggers)
+
+
+@pytest.mark.parametrize("n_workers", [1, 2])
+def test_sweep_ncp_prior(n_workers):
+    rng = np.random.default_rng(7)
+    times = np.sort(np.concatenate([rng.uniform(0, 1000, 300), rng.normal(500, 5, 100)]))
+    exposure = rng.uniform(0.4, 0.7, len(times))
+
+    change_points, summary = sweep_ncp_prior(
+        times, exposure, ncp_priors=[8.0, 2.0, 5.0], n_workers=n_workers
+    )
+
+    assert list(summary["ncp_prior"]) == [2.0, 5.0, 8.0]
+    for ncp_prior, row in zip(summary["ncp_prior"], summary.itertuples()):
+        expected = bayesian_blocks(
+            times, ex=exposure, fitness="events", ncp_prior=ncp_prior
+        )
+        assert (change_points[ncp_prior] == expected).all()
+        assert row.n_blocks == len(expected) - 1
+    assert summary["n_blocks"].is_monotonic_decreasing
+
+
+def test_simulate_null_events():
+    gti = pd.DataFrame({"START": [0.0, 100.0, 450.0], "STOP": [10.0, 200.0, 500.0]})
+    profile = pd.DataFrame(
+        {"TSTART": [0.0, 150.0], "TSTOP": [150.0, 500.0], "FRACTION": [0.5, 1.0]}
+    )
+    times, exposure = simulate_null_events(2000, gti, profile, rng=1)
+
+    # Gap-suppressed axis spans the 160 s of GTI time
+    assert len(times) == 2000
+    assert (np.diff(times) >= 0).all()
+    assert times.min() >= 0 and times.max() <= 160
+    assert set(np.unique(exposure)) == {0.5, 1.0}
+
+
+def test_calibrate_ncp_prior(tmp_path):
+    gti = pd.DataFrame({"START": [0.0, 100.0], "STOP": [50.0, 200.0]})
+    ncp_prior, trials = calibrate_ncp_prior(
+        60, gti, fp_rate=0.1, n_sims=100, n_workers=1, cache_dir=str(tmp_path)
+    )
+
+    assert len(trials) == 100
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # Fresh null light curves show a spurious change point at about the target rate
+    false_positives = []
+    for seed in range(200):
+        times, exposure = simulate_null_events(60, gti, rng=1000 + seed)
+        edges = bayesian_blocks(times, ex=exposure, ncp_prior=ncp_prior)
+        false_positives.append(len(edges) > 2)
+    assert 0.02 <= np.mean(false_positives) <= 0.2
+
+    # Cached trials are reused for another target rate
+    cached_prior, cached_trials = calibrate_ncp_prior(
+        60, gti, fp_rate=0.3, n_sims=100, n_workers=1, cache_dir=str(tmp_path)
+    )
+    assert len(list(tmp_path.iterdir())) == 1
+    assert_frame_equal(cached_trials, trials)
+    assert cached_prior < ncp_prior
+
+    # The critical prior is the smallest one giving a single block
+    times, exposure = simulate_null_events(60, gti, rng=3)
+    critical = critical_ncp_prior(times, exposure, tol=0.01)
+    edges = bayesian_blocks(times, ex=exposure, fitness="events", ncp_prior=critical)
+    assert len(edges) == 2
+
+
+@pytest.mark.parametrize("method", ["bootstrap", "jackknife"])
+def test_bootstrap_change_points(method):
+    rng = np.random.default_rng(1)
+    times = np.concatenate([rng.uniform(0, 1000, 500), rng.uniform(400, 600, 500)])
+    exposure = np.ones_like(times)
+
+    edges, blocks = bootstrap_change_points(
+        times, exposure, 6, n_resamples=30, method=method, n_workers=1
+    )
+
+    assert len(blocks) == len(edges) + 1
+    assert np.allclose(edges["edge"], [400, 600], atol=10)
+    assert (edges["lower"] <= edges["edge"]).all()
+    assert (edges["upper"] >= edges["edge"]).all()
+    assert (blocks["rate_lower"] <= blocks["rate"]).all()
+    assert (blocks["rate_upper"] >= blocks["rate"]).all()
+
+    # Results do not depend on the number of workers
+    edges_pool, blocks_pool = bootstrap_change_points(
+        times, exposure, 6, n_resamples=30, method=method, n_workers=2
+    )
+    assert_frame_equal(edges, edges_pool)
+    assert_frame_equal(blocks, blocks_pool)
+
+
+def test_multi_band_blocks():
+    rng = np.random.default_rng(2)
+    # Soft events are constant; hard events flare between 400 and 600
+    soft = pd.DataFrame({"TIME": rng.uniform(0, 1000, 800), "Energy": 5.0})
+    hard = pd.DataFrame(
+        {
+            "TIME": np.concatenate(
+                [rng.uniform(0, 1000, 300), rng.uniform(400, 600, 600)]
+            ),
+            "Energy": 20.0,
+        }
+    )
+    events = pd.concat([soft, hard]).sort_values("TIME", ignore_index=True)
+    events["Exposure"] = 1.0
+
+    bands = [(3.0, 10.0), (10.0, 79.0)]
+    band_blocks = multi_band_blocks(events, bands, fp_rate=0.01, n_workers=1)
+
+    assert list(band_blocks) == ["3-10", "10-79"]
+    assert len(band_blocks["3-10"]) == 1
+    assert len(band_blocks["10-79"]) == 3
+    assert_frame_equal(
+        band_blocks["10-79"], multi_band_blocks(events, bands[1:], n_workers=2)["10-79"]
+    )
+
+    hr = hardness_ratio(events, band_blocks, *bands)
+    # Union of the soft edges (first and last event) and the hard edges
+    assert len(hr) == 5
+    assert hr["soft_counts"].sum() + hr["hard_counts"].sum() == len(events)
+    ratio = hr.set_index("start")["hardness_ratio"]
+    assert ratio.asof(500) > max(ratio.asof(200), ratio.asof(800))
+
+
+def test_lightcurve_cube(tmp_path):
+    rng = np.random.default_rng(4)
+    pi = rng.integers(0, 2000, 5000)
+    events = pd.DataFrame(
+        {"TIME": np.sort(rng.uniform(0, 1000, 5000)), "PI": pi, "Energy": pi * 0.04 + 1.6}
+    )
+    gti = pd.DataFrame({"START": [0.0, 600.0], "STOP": [450.0, 1000.0]})
+    events = filter_events_with_common_gti(events, gti)
+
+    cube = LightCurveCube.from_events(events, gti, time_resolution=1.0)
+    lc = cube.lightcurve(100, energy_range=(3.0, 10.0))
+
+    band = filter_events_by_energy(events, 3.0, 10.0)
+    expected = np.histogram(band["TIME"], bins=np.arange(0, 1001, 100))[0]
+    assert list(lc["counts"]) == [c for c in expected if c > 0]
+    assert list(lc["exposure"]) == [100, 100, 100, 100, 50, 100, 100, 100, 100]
+
+    spectrum = cube.spectrum(0, 1000, energy_range=(3.0, 3.2))
+    assert list(spectrum["PI"]) == [35, 36, 37, 38, 39, 40]
+    assert list(spectrum["counts"]) == [(events["PI"] == p).sum() for p in range(35, 41)]
+
+    cube.save(tmp_path / "cube.npz")
+    loaded = LightCurveCube.load(tmp_path / "cube.npz")
+    assert_frame_equal(loaded.lightcurve(100, (3.0, 10.0)), lc)
+
+
+def test_lightcurve_pyramid(tmp_path):
+    rng = np.random.default_rng(5)
+    gti = pd.DataFrame({"START": [0.0, 4550.0], "STOP": [4000.0, 10000.0]})
+    times = np.sort(rng.uniform(0, 10000, 20000))
+    times = times[(times <= 4000) | (times >= 4550)]
+    events = pd.DataFrame(
+        {
+            "TIME": times,
+            "Energy": rng.uniform(2, 80, len(times)),
+            "CORRECTION_FACTOR": rng.uniform(0.5, 1, len(times)),
+        }
+    )
+
+    pyramid = build_lightcurve_pyramid(
+        events, gti, binsizes=(10, 100, 1000), energy_range=(3, 79)
+    )
+    assert list(pyramid) == [10.0, 100.0, 1000.0]
+
+    # A summed level matches binning the events directly
+    direct = generate_lightcurve(events, gti, 100, (3, 79), gti_average=False)
+    assert_frame_equal(
+        pyramid[100.0][direct.columns].reset_index(drop=True),
+        direct.reset_index(drop=True),
+    )
+    assert pyramid[10.0]["counts"].sum() == pyramid[1000.0]["counts"].sum()
+
+    save_lightcurve_pyramid(pyramid, tmp_path / "pyramid.fits")
+    loaded = load_lightcurve_pyramid(tmp_path / "pyramid.fits")
+    assert_frame_equal(loaded[1000.0], pyramid[1000.0])
+
+    assert select_pyramid_level(pyramid, 0, 500)[0] == 10.0
+    assert select_pyramid_level(pyramid, max_bins=50)[0] == 1000.0
+
+
+def test_plot_lightcurve_overlay(tmp_path, monkeypatch):
+    import matplotlib.dates as mdates
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+
+    close = plt.close
+    monkeypatch.setattr(plt, "close", lambda *args: None)
+    starts = 262239084.0 + 10.0 * np.arange(500)
+    bb = pd.DataFrame(
+        {
+            "start": starts,
+            "stop": starts + 10,
+            "rate": 1.0,
+            "upperlim": 1.5,
+            "lowerlim": 0.5,
+        }
+    )
+    lc = pd.DataFrame(
+        {
+            "bin_start": starts,
+            "bin_end": starts + 10,
+            "count_rate": 1.0,
+            "upper_limit": 1.2,
+            "lower_limit": 0.8,
+        }
+    )
+    plot_lightcurve(
+        lc,
+        bb,
+        str(tmp_path / "lc.png"),
+        str(tmp_path / "lc.csv"),
+        str(tmp_path / "bb.csv"),
+        bb[["start", "stop"]].copy(),
+        convert_nustar_to_utc,
+    )
+
+    # One collection per line style, whatever the number of blocks
+    collections = [c for c in plt.gca().collections if isinstance(c, LineCollection)]
+    red = [c for c in collections if tuple(c.get_colors()[0]) == (1, 0, 0, 1)]
+    assert len(red) == 3
+    assert all(len(c.get_segments()) == len(bb) for c in red)
+    assert np.isclose(
+        bb["UTC_start"].iloc[0],
+        mdates.date2num(convert_nustar_to_utc(starts[0])),
+    )
+    close("all")
+
+
+def test_fast_render(tmp_path):
+    x = np.arange(10.0)
+    y = np.array([1, 5, np.nan, 2, 3, 3, 0, 9, 4, 4], dtype=float)
+    centers, y_min, y_max, low, high = minmax_per_column(x, y, y - 1, y + 1, 3)
+    assert len(centers) == 3
+    assert list(y_min) == [1, 2, 0]
+    assert list(y_max) == [5, 3, 9]
+    assert list(low) == [0, 1, -1]
+    assert list(high) == [6, 4, 10]
+
+    starts = 262239084.0 + 10.0 * np.arange(20000)
+    rate = np.random.default_rng(6).poisson(10, len(starts)) / 10.0
+    lc = pd.DataFrame(
+        {
+            "bin_start": starts,
+            "bin_end": starts + 10,
+            "count_rate": rate,
+            "upper_limit": rate + 0.3,
+            "lower_limit": rate - 0.3,
+        }
+    )
+    bb = pd.DataFrame(
+        {
+            "start": [starts[0]],
+            "stop": [starts[-1]],
+            "rate": [1.0],
+            "upperlim": [1.1],
+            "lowerlim": [0.9],
+        }
+    )
+    plot_lightcurve(
+        lc,
+        bb,
+        str(tmp_path / "lc.png"),
+        str(tmp_path / "lc.csv"),
+        str(tmp_path / "bb.csv"),
+        bb[["start", "stop"]].copy(),
+        convert_nustar_to_utc,
+        fast_render=True,
+        svg_path=str(tmp_path / "lc.svg"),
+    )
+    assert (tmp_path / "lc.png").exists()
+    assert (tmp_path / "lc.svg").exists()
+    # The CSV keeps every bin
+    assert len(pd.read_csv(tmp_path / "lc.csv")) == len(lc)
+
+
+def test_plot_prep():
+    segments = pd.DataFrame(
+        {
+            "start": [0.0, 10.0, 25.0, 40.0, 70.0],
+            "stop": [10.0, 20.0, 35.0, 50.0, 80.0],
+            "rate": [1.0, 2.0, 3.0, 4.0, 5.0],
+            "upperlim": [1.5, 2.5, 3.5, 4.5, 5.5],
+            "lowerlim": [0.5, 1.5, 2.5, 3.5, 4.5],
+        }
+    )
+    blocks = pd.DataFrame(
+        {
+            "start": [40.0, 0.0, 20.0],
+            "stop": [60.0, 20.0, 30.0],
+            "rate": [7.0, 6.0, 8.0],
+            "upperlim": [7.5, 6.5, 8.5],
+            "lowerlim": [6.5, 5.5, 7.5],
+        }
+    )
+    plot_frame = plot_prep(segments, blocks)
+
+    # The segments at 25-35 and 70-80 are not inside any block
+    assert list(plot_frame["rate"]) == [6.0, 6.0, 3.0, 7.0, 5.0]
+    assert list(plot_frame["upperlim"]) == [6.5, 6.5, 3.5, 7.5, 5.5]
+    assert list(plot_frame["lowerlim"]) == [5.5, 5.5, 2.5, 6.5, 4.5]
+    assert list(segments["rate"]) == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_interval_set():
+    a = IntervalSet([100.0, 0.0, 450.0], [200.0, 10.0, 500.0])
+    b = IntervalSet([5.0, 120.0], [130.0, 300.0])
+
+    assert a.exposure == 160.0
+    assert a.union(b) == IntervalSet([0.0, 450.0], [300.0, 500.0])
+    assert a.intersection(b) == IntervalSet([5.0, 100.0], [10.0, 200.0])
+    assert a.difference(b) == IntervalSet([0.0, 450.0], [5.0, 500.0])
+    assert a.complement(-5.0, 600.0) == IntervalSet(
+        [-5.0, 10.0, 200.0, 500.0], [0.0, 100.0, 450.0, 600.0]
+    )
+    assert a.trim(5.0, 5.0).filter_duration(30.0) == IntervalSet(
+        [105.0, 455.0], [195.0, 495.0]
+    )
+
+    # Row order is kept for lookups
+    times = np.array([0.0, 10.0, 50.0, 150.0, 200.0, 600.0])
+    assert list(a.index(times)) == [1, 1, -1, 0, 0, -1]
+    assert list(a.contains(times, closed="left")) == [
+        True,
+        False,
+        False,
+        True,
+        False,
+        False,
+    ]
+    assert list(a.count(times)) == [2, 2, 0]
+
+    # A block spanning two gaps is split in three
+    gti = pd.DataFrame({"START": [0.0, 100.0, 450.0], "STOP": [10.0, 200.0, 500.0]})
+    blocks = pd.DataFrame({"start": [0.0, 5.0], "stop": [5.0, 130.0], "rate": [1, 2]})
+    corrected, gaps = insert_gti_gaps(blocks, gti)
+    assert list(corrected["start"]) == [0.0, 5.0, 100.0, 450.0]
+    assert list(corrected["stop"]) == [5.0, 10.0, 200.0, 470.0]
+    assert list(corrected["rate"]) == [1, 2, 2, 2]
+    assert list(gaps["GAP_DURATION"]) == [90.0, 250.0]
+
+
+def test_time_axis(tmp_path):
+    gti = pd.DataFrame({"START": [0.0, 100.0, 450.0], "STOP": [10.0, 200.0, 500.0]})
+    axis = TimeAxis.from_gti(gti, time_offset=5.0)
+
+    times = np.array([5.0, 100.0, 150.0, 200.0, 470.0])
+    suppressed = axis.suppress(times)
+    assert list(suppressed) == [5.0, 10.0, 60.0, 110.0, 130.0]
+    assert list(axis.restore(suppressed)) == [5.0, 100.0, 150.0, 450.0, 470.0]
+    assert list(axis.restore([10.0, 110.0], side="left")) == [10.0, 200.0]
+    assert list(axis.convert([95.0], "mission", "suppressed")) == [10.0]
+    assert str(axis.convert([0.0], "mission", "utc")[0]) == "2010-01-01T00:00:05.000000000"
+
+    axis.save(tmp_path / "axis.json")
+    loaded = TimeAxis.load(tmp_path / "axis.json")
+    assert loaded.to_dict() == axis.to_dict()
+    assert list(loaded.cumulative_gaps) == [0.0, 90.0, 340.0]
+
+
+def test_fit_return_stats():
+    rng = np.random.default_rng(3)
+    times = np.sort(
+        np.concatenate([rng.uniform(0, 1000, 400), rng.uniform(400, 450, 200)])
+    )
+    exposure = rng.uniform(0.5, 1.0, len(times))
+    edges = bayesian_blocks(times, ex=exposure, fitness="events", ncp_prior=6.0)
+    result = bayesian_blocks(
+        times, ex=exposure, fitness="events", ncp_prior=6.0, return_stats=True
+    )
+
+    assert np.array_equal(result.edges, edges)
+    assert result.n_blocks == len(edges) - 1
+    assert list(result.counts) == list(np.histogram(times, bins=edges)[0])
+    assert list(result.stop_index - result.start_index) == list(result.counts)
+    assert result.stop_index[-1] == len(times)
+    assert np.all(result.exposure > 0)
+    assert list(bba_astropy(times, 6.0, x_list=exposure)["counts"]) == list(
+        result.counts
+    )
+
+
+def test_calculate_event_counts_and_rates_blocks():
+    events = pd.DataFrame(
+        {
+            "TIME": [5.0, 1.0, 12.0, 15.0, 31.0, 32.0],
+            "CORRECTION_FACTOR": [0.5, 0.5, 1.0, 1.0, 0.5, 0.5],
+            "Exposure": [0.5, 0.5, 1.0, 1.0, 0.5, 0.5],
+        }
+    )
+    blocks = pd.DataFrame(
+        {
+            "start": [0.0, 10.0, 30.0],
+            "stop": [10.0, 20.0, 40.0],
+            "block_label": [0, 1, 1],
+        }
+    )
+    pieces, flare = calculate_event_counts_and_rates(blocks, events)
+
+    assert list(pieces["Counts"]) == [2, 2, 2]
+    assert list(pieces["Rate (cts/s)"]) == [0.4, 0.2, 0.4]
+    assert list(flare["counts"]) == [2, 4]
+    assert list(flare["exposure"]) == [10.0, 20.0]
+    assert list(flare["NuSTAR duration"]) == [10.0, 30.0]
+    assert list(flare["total exposure"]) == [1.0, 3.0]
+
+
+def test_validate_input_sorted_fast_path():
+    rng = np.random.default_rng(4)
+    times = np.round(np.sort(rng.uniform(0, 100, 500)), 1)
+    exposure = rng.uniform(0.5, 1.0, len(times))
+    shuffle = rng.permutation(len(times))
+
+    t, x, _, ex = Events().validate_input(times, None, None, exposure)
+    t_shuffled, x_shuffled, _, ex_shuffled = Events().validate_input(
+        times[shuffle], None, None, exposure[shuffle]
+    )
+    unique, inverse = np.unique(times, return_inverse=True)
+
+    assert np.array_equal(t, unique)
+    assert np.array_equal(x, np.bincount(inverse))
+    assert np.allclose(ex, np.bincount(inverse, exposure) / np.bincount(inverse))
+    assert np.array_equal(t_shuffled, t)
+    assert np.array_equal(x_shuffled, x)
+    assert np.allclose(ex_shuffled, ex)
+    no_exposure = Events().validate_input(times, None, None, None)[3]
+    assert np.array_equal(no_exposure, np.ones(len(t)))
+
+
+def test_bba_astropy_binned():
+    rng = np.random.default_rng(5)
+    times = np.sort(
+        np.concatenate([rng.uniform(0, 1000, 3000), rng.uniform(400.3, 452.7, 1500)])
+    )
+    exposure = rng.uniform(0.8, 1.0, len(times))
+
+    cell_start, counts, mean_exposure = bin_events(times, exposure, 10.0)
+    assert counts.sum() == len(times)
+    assert np.all((mean_exposure >= 0.8) & (mean_exposure <= 1.0))
+
+    exact = bba_astropy(times, 6.0, x_list=exposure)
+    binned = bba_astropy(times, 6.0, x_list=exposure, cell_size="auto")
+    refined = bba_astropy(times, 6.0, x_list=exposure, cell_size="auto", refine=True)
+
+    assert len(binned) == len(exact)
+    assert binned["counts"].sum() == len(times)
+    assert np.allclose(binned["start"], exact["start"], atol=1.0)
+    assert np.allclose(refined["start"], exact["start"])
+    assert list(refined["counts"]) == list(exact["counts"])
+
+
+def test_coarse_to_fine_blocks():
+    rng = np.random.default_rng(6)
+    times = np.sort(
+        np.concatenate([rng.uniform(0, 1000, 3000), rng.uniform(400.3, 452.7, 1500)])
+    )
+    exposure = rng.uniform(0.8, 1.0, len(times))
+
+    exact = bba_astropy(times, 6.0, x_list=exposure)
+    blocks, report = coarse_to_fine_blocks(times, exposure, 6.0, n_workers=1)
+
+    assert np.allclose(blocks["start"], exact["start"])
+    assert list(blocks["counts"]) == list(exact["counts"])
+    assert report["boundary_edges"] == 0
+    assert report["objective"] >= report["coarse_objective"]
+    assert report["photons_refit"] < len(times)
+
+
+def test_threaded_solve_matches_serial():
+    rng = np.random.default_rng(7)
+    times = np.sort(
+        np.concatenate([rng.uniform(0, 1000, 4000), rng.uniform(300, 350, 1500)])
+    )
+    exposure = rng.uniform(0.5, 1.0, len(times))
+
+    serial = Events(ncp_prior=6.0)
+    threaded = Events(ncp_prior=6.0, n_threads=4)
+    threaded.min_chunk_size = 300
+    _, prefix = serial.prepare(times, None, None, exposure)
+
+    best_serial, last_serial = serial.solve(prefix, 6.0)
+    best_threaded, last_threaded = threaded.solve(prefix, 6.0)
+    assert np.array_equal(last_serial, last_threaded)
+    assert np.array_equal(best_serial, best_threaded)
+
+    edges = bayesian_blocks(times, ex=exposure, ncp_prior=6.0, n_threads=2)
+    assert np.array_equal(edges, serial.fit(times, ex=exposure))
+
+
+def test_solve_checkpoint_resume(tmp_path):
+    rng = np.random.default_rng(8)
+    times = np.sort(
+        np.concatenate([rng.uniform(0, 1000, 3000), rng.uniform(300, 350, 1000)])
+    )
+    exposure = rng.uniform(0.5, 1.0, len(times))
+    fitfunc = Events(ncp_prior=6.0)
+    _, prefix = fitfunc.prepare(times, None, None, exposure)
+    best_full, last_full = fitfunc.solve(prefix, 6.0)
+
+    class Preemptible(Events):
+        stop_at = None
+        calls = []
+
+        def best_last_block(self, prefix, best, R, ncp_prior, pool=None):
+            if R == self.stop_at:
+                raise KeyboardInterrupt
+            self.calls.append(R)
+            return super().best_last_block(prefix, best, R, ncp_prior, pool)
+
+    checkpoint = str(tmp_path / "dp")
+    fitter = Preemptible()
+    fitter.stop_at = 2500
+    with pytest.raises(KeyboardInterrupt):
+        fitter.solve(prefix, 6.0, checkpoint=checkpoint, checkpoint_every=1000)
+    with open(tmp_path / "dp" / "state.json") as f:
+        assert json.load(f)["R"] == 2000
+
+    fitter = Preemptible()
+    fitter.calls = []
+    best, last = fitter.solve(prefix, 6.0, checkpoint=checkpoint)
+    assert fitter.calls[0] == 2000
+    assert np.array_equal(last, last_full)
+    assert np.allclose(best, best_full)
+
+    # other inputs start over
+    fitter.calls = []
+    fitter.solve(prefix, 7.0, checkpoint=checkpoint)
+    assert fitter.calls[0] == 0
+
+
+def test_fit_progress_reports():
+    rng = np.random.default_rng(9)
+    times = np.sort(
+        np.concatenate([rng.uniform(0, 1000, 1500), rng.uniform(300, 350, 1000)])
+    )
+    recorder = FitProgress(verbose=False)
+    fitfunc = Events(ncp_prior=6.0)
+    _, prefix = fitfunc.prepare(times, None, None, None)
+    best, last = fitfunc.solve(prefix, 6.0, progress=recorder, progress_every=1000)
+
+    N = len(times)
+    change_points = fitfunc.change_point_indices(last)
+    assert [report["R"] for report in recorder.reports] == [1000, 2000, N]
+    final = recorder.last
+    assert final["candidates"] == N * (N + 1) // 2
+    assert final["eta"] == 0
+    assert final["n_blocks"] == len(change_points) - 1
+
+    edges = bayesian_blocks(times, ncp_prior=6.0, progress=recorder)
+    assert np.array_equal(edges, times[change_points])
+
+
+def test_pack_times_relative_epoch(tmp_path):
+    gti = pd.DataFrame(
+        {"START": [262239084.25, 262249084.0], "STOP": [262240084.0, 262250084.0]}
+    )
+    axis = TimeAxis.from_gti(gti)
+    assert axis.reference == 262239084.0
+    assert list(axis.convert([262239094.5], "barycentric", "relative")) == [10.5]
+
+    short = axis.reference + np.array([0.25, 10.5, 999.75])
+    packed = axis.pack(short, resolution=1e-3)
+    assert packed.dtype == np.int32
+    assert np.array_equal(axis.unpack(packed, resolution=1e-3), short)
+
+    long = axis.reference + np.array([0.25, 10.5, 10999.000001])
+    packed = axis.pack(long)
+    assert packed.dtype == np.int64
+    assert np.allclose(axis.unpack(packed), long, rtol=0, atol=5e-7)
+
+    pyramid = {10.0: pd.DataFrame({"bin_start": long, "bin_end": long + 10.0})}
+    save_lightcurve_pyramid(pyramid, tmp_path / "pyramid.fits")
+    with fits.open(tmp_path / "pyramid.fits") as hdul:
+        assert hdul[1].header["TIMEZERO"] == long[0]
+        assert hdul[1].data["bin_start"].dtype.itemsize == 4
+    loaded = load_lightcurve_pyramid(tmp_path / "pyramid.fits")
+    assert np.allclose(loaded[10.0]["bin_start"], long, rtol=0, atol=5e-4)
+
+
+def test_solve_checkpoint_other_inputs_same_directory(tmp_path):
+    rng = np.random.default_rng(10)
+    times_a = np.sort(
+        np.concatenate([rng.uniform(0, 1000, 600), rng.uniform(140, 160, 300)])
+    )
+    times_b = np.sort(rng.uniform(0, 1000, 900))
+    fitfunc = Events(ncp_prior=6.0)
+    _, prefix_a = fitfunc.prepare(times_a, None, None, None)
+    _, prefix_b = fitfunc.prepare(times_b, None, None, None)
+    best_a, last_a = fitfunc.solve(prefix_a, 6.0)
+
+    class Preemptible(Events):
+        stop_at = None
+
+        def best_last_block(self, prefix, best, R, ncp_prior, pool=None):
+            if R == self.stop_at:
+                raise KeyboardInterrupt
+            return super().best_last_block(prefix, best, R, ncp_prior, pool)
+
+    # fit A saves at R=500, fit B with the same N is killed before its first save
+    checkpoint = str(tmp_path / "dp")
+    for prefix, stop_at in [(prefix_a, 700), (prefix_b, 300)]:
+        fitter = Preemptible()
+        fitter.stop_at = stop_at
+        with pytest.raises(KeyboardInterrupt):
+            fitter.solve(prefix, 6.0, checkpoint=checkpoint, checkpoint_every=500)
+    with open(tmp_path / "dp" / "state.json") as f:
+        assert json.load(f)["R"] == 0
+
+    best, last = fitfunc.solve(prefix_a, 6.0, checkpoint=checkpoint)
+    assert np.array_equal(last, last_a)
+    assert np.array_equal(best, best_a)
+
+
+def test_bootstrap_rates_exposure_weighted():
+    rng = np.random.default_rng(1)
+    times = np.sort(
+        np.concatenate([rng.uniform(0, 1000, 500), rng.uniform(400, 600, 500)])
+    )
+    exposure = rng.uniform(0.4, 0.7, len(times))
+
+    edges, blocks = bootstrap_change_points(
+        times, exposure, 6, n_resamples=10, n_workers=1
+    )
+    fit = bayesian_blocks(times, ex=exposure, ncp_prior=6, return_stats=True)
+    assert np.allclose(blocks["start"], bba_astropy(times, 6, x_list=exposure)["start"])
+    assert np.allclose(blocks["rate"], fit.counts / fit.exposure)
+    raw = fit.counts / np.diff(fit.edges)
+    assert (blocks["rate"] > raw).all()  # exposure < 1 raises the rates
+
+    # Resamples without an interior change point are left out of the edge errors
+    rng = np.random.default_rng(1)
+    weak = np.concatenate([rng.uniform(0, 1000, 500), rng.uniform(400, 600, 60)])
+    edges, _ = bootstrap_change_points(
+        weak, np.ones_like(weak), 6, n_resamples=30, n_workers=1
+    )
+    assert (edges["n_resamples"] == 29).all()
+
+
+def test_combine_exposure_profiles():
+    profile_a = pd.DataFrame(
+        {"TSTART": [0.0, 100.0], "TSTOP": [100.0, 200.0], "FRACTION": [0.8, 0.6]}
+    )
+    profile_b = pd.DataFrame({"TSTART": [50.0], "TSTOP": [150.0], "FRACTION": [0.4]})
+    combined = combine_exposure_profiles(profile_a, profile_b)
+
+    assert list(combined["TSTART"]) == [0.0, 50.0, 100.0, 150.0]
+    assert list(combined["TSTOP"]) == [50.0, 100.0, 150.0, 200.0]
+    assert np.allclose(combined["FRACTION"], [0.4, 0.6, 0.5, 0.3])
+    assert_frame_equal(combine_exposure_profiles(profile_a, profile_a), profile_a)
+
+
+def test_coarse_to_fine_keeps_sparse_window_edges():
+    rng = np.random.default_rng(0)
+    times = np.sort(
+        np.concatenate(
+            [
+                rng.uniform(0, 1000, 40),
+                rng.uniform(1000, 1010, 200),
+                rng.uniform(1010, 3000, 40),
+            ]
+        )
+    )
+    ones = np.ones_like(times)
+    coarse = bba_astropy(times, 4.0, x_list=ones, cell_size=20.0)
+    blocks, report = coarse_to_fine_blocks(
+        times, ones, 4.0, cell_size=20.0, window_cells=1, n_workers=1
+    )
+
+    # The window of the last coarse edge holds one photon; its edge is kept
+    assert report["coarse_edges_kept"] == 1
+    kept = times[np.searchsorted(times, coarse["start"].iloc[-1])]
+    assert kept in set(blocks["start"])
+    assert blocks["counts"].sum() == len(times)
+
+
+def test_sweep_ncp_prior_p0_uses_unique_cells():
+    rng = np.random.default_rng(3)
+    times = np.sort(np.round(rng.uniform(0, 100, 400), 1))
+    assert len(np.unique(times)) < len(times)
+
+    change_points, summary = sweep_ncp_prior(times, p0_values=[0.05], n_workers=1)
+
+    expected = bayesian_blocks(times, fitness="events", p0=0.05)
+    assert (change_points[summary["ncp_prior"][0]] == expected).all()
+    assert summary["ncp_prior"][0] == Events(p0=0.05).p0_prior(len(np.unique(times)))
+
+
+def test_calculate_average_rate_overlapping_intervals():
+    events = pd.DataFrame(
+        {"TIME": [3.0, 1.0, 12.0, 2.0, 25.0], "Exposure": [1.0, 0.5, 0.8, 0.5, 1.0]}
+    )
+    gti = pd.DataFrame({"START": [0.0], "STOP": [30.0]})
+    intervals = pd.DataFrame({"START": [0.0, 2.0, 20.0], "STOP": [4.0, 15.0, 21.0]})
+
+    output = calculate_average_rate(
+        events, gti, calculate_average_count_rate=True, intervals=intervals
+    )
+
+    # Events shared by the overlapping intervals count in each of them
+    assert list(output["START"]) == [0.0, 2.0, 20.0]
+    assert list(output["Counts"]) == [3, 3, 0]
+    assert np.allclose(output["Count Rate"][:2], [5.0 / 4, 4.25 / 13])
+    assert np.allclose(output["Mean Exposure"][:2], [2.0 / 3, 2.3 / 3])
+    assert output["Count Rate"].isna()[2]
+
+
+def test_suppress_event_at_gti_stop():
+    gti = pd.DataFrame({"START": [0.0, 100.0, 450.0], "STOP": [10.0, 200.0, 500.0]})
+    events = pd.DataFrame({"TIME": [10.0, 100.0, 200.0, 450.0, 500.0]})
+
+    # An event at a STOP is shifted with its GTI and stays on the suppressed axis
+    updated, _, _ = suppress_gti_gaps(events, gti, 500.0)
+    assert list(updated["TIME"]) == [10.0, 10.0, 110.0, 110.0, 160.0]
+    assert list(TimeAxis.from_gti(gti).suppress(events["TIME"])) == list(
+        updated["TIME"]
+    )
+
+    # Blocks restored through the same axis: a stop on a gap goes before it
+    blocks = pd.DataFrame({"start": [0.0, 110.0], "stop": [110.0, 160.0]})
+    corrected, _ = insert_gti_gaps(blocks, gti, time_axis=TimeAxis.from_gti(gti))
+    assert list(corrected["start"]) == [0.0, 100.0, 450.0]
+    assert list(corrected["stop"]) == [10.0, 200.0, 500.0]
+
+
+def test_mission_to_utc_microseconds():
+    times = 262239084.0 + np.random.default_rng(8).uniform(0, 1e5, 1000)
+
+    # Same strings as the per-row convert_nustar_to_utc of the step-12 outputs
+    expected = pd.Series([convert_nustar_to_utc(t) for t in times]).astype(str)
+    output = pd.Series(mission_to_utc(times, unit="us")).astype(str)
+    assert (output == expected).all()
+    assert str(mission_to_utc([0.5])[0]) == "2010-01-01T00:00:00.500000000"
+
+
+def test_solve_checkpoint_fitness_parameters(tmp_path):
+    rng = np.random.default_rng(11)
+    t = np.arange(0, 100, 0.1)
+    x = (rng.uniform(size=len(t)) < np.where((t > 40) & (t < 60), 0.6, 0.2)) * 1.0
+    _, prefix = RegularEvents(dt=0.05).prepare(t, x, None, None)
+
+    class Preemptible(RegularEvents):
+        stop_at = None
+        calls = []
+
+        def best_last_block(self, prefix, best, R, ncp_prior, pool=None):
+            if R == self.stop_at:
+                raise KeyboardInterrupt
+            self.calls.append(R)
+            return super().best_last_block(prefix, best, R, ncp_prior, pool)
+
+    checkpoint = str(tmp_path / "dp")
+    fitter = Preemptible(dt=0.05)
+    fitter.stop_at = 700
+    with pytest.raises(KeyboardInterrupt):
+        fitter.solve(prefix, 6.0, checkpoint=checkpoint, checkpoint_every=500)
+
+    # Same data and prior, different dt: start over instead of resuming at R=500
+    fitter = Preemptible(dt=0.025)
+    fitter.calls = []
+    best, last = fitter.solve(prefix, 6.0, checkpoint=checkpoint)
+    assert fitter.calls[0] == 0
+    best_fresh, last_fresh = RegularEvents(dt=0.025).solve(prefix, 6.0)
+    assert np.array_equal(last, last_fresh)
+    assert np.allclose(best, best_fresh)
+
+
+def test_hardness_ratio_exposure_corrected():
+    events = pd.DataFrame(
+        {
+            "TIME": [1.0, 2.0, 3.0, 6.0, 7.0, 8.0],
+            "Energy": [5.0, 20.0, 20.0, 5.0, 5.0, 20.0],
+            "Exposure": [0.5, 0.5, 0.25, 1.0, 0.5, 1.0],
+        }
+    )
+    band_blocks = {
+        "3-10": pd.DataFrame({"start": [0.0, 5.0], "stop": [5.0, 10.0]}),
+        "10-79": pd.DataFrame({"start": [0.0], "stop": [10.0]}),
+    }
+    hr = hardness_ratio(events, band_blocks, (3.0, 10.0), (10.0, 79.0))
+
+    assert list(hr["soft_counts"]) == [1, 2]
+    assert list(hr["hard_counts"]) == [2, 1]
+    assert np.allclose(hr["soft_rate"], [2.0 / 5, 3.0 / 5])
+    assert np.allclose(hr["hard_rate"], [6.0 / 5, 1.0 / 5])
+    assert np.allclose(hr["hardness_ratio"], [1.0 / 3, -1.0 / 3])
+
+
+def test_save_lightcurve_pyramid_halves_time_columns(tmp_path):
+    # A 100 ks observation in 10 s bins
+    starts = 262239084.0 + 10.0 * np.arange(10000)
+    pyramid = {10.0: pd.DataFrame({"bin_start": starts, "bin_end": starts + 10.0})}
+    save_lightcurve_pyramid(pyramid, tmp_path / "pyramid.fits")
+
+    with fits.open(tmp_path / "pyramid.fits") as hdul:
+        assert hdul[1].data["bin_start"].dtype.itemsize == 4
+        assert hdul[1].data["bin_end"].dtype.itemsize == 4
+    loaded = load_lightcurve_pyramid(tmp_path / "pyramid.fits")
+    assert np.allclose(loaded[10.0]["bin_start"], starts, rtol=0, atol=5e-4)
+    assert np.allclose(loaded[10.0]["bin_end"], starts + 10.0, rtol=0, atol=5e-4)